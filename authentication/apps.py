@@ -7,5 +7,4 @@ class AuthenticationConfig(AppConfig):
     verbose_name = 'Authentication'
 
     def ready(self):
-        # import authentication.signals
-        ...
+        import authentication.signals
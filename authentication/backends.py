@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.utils.encoding import smart_str
 from django.utils.translation import gettext_lazy as _
 
@@ -11,7 +10,8 @@ from rest_framework_jwt.settings import api_settings
 
 import jwt
 
-from .models import User
+from .services.token_cache import JWT_TOKEN_CACHE, JSON_WEB_TOKEN_CACHE
+from .services.user_cache import USER_SNAPSHOT_CACHE, get_token_issued
 
 jwt_decode_handler = api_settings.JWT_DECODE_HANDLER
 jwt_get_username_from_payload = api_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER
@@ -44,14 +44,13 @@ class JWTAuthentication(BaseAuthentication):
 
     def _authenticate_credentials(self, request, token):
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY)
+            payload = JWT_TOKEN_CACHE.verify(token, lambda value: jwt.decode(value, settings.SECRET_KEY))
         except:
             msg = 'Invalid authentication. Could not decode token.'
             raise exceptions.AuthenticationFailed(msg)
 
-        try:
-            user = User.model_objects.get(pk=payload['id'])
-        except User.DoesNotExist:
+        user = USER_SNAPSHOT_CACHE.get(payload.get('id'), get_token_issued(payload))
+        if user is None:
             msg = 'No user matching this token was found.'
             raise exceptions.AuthenticationFailed(msg)
 
@@ -77,7 +76,7 @@ class BaseJSONWebTokenAuthentication(BaseAuthentication):
             return None
 
         try:
-            payload = jwt_decode_handler(jwt_value)
+            payload = JSON_WEB_TOKEN_CACHE.verify(jwt_value, jwt_decode_handler)
         except jwt.ExpiredSignature:
             msg = _('Signature has expired.')
             raise exceptions.AuthenticationFailed(msg)
@@ -95,16 +94,14 @@ class BaseJSONWebTokenAuthentication(BaseAuthentication):
         """
         Returns an active user that matches the payload's user id and email.
         """
-        User = get_user_model()
         user_pk = payload.get("user_id")
 
         if not user_pk:
             msg = _('Invalid payload.')
             raise exceptions.AuthenticationFailed(msg)
 
-        try:
-            user = User.objects.get(pk=user_pk)
-        except User.DoesNotExist:
+        user = USER_SNAPSHOT_CACHE.get(user_pk, get_token_issued(payload))
+        if user is None:
             msg = _('Invalid signature.')
             raise exceptions.AuthenticationFailed(msg)
 
@@ -1,7 +1,9 @@
 import enum
+import time
+import uuid
 from dataclasses import dataclass
 from datetime import timedelta
-from typing import Callable, Tuple, NewType
+from typing import Callable, List, Tuple, NewType, Union
 
 from django.conf import settings
 
@@ -9,6 +11,7 @@ from core.app_services.redis_service import REDIS_SERVICE
 
 BAN_TIME = getattr(settings, "BAN_TIME", timedelta(minutes=30))
 COUNT_FAILED_ATTEMPT = getattr(settings, "COUNT_FAILED_ATTEMPT", 10)
+SLIDING_WINDOW_BAN = getattr(settings, "SLIDING_WINDOW_BAN", False)
 
 
 USER_ID = NewType("USER_ID", str)
@@ -28,64 +31,138 @@ class ResultCallFunc:
     result: str
 
 
+# KEYS[1] - счётчик попыток; ARGV: лимит, время бана (с), засчитать ли попытку
+FIXED_WINDOW_SCRIPT = """
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+if count >= tonumber(ARGV[1]) then
+    return {1, count}
+end
+if ARGV[3] == '1' then
+    count = redis.call('INCR', KEYS[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {0, count}
+"""
+
+# KEYS[1] - попытки в sorted set по времени (мс); ARGV: лимит, окно (с), засчитать ли попытку, сейчас (мс), id попытки
+SLIDING_WINDOW_SCRIPT = """
+local window = tonumber(ARGV[2]) * 1000
+local now = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[1]) then
+    return {1, count}
+end
+if ARGV[3] == '1' then
+    redis.call('ZADD', KEYS[1], now, ARGV[5])
+    redis.call('PEXPIRE', KEYS[1], window)
+    count = count + 1
+end
+return {0, count}
+"""
+
+# Возврат зарезервированной попытки: счётчик не уходит в минус и не создаётся заново
+RELEASE_SCRIPT = """
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+if count > 0 then
+    return redis.call('DECR', KEYS[1])
+end
+return 0
+"""
+
+_scripts = {}
+
+
+def run_script(source: str, key: str, args: List) -> List[int]:
+    r = REDIS_SERVICE.get_redis()
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = r.register_script(source)
+
+    return script(keys=[key], args=args, client=r)
+
+
 class AntiBruteForce:
     """
     Decorator for tracking account hacking
-    attempts by brute force passwords or verification codes
+    attempts by brute force passwords or verification codes.
+
+    The ban check and the increment are one atomic Lua call. The decorator
+    reserves an attempt before calling the function and gives it back when
+    the call succeeds, so parallel guesses can not pass the check together.
+    By default the counter lives exp seconds after the last attempt; with
+    sliding_window only the attempts of the last exp seconds count.
     """
-    def __init__(self, key: str, max_count_fail: int = COUNT_FAILED_ATTEMPT, exp: int = BAN_TIME.seconds):
-        self.key = f"{key}__anti_bruteforce"
+    def __init__(self, key: str, max_count_fail: int = COUNT_FAILED_ATTEMPT, exp: int = BAN_TIME.seconds,
+                 sliding_window: bool = SLIDING_WINDOW_BAN):
+        self.key = f"{key}__attempts"
         self.max_count_fail = max_count_fail
         self.exp = exp
+        self.sliding_window = sliding_window
 
-    def check(self, user_id: USER_ID = False) -> Tuple[bool, ResultStatus]:
+    def get_key(self, user_id: USER_ID = False) -> str:
         if user_id:
-            self.key = f"{user_id}_{self.key}"
+            return f"{user_id}_{self.key}"
+
+        return self.key
 
-        if self.is_banned():
+    def check(self, user_id: USER_ID = False) -> Tuple[bool, ResultStatus]:
+        if self.reserve_attempt(self.get_key(user_id)) is None:
             return False, ResultStatus.BAN
 
-        self.increment_attempt()
         return True, ResultStatus.SUCCESS
 
     def __call__(self, func: Callable[[USER_ID, ...],  Tuple[bool, MESSAGE]]) -> \
             Callable[[USER_ID, ...], Tuple[bool, ResultCallFunc]]:
         def wrapper(user_id: USER_ID, *args, **kwargs) -> Tuple[bool, ResultCallFunc]:
-            self.key = f"{user_id}_{self.key}"
-            if self.is_banned():
+            key = self.get_key(user_id)
+            attempt_id = self.reserve_attempt(key)
+            if attempt_id is None:
                 return False, ResultCallFunc(ResultStatus.BAN, "")
 
             try:
                 result, message = func(user_id, *args, **kwargs)
 
             except Exception as e:
+                self.release_attempt(key, attempt_id)
                 return False, ResultCallFunc(ResultStatus.ERROR, str(e))
 
             if not result:
-                self.increment_attempt()
                 return False, ResultCallFunc(ResultStatus.FAILURE, message)
 
+            self.release_attempt(key, attempt_id)
             return True, ResultCallFunc(ResultStatus.SUCCESS, message)
 
         return wrapper
 
-    def increment_attempt(self):
-        data_fail = REDIS_SERVICE.get_data(self.key)
-        if not data_fail:
-            _data_fail = {"count": 0}
-            REDIS_SERVICE.set_data(self.key, _data_fail, self.exp)
-
+    def get_window_key(self, key: str) -> str:
+        return f"{key}_window"
+
+    def attempt(self, key: str, increment: bool) -> Union[str, None]:
+        """
+        None when the key is banned. Otherwise, if increment is set, the
+        attempt is counted in the same call; the returned id releases it.
+        """
+        if self.sliding_window:
+            now = int(time.time() * 1000)
+            attempt_id = f"{now}-{uuid.uuid4().hex}"
+            banned, _ = run_script(SLIDING_WINDOW_SCRIPT, self.get_window_key(key), [
+                self.max_count_fail, self.exp, int(increment), now, attempt_id,
+            ])
         else:
-            _data_fail = {"count": data_fail.get("count", 0) + 1}
-            REDIS_SERVICE.set_data(self.key, _data_fail, self.exp)
-
-    def is_banned(self) -> bool:
-        data_fail = REDIS_SERVICE.get_data(self.key)
-        if data_fail and data_fail.get("count") >= self.max_count_fail:
-            return True
-
-        return False
+            attempt_id = ""
+            banned, _ = run_script(FIXED_WINDOW_SCRIPT, key, [self.max_count_fail, self.exp, int(increment)])
 
+        return None if banned else attempt_id
 
+    def reserve_attempt(self, key: str) -> Union[str, None]:
+        return self.attempt(key, increment=True)
 
+    def release_attempt(self, key: str, attempt_id: str):
+        if self.sliding_window:
+            REDIS_SERVICE.get_redis().zrem(self.get_window_key(key), attempt_id)
+        else:
+            run_script(RELEASE_SCRIPT, key, [])
 
+    def is_banned(self, key: str) -> bool:
+        return self.attempt(key, increment=False) is None
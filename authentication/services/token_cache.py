@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple, Union
+
+from django.conf import settings
+
+TOKEN_CACHE = getattr(settings, "TOKEN_CACHE", {})
+
+TOKEN_CACHE_MAX_SIZE = TOKEN_CACHE.get("max_size", 10000)
+# Токен без exp проверяется заново не реже этого
+TOKEN_CACHE_MAX_AGE = TOKEN_CACHE.get("max_age", 5 * 60)
+
+Token = Union[str, bytes]
+
+
+def get_token_hash(token: Token) -> bytes:
+    if isinstance(token, str):
+        token = token.encode()
+    return hashlib.sha256(token).digest()
+
+
+class VerifiedTokenCache:
+    """
+    Payloads of tokens whose signature has already been checked, keyed by
+    sha256 of the token. An entry lives until the token expires (exp) or
+    max_age passes, then the token is verified again, so expiry errors are
+    raised by the decoder as before. Failed tokens are never cached.
+    """
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, max_age: float = TOKEN_CACHE_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._tokens: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_expires_at(self, payload: Dict[str, Any], now: float) -> float:
+        expires_at = now + self.max_age
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        return expires_at
+
+    def verify(self, token: Token, decode: Callable[[Token], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Payload of the token, decode(token) is called only on a miss.
+        """
+        key = get_token_hash(token)
+        now = time.time()
+
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached is not None:
+                if now < cached[0]:
+                    self._tokens.move_to_end(key)
+                    self.hits += 1
+                    return dict(cached[1])
+                del self._tokens[key]
+            self.misses += 1
+
+        payload = decode(token)
+
+        with self._lock:
+            self._tokens[key] = (self.get_expires_at(payload, now), payload)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+        return dict(payload)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._tokens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# у бэкендов разные декодеры, поэтому и кэши разные
+JWT_TOKEN_CACHE = VerifiedTokenCache()
+JSON_WEB_TOKEN_CACHE = VerifiedTokenCache()
+
+
+def get_token_cache_stats() -> Dict[str, Dict[str, Union[int, float]]]:
+    return {
+        "jwt": JWT_TOKEN_CACHE.stats(),
+        "json_web_token": JSON_WEB_TOKEN_CACHE.stats(),
+    }
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple, Union
+
+import redis
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from core.app_services.redis_service import REDIS_SERVICE
+
+USER_CACHE = getattr(settings, "USER_CACHE", {})
+
+# Сколько секунд воркер не сверяется с Redis: столько же живёт снятый с учётки доступ
+LOCAL_TTL = USER_CACHE.get("local_ttl", 5)
+LOCAL_MAX_SIZE = USER_CACHE.get("local_max_size", 10000)
+REDIS_TTL = USER_CACHE.get("ttl", 5 * 60)
+
+KEY_PREFIX = "auth:user"
+
+# не кладутся в кэш и подгружаются из БД при первом обращении
+DEFERRED_FIELDS = ("password", "last_login")
+
+SnapshotKey = Tuple[int, int]
+
+
+def get_token_issued(payload: Dict[str, Any]) -> int:
+    """
+    Issue time of a token, the expiry when the token has none.
+    """
+    for name in ("iat", "orig_iat", "exp", "expires"):
+        value = payload.get(name)
+        if isinstance(value, (int, float)):
+            return int(value)
+    return 0
+
+
+class UserCache:
+    """
+    Snapshot of the authenticated user keyed by user id and token issue
+    time: a local LRU with a short TTL over a Redis hash per user. Every
+    authenticated call builds a fresh User from the snapshot, so requests
+    never share an instance.
+
+    The password hash and last_login are not cached; they stay deferred
+    and saving the user only writes the loaded fields.
+    """
+    def __init__(self, local_ttl: float = LOCAL_TTL, local_max_size: int = LOCAL_MAX_SIZE, ttl: int = REDIS_TTL):
+        self.local_ttl = local_ttl
+        self.local_max_size = local_max_size
+        self.ttl = ttl
+        self._local: "OrderedDict[SnapshotKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:{user_id}"
+
+    @staticmethod
+    def get_field_names():
+        from authentication.models import User
+
+        return [field.attname for field in User._meta.concrete_fields if field.attname not in DEFERRED_FIELDS]
+
+    def dump(self, user) -> Dict[str, Any]:
+        return {name: getattr(user, name) for name in self.get_field_names()}
+
+    @staticmethod
+    def restore(snapshot: Dict[str, Any]):
+        from authentication.models import User
+
+        names = list(snapshot)
+        return User.from_db(DEFAULT_DB_ALIAS, names, [snapshot[name] for name in names])
+
+    def load(self, user_id: int) -> Union[Dict[str, Any], None]:
+        from authentication.models import User
+
+        user = User.model_objects.filter(pk=user_id).only(*self.get_field_names()).first()
+        return self.dump(user) if user is not None else None
+
+    def get(self, user_id: int, issued: int = 0):
+        """
+        User by id, None when there is no such user.
+        """
+        key = (user_id, issued)
+        with self._lock:
+            cached = self._local.get(key)
+            if cached and time.monotonic() - cached[0] < self.local_ttl:
+                self._local.move_to_end(key)
+                return self.restore(cached[1])
+
+        snapshot = None
+        try:
+            payload = REDIS_SERVICE.get_redis().hget(self.get_key(user_id), issued)
+            if payload is not None:
+                snapshot = json.loads(payload)
+        except redis.RedisError:
+            pass
+
+        if snapshot is None:
+            snapshot = self.load(user_id)
+            if snapshot is None:
+                return None
+
+            try:
+                pipe = REDIS_SERVICE.get_redis().pipeline()
+                pipe.hset(self.get_key(user_id), issued, json.dumps(snapshot))
+                pipe.expire(self.get_key(user_id), self.ttl)
+                pipe.execute()
+            except redis.RedisError:
+                pass
+
+        self._remember(key, snapshot)
+        return self.restore(snapshot)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            for key in [key for key in self._local if key[0] == user_id]:
+                del self._local[key]
+
+        try:
+            REDIS_SERVICE.get_redis().delete(self.get_key(user_id))
+        except redis.RedisError:
+            pass
+
+    def _remember(self, key: SnapshotKey, snapshot: Dict[str, Any]):
+        with self._lock:
+            self._local[key] = (time.monotonic(), snapshot)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_size:
+                self._local.popitem(last=False)
+
+
+USER_SNAPSHOT_CACHE = UserCache()
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from authentication.models import User
+from authentication.services.user_cache import USER_SNAPSHOT_CACHE
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    # после коммита, иначе параллельный запрос успеет закэшировать старую запись;
+    # после удаления у instance уже нет pk
+    user_id = instance.pk
+    transaction.on_commit(lambda: USER_SNAPSHOT_CACHE.invalidate(user_id))
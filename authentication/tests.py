@@ -1,10 +1,15 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase
 from django.contrib.auth import get_user_model
 
 from authentication.serializers import RegistrationSerializer, RestorePasswordSerializer, \
     ConfirmRestorePasswordSerializer
+from authentication.services.anti_bruteforce import AntiBruteForce, ResultStatus
+from authentication.services.token_cache import VerifiedTokenCache
+from authentication.services.user_cache import UserCache
+from core.app_services.redis_service import REDIS_SERVICE
 
 User = get_user_model()
 
@@ -75,3 +80,95 @@ class SerializerTests(TestCase):
         serializer.save()
 
 
+
+
+class UserCacheTests(TestCase):
+    def test_snapshot(self):
+        user = User.objects.create_user(email="cached@mail.ru", password="123456qw")
+        cache = UserCache(local_ttl=60)
+        cache.invalidate(user.pk)
+
+        self.assertEqual(cache.get(user.pk, 1).email, "cached@mail.ru")
+        with self.assertNumQueries(0):
+            cached = cache.get(user.pk, 1)
+        self.assertFalse(cached.is_active)
+        self.assertTrue(cached.check_password("123456qw"))
+        self.assertIsNone(cache.get(0))
+
+    def test_invalidate(self):
+        user = User.objects.create_user(email="cached@mail.ru", password="123456qw")
+        cache = UserCache(local_ttl=60)
+        cache.get(user.pk, 1)
+
+        user.is_active = True
+        user.save()
+        cache.invalidate(user.pk)
+        self.assertTrue(cache.get(user.pk, 1).is_active)
+
+
+class VerifiedTokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.decoded = []
+
+    def decode(self, token):
+        self.decoded.append(token)
+        return {"user_id": 1, "exp": self.exp}
+
+    def test_verify_once(self):
+        self.exp = time.time() + 60
+        cache = VerifiedTokenCache(max_size=1)
+
+        self.assertEqual(cache.verify("token", self.decode)["user_id"], 1)
+        self.assertEqual(cache.verify("token", self.decode)["user_id"], 1)
+        self.assertEqual(len(self.decoded), 1)
+
+        cache.verify("other", self.decode)
+        cache.verify("token", self.decode)
+        self.assertEqual(len(self.decoded), 3)
+        self.assertEqual(cache.stats()["hit_rate"], 0.25)
+
+    def test_expired(self):
+        self.exp = time.time() - 1
+        cache = VerifiedTokenCache()
+
+        cache.verify("token", self.decode)
+        cache.verify("token", self.decode)
+        self.assertEqual(len(self.decoded), 2)
+
+
+class AntiBruteForceTests(SimpleTestCase):
+    def tearDown(self):
+        REDIS_SERVICE.get_redis().delete("1_test__attempts", "1_test__attempts_window")
+
+    def test_check(self):
+        for sliding_window in (False, True):
+            checker = AntiBruteForce("test", max_count_fail=2, sliding_window=sliding_window)
+            self.assertEqual(checker.check(1), (True, ResultStatus.SUCCESS))
+            self.assertEqual(checker.check(1), (True, ResultStatus.SUCCESS))
+            self.assertEqual(checker.check(1), (False, ResultStatus.BAN))
+
+    def test_decorator(self):
+        checker = AntiBruteForce("test", max_count_fail=2)
+        validate = checker(lambda user_id, code: (code == "ok", "invalid"))
+
+        self.assertEqual(validate(1, "bad")[1].status, ResultStatus.FAILURE)
+        self.assertEqual(validate(1, "ok")[1].status, ResultStatus.SUCCESS)
+        self.assertEqual(validate(1, "bad")[1].status, ResultStatus.FAILURE)
+        self.assertEqual(validate(1, "ok")[1].status, ResultStatus.BAN)
+        self.assertEqual(checker.key, "test__attempts")
+
+    def test_parallel_guesses(self):
+        for sliding_window in (False, True):
+            self.tearDown()
+            checker = AntiBruteForce("test", max_count_fail=3, sliding_window=sliding_window)
+
+            def guess(user_id, code):
+                time.sleep(0.1)
+                return False, "invalid"
+
+            validate = checker(guess)
+            with ThreadPoolExecutor(max_workers=10) as executor:
+                statuses = [result[1].status for result in executor.map(lambda _: validate(1, "bad"), range(10))]
+
+            self.assertEqual(statuses.count(ResultStatus.FAILURE), 3)
+            self.assertEqual(statuses.count(ResultStatus.BAN), 7)
@@ -0,0 +1,272 @@
+import threading
+import time
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+import redis
+from django.conf import settings
+
+from core.app_services.redis_service import REDIS_SERVICE
+from geo_city.models import from_e6
+from geo_city.services.spatial_index import EARTH_RADIUS_KM
+
+BRANCH_DISTANCES = getattr(settings, "BRANCH_DISTANCES", {})
+
+# Коэффициент удлинения дороги относительно расстояния по прямой, по регионам филиалов
+DEFAULT_ROAD_FACTOR = BRANCH_DISTANCES.get("default_road_factor", 1.0)
+ROAD_FACTORS: Dict[str, float] = BRANCH_DISTANCES.get("road_factors", {})
+# Сколько секунд воркер доверяет своей копии матрицы
+LOCAL_TTL = getattr(settings, "GEO_INDEX_REFRESH_INTERVAL", 5)
+
+KEY_PREFIX = "company:branch_distances"
+
+
+def pairwise_km(lat1: np.ndarray, lng1: np.ndarray, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distances between every point of the first set (rows)
+    and every point of the second set (columns).
+    """
+    lat1, lng1 = np.radians(lat1)[:, None], np.radians(lng1)[:, None]
+    lat2, lng2 = np.radians(lat2)[None, :], np.radians(lng2)[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class BranchDistanceMatrix:
+    """
+    Road distances (km) between all branches of a company.
+
+    Distance is the great-circle distance multiplied by the larger road
+    factor of the two branches. The matrix is float32, rows and columns
+    follow `ids`.
+    """
+    def __init__(self, ids: np.ndarray, lat: np.ndarray, lng: np.ndarray, factors: np.ndarray,
+                 matrix: np.ndarray = None):
+        self.ids = ids.astype(np.int64)
+        self.lat = lat.astype(np.float64)
+        self.lng = lng.astype(np.float64)
+        self.factors = factors.astype(np.float32)
+        self.matrix = self.compute(self.lat, self.lng, self.factors, self.lat, self.lng, self.factors) \
+            if matrix is None else matrix
+        self.positions = {pk: position for position, pk in enumerate(self.ids.tolist())}
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[int, float, float, float]]) -> "BranchDistanceMatrix":
+        """
+        rows: (branch id, lat, lng, road factor)
+        """
+        data = np.array(rows, dtype=np.float64).reshape(-1, 4)
+        return cls(data[:, 0], data[:, 1], data[:, 2], data[:, 3])
+
+    @staticmethod
+    def compute(lat1, lng1, factors1, lat2, lng2, factors2) -> np.ndarray:
+        factors = np.maximum(factors1[:, None], factors2[None, :])
+        return (pairwise_km(lat1, lng1, lat2, lng2) * factors).astype(np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, pk: int):
+        return pk in self.positions
+
+    def distance(self, from_pk: int, to_pk: int) -> Union[float, None]:
+        if from_pk not in self.positions or to_pk not in self.positions:
+            return None
+        return float(self.matrix[self.positions[from_pk], self.positions[to_pk]])
+
+    def with_branch(self, pk: int, lat: float, lng: float, factor: float) -> "BranchDistanceMatrix":
+        """
+        Copy with one branch added or moved: only its row and column are
+        computed.
+        """
+        position = self.positions.get(pk)
+        if position is not None and self.lat[position] == lat and self.lng[position] == lng \
+                and self.factors[position] == np.float32(factor):
+            return self
+
+        matrix = self if position is None else self.without_branch(pk)
+        point = (np.array([lat]), np.array([lng]), np.array([factor], dtype=np.float32))
+        row = self.compute(*point, matrix.lat, matrix.lng, matrix.factors)[0]
+
+        n = len(matrix)
+        new_matrix = np.zeros((n + 1, n + 1), dtype=np.float32)
+        new_matrix[:n, :n] = matrix.matrix
+        new_matrix[n, :n] = row
+        new_matrix[:n, n] = row
+
+        return BranchDistanceMatrix(
+            np.append(matrix.ids, pk), np.append(matrix.lat, lat), np.append(matrix.lng, lng),
+            np.append(matrix.factors, np.float32(factor)), new_matrix,
+        )
+
+    def without_branch(self, pk: int) -> "BranchDistanceMatrix":
+        position = self.positions.get(pk)
+        if position is None:
+            return self
+
+        keep = np.arange(len(self)) != position
+        return BranchDistanceMatrix(
+            self.ids[keep], self.lat[keep], self.lng[keep], self.factors[keep],
+            self.matrix[keep][:, keep],
+        )
+
+    def to_bytes(self) -> bytes:
+        n = np.array([len(self)], dtype=np.int64)
+        return b"".join(array.tobytes() for array in (n, self.ids, self.lat, self.lng, self.factors, self.matrix))
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "BranchDistanceMatrix":
+        n = int(np.frombuffer(payload, dtype=np.int64, count=1)[0])
+        offset = 8
+
+        def read(dtype, count):
+            nonlocal offset
+            array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        ids, lat, lng = read(np.int64, n), read(np.float64, n), read(np.float64, n)
+        factors = read(np.float32, n)
+        matrix = read(np.float32, n * n).reshape(n, n)
+        return cls(ids, lat, lng, factors, matrix)
+
+    def to_dict(self) -> Dict:
+        return {
+            "branches": self.ids.tolist(),
+            "distances": np.round(self.matrix.astype(np.float64), 3).tolist(),
+        }
+
+
+def get_road_factor(region_name: Union[str, None]) -> float:
+    return ROAD_FACTORS.get(region_name, DEFAULT_ROAD_FACTOR)
+
+
+class BranchDistanceStore:
+    """
+    Per-company matrices, serialized into Redis (shared by the workers) with
+    a short-lived copy in the worker memory. A change of one branch updates
+    its row and column in place, a missing matrix is built from the database.
+    """
+    def __init__(self, local_ttl: float = LOCAL_TTL):
+        self.local_ttl = local_ttl
+        self._local: Dict[int, Tuple[float, BranchDistanceMatrix]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(company_id: int) -> str:
+        return f"{KEY_PREFIX}:{company_id}"
+
+    @staticmethod
+    def get_branch_rows(company_id: int = None, branch_id: int = None) -> List[Tuple[int, float, float, float]]:
+        from employee.models import Branch
+
+        branches = Branch.objects.filter(address__lat_e6__isnull=False, address__lng_e6__isnull=False)
+        if company_id is not None:
+            branches = branches.filter(company_id=company_id)
+        if branch_id is not None:
+            branches = branches.filter(pk=branch_id)
+
+        return [
+            (pk, from_e6(lat_e6), from_e6(lng_e6), get_road_factor(region_name))
+            for (pk, lat_e6, lng_e6, region_name) in branches.values_list(
+                "pk", "address__lat_e6", "address__lng_e6", "address__street__city__region__name"
+            )
+        ]
+
+    def build(self, company_id: int) -> BranchDistanceMatrix:
+        matrix = BranchDistanceMatrix.from_rows(self.get_branch_rows(company_id=company_id))
+        self._save(company_id, matrix)
+        return matrix
+
+    def get(self, company_id: int) -> BranchDistanceMatrix:
+        cached = self._local.get(company_id)
+        if cached and time.monotonic() - cached[0] < self.local_ttl:
+            return cached[1]
+
+        try:
+            payload = REDIS_SERVICE.get_redis().get(self.get_key(company_id))
+        except redis.RedisError:
+            payload = None
+
+        if payload is None:
+            return self.build(company_id)
+
+        matrix = BranchDistanceMatrix.from_bytes(payload)
+        self._remember(company_id, matrix)
+        return matrix
+
+    def update_branch(self, company_id: int, branch_id: int):
+        """
+        Recomputes the row and column of one branch, or drops it when the
+        branch has no coordinates any more.
+        """
+        rows = self.get_branch_rows(branch_id=branch_id)
+
+        def update(matrix: BranchDistanceMatrix) -> BranchDistanceMatrix:
+            if not rows:
+                return matrix.without_branch(branch_id)
+            return matrix.with_branch(*rows[0])
+
+        self._change(company_id, update)
+
+    def remove_branch(self, company_id: int, branch_id: int):
+        self._change(company_id, lambda matrix: matrix.without_branch(branch_id))
+
+    def invalidate(self, company_id: int):
+        self._local.pop(company_id, None)
+        try:
+            REDIS_SERVICE.get_redis().delete(self.get_key(company_id))
+        except redis.RedisError:
+            pass
+
+    def _change(self, company_id: int, update):
+        key = self.get_key(company_id)
+
+        def transaction(pipe: redis.client.Pipeline):
+            payload = pipe.get(key)
+            if payload is None:
+                # матрицы ещё нет: соберётся целиком при первом чтении
+                pipe.multi()
+                return None
+
+            matrix = update(BranchDistanceMatrix.from_bytes(payload))
+            pipe.multi()
+            pipe.set(key, matrix.to_bytes())
+            return matrix
+
+        try:
+            matrix = REDIS_SERVICE.get_redis().transaction(transaction, key, value_from_callable=True)
+        except redis.RedisError:
+            self.invalidate(company_id)
+            return
+
+        if matrix is None:
+            self._local.pop(company_id, None)
+        else:
+            self._remember(company_id, matrix)
+
+    def _save(self, company_id: int, matrix: BranchDistanceMatrix):
+        try:
+            REDIS_SERVICE.get_redis().set(self.get_key(company_id), matrix.to_bytes())
+        except redis.RedisError:
+            pass
+        self._remember(company_id, matrix)
+
+    def _remember(self, company_id: int, matrix: BranchDistanceMatrix):
+        with self._lock:
+            self._local[company_id] = (time.monotonic(), matrix)
+
+
+BRANCH_DISTANCE_STORE = BranchDistanceStore()
+
+
+def get_branch_distance_matrix(company_id: int) -> BranchDistanceMatrix:
+    return BRANCH_DISTANCE_STORE.get(company_id)
+
+
+def get_branch_distance(company_id: int, from_branch_id: int, to_branch_id: int) -> Union[float, None]:
+    """
+    Road distance in km between two branches of the company, None when one
+    of them has no coordinates.
+    """
+    return get_branch_distance_matrix(company_id).distance(from_branch_id, to_branch_id)
@@ -0,0 +1,74 @@
+from typing import Dict, List, Tuple, Union
+
+from geo_city.services.coordinate_array import CoordinateArray
+from geo_city.services.versioned_index import VersionedIndex
+
+DEFAULT_RADIUS_KM = 30
+
+
+class BranchProximityIndex(VersionedIndex):
+    """
+    Branch coordinates (taken from Branch.address) in one CoordinateArray
+    per company and one for all branches. Invalidated by Branch and Address
+    changes, see company.signals.
+    """
+    version_key = "company:branch_proximity:version"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._arrays: Dict[Union[int, None], CoordinateArray] = {}
+
+    def rebuild(self):
+        from employee.models import Branch
+
+        rows: Dict[Union[int, None], List[Tuple[int, int, int]]] = {None: []}
+        branches = Branch.objects.filter(address__lat_e6__isnull=False, address__lng_e6__isnull=False)\
+            .values_list("pk", "company_id", "address__lat_e6", "address__lng_e6")
+        for (pk, company_id, lat_e6, lng_e6) in branches.iterator():
+            rows[None].append((pk, lat_e6, lng_e6))
+            rows.setdefault(company_id, []).append((pk, lat_e6, lng_e6))
+
+        arrays = {}
+        for company_id, company_rows in rows.items():
+            arrays[company_id] = CoordinateArray()
+            arrays[company_id].build(company_rows)
+        self._arrays = arrays
+
+    def get_array(self, company_id: Union[int, None]) -> Union[CoordinateArray, None]:
+        self.ensure_fresh()
+        return self._arrays.get(company_id)
+
+    def within(self, lat: float, lng: float, radius_km: float = DEFAULT_RADIUS_KM,
+               company_id: Union[int, None] = None) -> List[Tuple[int, float]]:
+        """
+        (branch id, distance km) of the branches within radius_km, nearest first.
+        company_id=None searches all companies.
+        """
+        array = self.get_array(company_id)
+        return array.within(lat, lng, radius_km) if array else []
+
+
+BRANCH_PROXIMITY = BranchProximityIndex()
+
+
+def get_nearest_employees(lat: float, lng: float, radius_km: float = DEFAULT_RADIUS_KM,
+                          company_id: Union[int, None] = None) -> List[Tuple[int, float]]:
+    """
+    (employee id, distance km) of the employees whose favorite branch is
+    within radius_km, nearest branch first.
+    """
+    from employee.models import Employee
+
+    branches = dict(BRANCH_PROXIMITY.within(lat, lng, radius_km, company_id))
+    if not branches:
+        return []
+
+    employees = Employee.objects.filter(favorite_branch_id__in=branches.keys())
+    if company_id is not None:
+        employees = employees.filter(favorite_branch__company_id=company_id)
+
+    employees = employees.values_list("pk", "favorite_branch_id")
+    return sorted(
+        ((pk, branches[branch_id]) for (pk, branch_id) in employees),
+        key=lambda employee: (employee[1], employee[0]),
+    )
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Iterable, List, Tuple, Union
+
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from core.app_services.redis_service import REDIS_SERVICE
+
+PERMISSION_MATRIX = getattr(settings, "PERMISSION_MATRIX", {})
+
+# Сколько секунд воркер верит своей копии: столько же может действовать отозванное право
+LOCAL_TTL = PERMISSION_MATRIX.get("local_ttl", 2)
+LOCAL_MAX_SIZE = PERMISSION_MATRIX.get("local_max_size", 10000)
+REDIS_TTL = PERMISSION_MATRIX.get("ttl", 60 * 60)
+
+KEY_PREFIX = "company:permission_matrix"
+
+
+@dataclass
+class PermissionMatrix:
+    """
+    Everything ManagerPermission needs about a user: the profile (company
+    owner check), the company of the manager and the effective level of
+    every role module.
+    """
+    profile_id: Union[int, None] = None
+    company_id: Union[int, None] = None
+    modules: Dict[str, int] = field(default_factory=dict)
+
+    def get_level(self, module_name: str) -> Union[int, None]:
+        return self.modules.get(module_name)
+
+
+def get_module_names() -> Tuple[str, ...]:
+    from company.models import Role
+
+    return tuple(model_field.name for model_field in Role._meta.fields if model_field.name.startswith("module_"))
+
+
+def merge_roles(roles: Iterable[Tuple[str, ...]], module_names: Tuple[str, ...]) -> Dict[str, int]:
+    """
+    A lower code is a wider permission (ADMIN "001" < NOT_ALLOW "999"),
+    so a manager gets the lowest code among the roles for every module.
+    """
+    modules: Dict[str, int] = {}
+    for role in roles:
+        for module_name, value in zip(module_names, role):
+            if value:
+                level = int(value)
+                modules[module_name] = min(level, modules.get(module_name, level))
+    return modules
+
+
+def build_permission_matrix(user_id: int) -> PermissionMatrix:
+    from company.models import Role
+    from profiles.models import TypeUser, Profile
+
+    profile = Profile.objects.filter(user_id=user_id)\
+        .values("pk", "user_type", "manager__pk", "manager__company_id").first()
+    if not profile:
+        return PermissionMatrix()
+
+    matrix = PermissionMatrix(profile_id=profile["pk"], company_id=profile["manager__company_id"])
+    if profile["manager__pk"] is None or profile["user_type"] != TypeUser.MANAGER.value:
+        return matrix
+
+    module_names = get_module_names()
+    roles = Role.objects.filter(managers_role__pk=profile["manager__pk"]).values_list(*module_names)
+    matrix.modules = merge_roles(roles, module_names)
+    return matrix
+
+
+class PermissionMatrixCache:
+    """
+    Per-user PermissionMatrix in a local LRU with a short TTL, backed by
+    Redis. Role, Manager, Manager.roles and Profile signals drop the Redis
+    copy after commit (see company.signals); other workers notice within
+    local_ttl.
+    """
+    def __init__(self, local_ttl: float = LOCAL_TTL, local_max_size: int = LOCAL_MAX_SIZE, ttl: int = REDIS_TTL):
+        self.local_ttl = local_ttl
+        self.local_max_size = local_max_size
+        self.ttl = ttl
+        self._local: "OrderedDict[int, Tuple[float, PermissionMatrix]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:{user_id}"
+
+    def get(self, user_id: int) -> PermissionMatrix:
+        with self._lock:
+            cached = self._local.get(user_id)
+            if cached and time.monotonic() - cached[0] < self.local_ttl:
+                self._local.move_to_end(user_id)
+                return cached[1]
+
+        matrix = None
+        try:
+            payload = REDIS_SERVICE.get_redis().get(self.get_key(user_id))
+            if payload is not None:
+                matrix = PermissionMatrix(**json.loads(payload))
+        except redis.RedisError:
+            pass
+
+        if matrix is None:
+            matrix = build_permission_matrix(user_id)
+            try:
+                REDIS_SERVICE.get_redis().set(self.get_key(user_id), json.dumps(asdict(matrix)), self.ttl)
+            except redis.RedisError:
+                pass
+
+        self._remember(user_id, matrix)
+        return matrix
+
+    def invalidate(self, user_ids: Iterable[int]):
+        user_ids = [user_id for user_id in user_ids if user_id is not None]
+        if not user_ids:
+            return
+
+        with self._lock:
+            for user_id in user_ids:
+                self._local.pop(user_id, None)
+
+        try:
+            REDIS_SERVICE.get_redis().delete(*(self.get_key(user_id) for user_id in user_ids))
+        except redis.RedisError:
+            pass
+
+    def invalidate_on_commit(self, user_ids: Iterable[int]):
+        """
+        Drops the matrices once the transaction commits: dropped earlier, a
+        concurrent request would cache the old rows again for the Redis TTL.
+        The ids are read by the caller before the rows change.
+        """
+        user_ids = list(user_ids)
+        transaction.on_commit(lambda: self.invalidate(user_ids))
+
+    @staticmethod
+    def get_manager_user_ids(manager_ids: Iterable[int]) -> List[int]:
+        from company.models import Manager
+
+        return list(Manager.objects.filter(pk__in=list(manager_ids)).values_list("profile__user_id", flat=True))
+
+    @staticmethod
+    def get_role_user_ids(role_id: int) -> List[int]:
+        from company.models import Manager
+
+        return list(Manager.objects.filter(roles__pk=role_id).values_list("profile__user_id", flat=True))
+
+    def _remember(self, user_id: int, matrix: PermissionMatrix):
+        with self._lock:
+            self._local[user_id] = (time.monotonic(), matrix)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.local_max_size:
+                self._local.popitem(last=False)
+
+
+PERMISSION_MATRIX_CACHE = PermissionMatrixCache()
+
+
+def get_permission_matrix(user_id: int) -> PermissionMatrix:
+    return PERMISSION_MATRIX_CACHE.get(user_id)
@@ -0,0 +1,81 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from company.models import Manager, Role
+from company.services.branch_distances import BRANCH_DISTANCE_STORE
+from company.services.branch_proximity import BRANCH_PROXIMITY
+from company.services.permission_matrix import PERMISSION_MATRIX_CACHE
+from employee.models import Branch
+from geo_city.models import Address
+from profiles.models import Profile
+
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidate_branch_proximity(sender, instance, **kwargs):
+    BRANCH_PROXIMITY.invalidate()
+
+
+@receiver(post_save, sender=Branch)
+def update_branch_distances(sender, instance, **kwargs):
+    BRANCH_DISTANCE_STORE.update_branch(instance.company_id, instance.pk)
+
+
+@receiver(post_delete, sender=Branch)
+def remove_branch_distances(sender, instance, **kwargs):
+    BRANCH_DISTANCE_STORE.remove_branch(instance.company_id, instance.pk)
+
+
+@receiver(post_save, sender=Address)
+def invalidate_branch_address(sender, instance, created, **kwargs):
+    # новый адрес ещё не привязан к филиалу, удаление адреса удалит и филиал
+    if created:
+        return
+
+    branches = list(Branch.objects.filter(address_id=instance.pk).values_list("pk", "company_id"))
+    if branches:
+        BRANCH_PROXIMITY.invalidate()
+
+    for (branch_id, company_id) in branches:
+        BRANCH_DISTANCE_STORE.update_branch(company_id, branch_id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(pre_delete, sender=Role)
+def invalidate_role_permissions(sender, instance, **kwargs):
+    # при удалении роли связи с менеджерами ещё не удалены
+    PERMISSION_MATRIX_CACHE.invalidate_on_commit(PERMISSION_MATRIX_CACHE.get_role_user_ids(instance.pk))
+
+
+@receiver(m2m_changed, sender=Manager.roles.through)
+def invalidate_manager_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # role.managers_role.clear(): после очистки менеджеров роли уже не найти
+        if action == "pre_clear":
+            user_ids = PERMISSION_MATRIX_CACHE.get_role_user_ids(instance.pk)
+        elif action in ("post_add", "post_remove"):
+            user_ids = PERMISSION_MATRIX_CACHE.get_manager_user_ids(pk_set)
+        else:
+            return
+
+    elif action in ("post_add", "post_remove", "post_clear"):
+        user_ids = PERMISSION_MATRIX_CACHE.get_manager_user_ids([instance.pk])
+
+    else:
+        return
+
+    PERMISSION_MATRIX_CACHE.invalidate_on_commit(user_ids)
+
+
+@receiver(post_save, sender=Manager)
+@receiver(post_delete, sender=Manager)
+def invalidate_manager_permissions(sender, instance, **kwargs):
+    PERMISSION_MATRIX_CACHE.invalidate_on_commit(
+        Profile.objects.filter(pk=instance.profile_id).values_list("user_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_permissions(sender, instance, **kwargs):
+    PERMISSION_MATRIX_CACHE.invalidate_on_commit([instance.user_id])
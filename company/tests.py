@@ -1,10 +1,24 @@
 import json
 
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase, RequestFactory
 from django.contrib.auth import get_user_model
+from rest_framework.test import APIRequestFactory, force_authenticate
 
 from authentication.serializers import RegistrationSerializer, LoginSerializer, RefreshTokenSerializer
 from company.serializers import CompanySerializer, ManagerSerializer, RoleSerializer
+from company.services.branch_distances import BranchDistanceMatrix
+from company.services.branch_proximity import BranchProximityIndex, BRANCH_PROXIMITY
+from company.models import Company, Manager, Role
+from company.services.permission_matrix import PermissionMatrix, PermissionMatrixCache, merge_roles, \
+    PERMISSION_MATRIX_CACHE
+from core.permissions.manager import get_company_from_request, get_manager
+from core.permissions.principal import get_principal
+from core.utils import get_profile_in_request
+from employee.models import Branch, Employee
+from employee.views import EmployeeViewSet
+from geo_city.models import Street, Address
+from geo_city.services.coordinate_array import CoordinateArray
+from geo_city.services.spatial_index import haversine_km
 
 User = get_user_model()
 
@@ -117,5 +131,143 @@ class SerializerTests(TestCase):
         print()
 
 
+class BranchProximityTests(SimpleTestCase):
+    def setUp(self):
+        self.index = BranchProximityIndex()
+        self.index.is_loaded = True
+        self.index._checked_at = float("inf")
 
+        arrays = {None: CoordinateArray(), 1: CoordinateArray()}
+        arrays[None].build([(1, 55755800, 37617300), (2, 55751200, 37618400), (3, 59934300, 30335100)])
+        arrays[1].build([(2, 55751200, 37618400)])
+        self.index._arrays = arrays
 
+    def test_within(self):
+        self.assertEqual([pk for pk, _ in self.index.within(55.7558, 37.6173, 30)], [1, 2])
+
+    def test_within_company(self):
+        self.assertEqual([pk for pk, _ in self.index.within(55.7558, 37.6173, 30, company_id=1)], [2])
+        self.assertEqual(self.index.within(55.7558, 37.6173, 30, company_id=2), [])
+
+
+class NearestEmployeesTests(TestCase):
+    def setUp(self):
+        self.addCleanup(setattr, BRANCH_PROXIMITY, "is_loaded", False)
+
+    def create_employee(self, email, name):
+        user = User.objects.create_user(email=email, password="123456qw")
+        company = Company.objects.create(profile=user.profile, name=name)
+        street = Street.objects.create(street="Ленина")
+        address = Address.objects.create(street=street, home="1", latitude="55.7558", longitude="37.6173")
+        branch = Branch.objects.create(name=name, company=company, address=address)
+        return user, Employee.objects.create(name=name, favorite_branch=branch)
+
+    def test_only_own_company(self):
+        user, employee = self.create_employee("owner@mail.ru", "own")
+        self.create_employee("other@mail.ru", "other")
+        BRANCH_PROXIMITY.is_loaded = False
+
+        request = APIRequestFactory().get("/employee/nearest/", {"lat": 55.7558, "lng": 37.6173})
+        force_authenticate(request, user=User.objects.get(pk=user.pk))
+        response = EmployeeViewSet.as_view({"get": "nearest"})(request)
+
+        self.assertEqual([item["id"] for item in response.data["results"]], [employee.pk])
+
+
+class BranchDistanceMatrixTests(SimpleTestCase):
+    rows = [
+        (1, 55.7558, 37.6173, 1.0),
+        (2, 59.9343, 30.3351, 1.0),
+        (3, 68.9585, 33.0827, 1.5),
+    ]
+
+    def setUp(self):
+        self.matrix = BranchDistanceMatrix.from_rows(self.rows)
+
+    def test_distance(self):
+        self.assertAlmostEqual(self.matrix.distance(1, 2), haversine_km(55.7558, 37.6173, 59.9343, 30.3351), places=0)
+        self.assertAlmostEqual(self.matrix.distance(2, 3),
+                               haversine_km(59.9343, 30.3351, 68.9585, 33.0827) * 1.5, places=0)
+        self.assertEqual(self.matrix.distance(1, 1), 0)
+        self.assertIsNone(self.matrix.distance(1, 4))
+
+    def test_incremental_update(self):
+        moved = self.matrix.with_branch(2, 56.8389, 60.6057, 1.0).without_branch(3)
+        rebuilt = BranchDistanceMatrix.from_rows([self.rows[0], (2, 56.8389, 60.6057, 1.0)])
+
+        self.assertNotIn(3, moved)
+        self.assertAlmostEqual(moved.distance(1, 2), rebuilt.distance(1, 2), places=2)
+        self.assertAlmostEqual(moved.distance(2, 1), rebuilt.distance(2, 1), places=2)
+
+    def test_bytes(self):
+        restored = BranchDistanceMatrix.from_bytes(self.matrix.to_bytes())
+        self.assertEqual(restored.to_dict(), self.matrix.to_dict())
+
+
+class PermissionMatrixTests(SimpleTestCase):
+    module_names = ("module_admin", "module_report", "module_tasks")
+
+    def test_merge_roles(self):
+        roles = [("003", None, "002"), ("002", "", "999")]
+        self.assertEqual(merge_roles(roles, self.module_names), {"module_admin": 2, "module_tasks": 2})
+
+    def test_local_cache(self):
+        cache = PermissionMatrixCache(local_ttl=60, local_max_size=1)
+        cache._remember(1, PermissionMatrix(profile_id=1, company_id=1, modules={"module_admin": 1}))
+        self.assertEqual(cache.get(1).get_level("module_admin"), 1)
+        self.assertIsNone(cache.get(1).get_level("module_report"))
+
+        cache._remember(2, PermissionMatrix(profile_id=2))
+        self.assertNotIn(1, cache._local)
+
+
+class PermissionMatrixInvalidationTests(TestCase):
+    def test_invalidated_after_commit(self):
+        owner = User.objects.create_user(email="owner@mail.ru", password="123456qw")
+        company = Company.objects.create(profile=owner.profile, name="owner")
+        user = User.objects.create_user(email="manager@mail.ru", password="123456qw")
+        manager = Manager.objects.create(profile=user.profile, company=company)
+        role = Role.objects.create(name="role", company=company)
+
+        PERMISSION_MATRIX_CACHE._remember(user.pk, PermissionMatrix())
+        with self.captureOnCommitCallbacks() as callbacks:
+            manager.roles.clear()
+            manager.roles.add(role)
+            # до коммита старая матрица не сбрасывается
+            self.assertIn(user.pk, PERMISSION_MATRIX_CACHE._local)
+
+        for callback in callbacks:
+            callback()
+        self.assertNotIn(user.pk, PERMISSION_MATRIX_CACHE._local)
+
+
+class PrincipalTests(TestCase):
+    def test_loaded_once_per_request(self):
+        user = User.objects.create_user(email="owner@mail.ru", password="123456qw")
+        company = Company.objects.create(profile=user.profile, name="owner")
+
+        request = RequestFactory().get("/")
+        request.user = User.objects.get(pk=user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_company_from_request(request), company)
+            self.assertEqual(get_profile_in_request(request).pk, user.profile.pk)
+            self.assertIsNone(get_manager(request))
+            self.assertEqual(request.user.profile.company, company)
+
+    def test_manager_roles_are_lazy(self):
+        owner = User.objects.create_user(email="owner@mail.ru", password="123456qw")
+        company = Company.objects.create(profile=owner.profile, name="owner")
+        user = User.objects.create_user(email="manager@mail.ru", password="123456qw")
+        manager = Manager.objects.create(profile=user.profile, company=company)
+        manager.roles.add(Role.objects.create(name="role", company=company))
+
+        request = RequestFactory().get("/")
+        request.user = User.objects.get(pk=user.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_manager(request), manager)
+            self.assertEqual(get_company_from_request(request), company)
+
+        with self.assertNumQueries(1):
+            self.assertEqual([role.name for role in get_principal(request).roles], ["role"])
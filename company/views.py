@@ -4,6 +4,7 @@ from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
 from rest_framework.generics import GenericAPIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
@@ -13,10 +14,14 @@ from company.models import Company, Branch, Role, Manager
 from company.permissions import ManagerCompanyPermission, ManagerRoleCompanyPermission
 from company.serializers import CompanySerializer, RoleSerializer, ManagerSerializer, \
     PublicCompanySerializer, CompanyINNSerializer
+from company.services.branch_distances import get_branch_distance_matrix
+from company.services.branch_proximity import BRANCH_PROXIMITY
 from company.services.company_data_inn import get_company_data_from_inn
+from core.pagination import CursorOptInPagination
 from core.permissions.manager import get_company_from_request
 from core.utils import get_profile_in_request
 from employee.serializers import BranchSerializer
+from geo_city.serializers import ProximityQuerySerializer
 from profiles.models import TypeUser
 
 
@@ -236,6 +241,53 @@ class BranchViewSet(
         branch.delete()
         return Response({}, status=status.HTTP_200_OK)
 
+    @action(methods=['get'], detail=False)
+    def nearest(self, request):
+        company = get_company_from_request(request)
+        self.check_object_permissions(request, company)
+
+        query = ProximityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        found = BRANCH_PROXIMITY.within(
+            query.validated_data["lat"],
+            query.validated_data["lng"],
+            query.validated_data["radius_km"],
+            company_id=company.pk,
+        )
+
+        page = self.paginate_queryset(found)
+        branches = self.get_queryset().filter(company__pk=company.pk).in_bulk([pk for pk, _ in page])
+
+        result = []
+        for pk, distance in page:
+            if pk in branches:
+                result.append({**self.serializer_class(branches[pk]).data, "distance_km": round(distance, 3)})
+        return self.get_paginated_response(result)
+
+    @action(methods=['get'], detail=False)
+    def distances(self, request):
+        company = get_company_from_request(request)
+        self.check_object_permissions(request, company)
+
+        matrix = get_branch_distance_matrix(company.pk)
+
+        ids = request.query_params.get("ids")
+        if ids:
+            try:
+                ids = [int(pk) for pk in ids.split(",") if pk]
+            except ValueError:
+                return Response({'errors': {
+                    "detail": [_('Invalid branch ids.')]
+                }}, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response({
+                "branches": ids,
+                "distances": [[matrix.distance(from_pk, to_pk) for to_pk in ids] for from_pk in ids],
+            }, status=status.HTTP_200_OK)
+
+        return Response(matrix.to_dict(), status=status.HTTP_200_OK)
+
 
 class RoleCompanyViewSet(
     mixins.ListModelMixin,
@@ -436,6 +488,8 @@ class PublicCompanyViewSet(
     permission_classes = (AllowAny, )
     serializer_class = PublicCompanySerializer
     filter_backends = (CompanyFilterBackend, )
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("id",)
 
     def get_queryset(self):
         queryset = self.queryset.select_related('address',)
@@ -2,7 +2,24 @@ from dataclasses import dataclass, asdict
 
 from django.conf import settings
 
+from core.app_services.resilience import ResilientEndpoint, ProviderUnavailable, unavailable_response
+from core.app_services.single_flight import SingleFlight
+from core.app_services.suggestion_cache import SuggestionCache, cached_response
 from core.base_api import REQUEST
+from geo_city.services.normalize import normalize_query, normalize_text, coordinate_cell
+
+ADDRESS_CACHE = SuggestionCache("dadata_address")
+GEOLOCATE_CACHE = SuggestionCache("dadata_geolocate")
+
+INN_FLIGHT = SingleFlight("dadata_party")
+ADDRESS_FLIGHT = SingleFlight("dadata_address")
+GEOLOCATE_FLIGHT = SingleFlight("dadata_geolocate")
+BANK_FLIGHT = SingleFlight("dadata_bank")
+
+INN_ENDPOINT = ResilientEndpoint("dadata_party")
+ADDRESS_ENDPOINT = ResilientEndpoint("dadata_address")
+GEOLOCATE_ENDPOINT = ResilientEndpoint("dadata_geolocate")
+BANK_ENDPOINT = ResilientEndpoint("dadata_bank")
 
 
 @dataclass
@@ -12,20 +29,35 @@ class Point:
     radius_meters: float = 50
 
 
+def address_cache_key(city_name: str, street: str) -> str:
+    return normalize_query(f"{city_name} {street}")
+
+
+def geolocate_cache_key(gps: Point) -> str:
+    return f"{coordinate_cell(gps.lat, gps.lon)}:{gps.radius_meters}"
+
+
 async def find_by_inn(inn: str):
     url = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/findById/party"
     token = settings.DADATA_API_KEY
 
-    data = await REQUEST.arequest_post(url, headers={
-        "Content-Type": "application/json",
-        "Accept": "application/json",
-        "Authorization": f"Token {token}"
-    }, json={
-        "query": inn,
-        "branch_type": "MAIN",
-    })
+    if INN_ENDPOINT.is_open:
+        return unavailable_response()
 
-    return data
+    async def request():
+        return await INN_ENDPOINT.call(lambda: REQUEST.arequest_post(url, headers={
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Token {token}"
+        }, json={
+            "query": inn,
+            "branch_type": "MAIN",
+        }))
+
+    try:
+        return await INN_FLIGHT.do(inn.strip(), request)
+    except ProviderUnavailable:
+        return unavailable_response()
 
 
 async def find_city_address(city_name: str, street: str):
@@ -33,15 +65,32 @@ async def find_city_address(city_name: str, street: str):
     token = settings.DADATA_API_KEY
     secret = settings.DADATA_SECRET
 
-    data = await REQUEST.arequest_post(url, headers={
-        "Content-Type": "application/json",
-        'Authorization': f"Token {token}",
-        'X-Secret': secret,
-    }, json={
-        "query": f"{city_name} {street}"
-    })
+    cache_key = address_cache_key(city_name, street)
+    cached = ADDRESS_CACHE.get(cache_key)
+    if cached is not None:
+        return cached_response(cached)
+
+    if ADDRESS_ENDPOINT.is_open:
+        return unavailable_response()
 
-    return data
+    async def request():
+        data = await ADDRESS_ENDPOINT.call(lambda: REQUEST.arequest_post(url, headers={
+            "Content-Type": "application/json",
+            'Authorization': f"Token {token}",
+            'X-Secret': secret,
+        }, json={
+            "query": f"{city_name} {street}"
+        }))
+
+        if data.is_success:
+            ADDRESS_CACHE.set(cache_key, data.json())
+
+        return data
+
+    try:
+        return await ADDRESS_FLIGHT.do(cache_key, request)
+    except ProviderUnavailable:
+        return unavailable_response()
 
 
 async def find_place(gps: Point):
@@ -49,13 +98,30 @@ async def find_place(gps: Point):
     token = settings.DADATA_API_KEY
     secret = settings.DADATA_SECRET
 
-    data = await REQUEST.arequest_post(url, headers={
-        "Content-Type": "application/json",
-        'Authorization': f"Token {token}",
-        'X-Secret': secret,
-    }, json=asdict(gps))
+    cache_key = geolocate_cache_key(gps)
+    cached = GEOLOCATE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached_response(cached)
+
+    if GEOLOCATE_ENDPOINT.is_open:
+        return unavailable_response()
 
-    return data
+    async def request():
+        data = await GEOLOCATE_ENDPOINT.call(lambda: REQUEST.arequest_post(url, headers={
+            "Content-Type": "application/json",
+            'Authorization': f"Token {token}",
+            'X-Secret': secret,
+        }, json=asdict(gps)))
+
+        if data.is_success:
+            GEOLOCATE_CACHE.set(cache_key, data.json())
+
+        return data
+
+    try:
+        return await GEOLOCATE_FLIGHT.do(cache_key, request)
+    except ProviderUnavailable:
+        return unavailable_response()
 
 
 async def find_bank(query: str):
@@ -63,12 +129,19 @@ async def find_bank(query: str):
     token = settings.DADATA_API_KEY
     secret = settings.DADATA_SECRET
 
-    data = await REQUEST.arequest_post(url, headers={
-        "Content-Type": "application/json",
-        'Authorization': f"Token {token}",
-        'X-Secret': secret,
-    }, json={
-        "query": query
-    })
-
-    return data
+    if BANK_ENDPOINT.is_open:
+        return unavailable_response()
+
+    async def request():
+        return await BANK_ENDPOINT.call(lambda: REQUEST.arequest_post(url, headers={
+            "Content-Type": "application/json",
+            'Authorization': f"Token {token}",
+            'X-Secret': secret,
+        }, json={
+            "query": query
+        }))
+
+    try:
+        return await BANK_FLIGHT.do(normalize_text(query), request)
+    except ProviderUnavailable:
+        return unavailable_response()
@@ -0,0 +1,67 @@
+import threading
+from importlib.util import find_spec
+from typing import Dict, Union
+
+import httpx
+from django.conf import settings
+
+HTTP_CLIENT_POOL = getattr(settings, "HTTP_CLIENT_POOL", {})
+
+# Общий лимит соединений одного клиента (клиент создаётся на каждый хост)
+MAX_CONNECTIONS_PER_HOST = HTTP_CLIENT_POOL.get("max_connections_per_host", 20)
+MAX_KEEPALIVE_CONNECTIONS = HTTP_CLIENT_POOL.get("max_keepalive_connections", 10)
+KEEPALIVE_EXPIRY = HTTP_CLIENT_POOL.get("keepalive_expiry", 30)
+# HTTP/2 включается только при установленном пакете h2 (httpx[http2])
+HTTP2 = HTTP_CLIENT_POOL.get("http2", True) and find_spec("h2") is not None
+
+
+class HttpClientPool:
+    """
+    Pool of long-lived httpx clients.
+
+    One client per host, so keep-alive connections and the per-host
+    connection cap are shared by every call to that host. There are no
+    async clients: every async view runs in its own async_to_sync loop and
+    an AsyncClient can not outlive its loop, so async callers run the sync
+    client in a worker thread (see BaseRequestsAPI).
+    """
+    def __init__(self, max_connections: int = MAX_CONNECTIONS_PER_HOST,
+                 max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = KEEPALIVE_EXPIRY, http2: bool = HTTP2):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._clients: Dict[str, httpx.Client] = {}
+
+    @staticmethod
+    def get_host_key(url: Union[str, httpx.URL]) -> str:
+        _url = httpx.URL(url)
+        return f"{_url.scheme}://{_url.host}:{_url.port or ''}"
+
+    def get_client(self, url: Union[str, httpx.URL]) -> httpx.Client:
+        key = self.get_host_key(url)
+        client = self._clients.get(key)
+        if client and not client.is_closed:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if not client or client.is_closed:
+                client = httpx.Client(limits=self.limits, http2=self.http2)
+                self._clients[key] = client
+
+        return client
+
+    def close(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+
+        for client in clients.values():
+            client.close()
+
+
+HTTP_CLIENTS = HttpClientPool()
@@ -0,0 +1,48 @@
+import time
+from typing import Iterable, List, Tuple, Type, Union
+
+import redis
+from django.db import models
+
+from core.app_services.redis_service import REDIS_SERVICE
+
+KEY_PREFIX = "model_version"
+
+
+class ModelVersions:
+    """
+    Change counters of reference models in Redis: a hash per model with the
+    version number and the time (unix) of the last change. Bumped by the
+    post_save/post_delete signals of the apps.
+    """
+    @staticmethod
+    def get_key(model: Type[models.Model]) -> str:
+        return f"{KEY_PREFIX}:{model._meta.label_lower}"
+
+    def bump(self, model: Type[models.Model]):
+        key = self.get_key(model)
+        try:
+            pipe = REDIS_SERVICE.get_redis().pipeline()
+            pipe.hincrby(key, "version", 1)
+            pipe.hset(key, "modified", int(time.time()))
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def get(self, model_list: Iterable[Type[models.Model]]) -> Union[List[Tuple[int, int]], None]:
+        """
+        (version, last change time) of every model, None when Redis is
+        unavailable. A model that has never changed is (0, 0).
+        """
+        try:
+            pipe = REDIS_SERVICE.get_redis().pipeline()
+            for model in model_list:
+                pipe.hmget(self.get_key(model), "version", "modified")
+            values = pipe.execute()
+        except redis.RedisError:
+            return None
+
+        return [(int(version or 0), int(modified or 0)) for (version, modified) in values]
+
+
+MODEL_VERSIONS = ModelVersions()
@@ -26,10 +26,10 @@ class RedisService:
         self.r = redis.Redis(db=1)
 
     def get_redis(self) -> redis.Redis:
-        if self.r.ping():
-            return self.r
+        # пул соединений сам переподключается, ping на каждый вызов - лишний round-trip
+        if self.r is None:
+            self.connect()
 
-        self.connect()
         return self.r
 
     def delete(self, key):
@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Union
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+PROVIDER_RESILIENCE = getattr(settings, "PROVIDER_RESILIENCE", {})
+
+# Одновременных запросов к одному методу провайдера из воркера
+MAX_CONCURRENCY = PROVIDER_RESILIENCE.get("max_concurrency", 20)
+# Сколько ждать свободного слота, прежде чем отказать
+ACQUIRE_TIMEOUT = PROVIDER_RESILIENCE.get("acquire_timeout", 1)
+# Общий срок запроса вместе с хеджированием
+CALL_TIMEOUT = PROVIDER_RESILIENCE.get("call_timeout", 8)
+# Подряд неудачных запросов до размыкания
+FAILURE_THRESHOLD = PROVIDER_RESILIENCE.get("failure_threshold", 5)
+# Сколько секунд разомкнутый выключатель отказывает без запроса к провайдеру
+OPEN_SECONDS = PROVIDER_RESILIENCE.get("open_seconds", 30)
+# Повторный запрос, если ответа нет дольше этого перцентиля задержек; None - без хеджирования
+HEDGE_PERCENTILE = PROVIDER_RESILIENCE.get("hedge_percentile", None)
+HEDGE_MIN_SAMPLES = PROVIDER_RESILIENCE.get("hedge_min_samples", 20)
+LATENCY_WINDOW = 200
+
+FALLBACK_HEADER = "X-Provider-Fallback"
+
+
+class ProviderUnavailable(httpx.TransportError):
+    """
+    The provider was not called or did not answer in time: the circuit is
+    open, there is no free slot or the call timed out.
+    """
+
+
+def unavailable_response() -> httpx.Response:
+    """
+    Empty answer that callers treat as "not found", marked so they can
+    switch to local data.
+    """
+    return httpx.Response(503, json={"suggestions": []}, headers={FALLBACK_HEADER: "1"})
+
+
+def is_unavailable(response: httpx.Response) -> bool:
+    return response.headers.get(FALLBACK_HEADER) == "1"
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold failures in a row. While open
+    every call fails fast; once per open_seconds one trial call is let
+    through (half-open) and its result closes or reopens the circuit.
+    """
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: Union[float, None] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.open_seconds
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+
+        if self.is_open:
+            return False
+
+        # полуоткрыт: пропускаем пробный запрос, следующий - не раньше чем через open_seconds
+        self.opened_at = time.monotonic()
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class AcquireState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.acquired = False
+        self.abandoned = False
+
+
+class ProcessSemaphore:
+    """
+    Concurrency bound shared by all event loops of the process: every async
+    view runs in its own async_to_sync loop, so an asyncio.Semaphore would
+    only bound a single request. A busy slot is waited for in a worker
+    thread; a slot taken after the waiter was cancelled is given back.
+    """
+    def __init__(self, value: int):
+        self._semaphore = threading.BoundedSemaphore(value)
+
+    def try_acquire(self) -> bool:
+        return self._semaphore.acquire(blocking=False)
+
+    def _wait(self, timeout: float, state: AcquireState) -> bool:
+        acquired = self._semaphore.acquire(timeout=timeout)
+        with state.lock:
+            if acquired and state.abandoned:
+                self._semaphore.release()
+                return False
+            state.acquired = acquired
+        return acquired
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.try_acquire():
+            return True
+
+        state = AcquireState()
+        try:
+            return await sync_to_async(self._wait, thread_sensitive=False)(timeout, state)
+        except asyncio.CancelledError:
+            with state.lock:
+                state.abandoned = True
+                if state.acquired:
+                    self._semaphore.release()
+            raise
+
+    def release(self):
+        self._semaphore.release()
+
+
+class ResilientEndpoint:
+    """
+    Guards calls to one provider endpoint: a circuit breaker, a
+    process-wide semaphore bounding concurrent calls, an overall timeout and optional
+    hedging (a second identical call when the first one is slower than the
+    given latency percentile; the first answer wins).
+
+    Only idempotent calls may be hedged.
+    """
+    def __init__(self, name: str, max_concurrency: int = MAX_CONCURRENCY, acquire_timeout: float = ACQUIRE_TIMEOUT,
+                 call_timeout: float = CALL_TIMEOUT, hedge_percentile: Union[float, None] = HEDGE_PERCENTILE,
+                 breaker: CircuitBreaker = None):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.call_timeout = call_timeout
+        self.hedge_percentile = hedge_percentile
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.semaphore = ProcessSemaphore(max_concurrency)
+
+    @property
+    def is_open(self) -> bool:
+        return self.breaker.is_open
+
+    def get_hedge_delay(self) -> Union[float, None]:
+        if self.hedge_percentile is None or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.hedge_percentile))]
+
+    async def call(self, func: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Raises ProviderUnavailable instead of waiting for a failing provider.
+        A 5xx answer or a transport error counts as a failure.
+        """
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name}: circuit open")
+
+        semaphore = self.semaphore
+        if not await semaphore.acquire(self.acquire_timeout):
+            raise ProviderUnavailable(f"{self.name}: too many concurrent requests")
+
+        started_at = time.monotonic()
+        try:
+            response = await asyncio.wait_for(self._hedged(func, semaphore), self.call_timeout)
+
+        except (asyncio.TimeoutError, httpx.TransportError) as e:
+            self.breaker.record_failure()
+            raise ProviderUnavailable(f"{self.name}: {e!r}")
+
+        finally:
+            semaphore.release()
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latencies.append(time.monotonic() - started_at)
+
+        return response
+
+    async def _hedged(self, func: Callable[[], Awaitable[httpx.Response]],
+                      semaphore: ProcessSemaphore) -> httpx.Response:
+        delay = self.get_hedge_delay()
+        first = asyncio.ensure_future(func())
+        if delay is None:
+            return await first
+
+        tasks = {first}
+        hedge_acquired = False
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            # второй запрос только если есть свободный слот
+            if not done and semaphore.try_acquire():
+                hedge_acquired = True
+                tasks.add(asyncio.ensure_future(func()))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            if hedge_acquired:
+                semaphore.release()
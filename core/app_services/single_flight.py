@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Dict, Callable, Awaitable, TypeVar, Union
+
+import httpx
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.app_services.redis_service import REDIS_SERVICE
+
+SINGLE_FLIGHT = getattr(settings, "SINGLE_FLIGHT", {})
+
+# Время жизни блокировки лидера должно быть больше таймаута запроса
+SINGLE_FLIGHT_LOCK_TTL = SINGLE_FLIGHT.get("lock_ttl", 35)
+SINGLE_FLIGHT_WAIT_TIMEOUT = SINGLE_FLIGHT.get("wait_timeout", 35)
+SINGLE_FLIGHT_RESULT_TTL = SINGLE_FLIGHT.get("result_ttl", 5)
+# Как часто (сек) ожидающий проверяет, жива ли блокировка лидера
+SINGLE_FLIGHT_LOCK_CHECK_INTERVAL = SINGLE_FLIGHT.get("lock_check_interval", 0.5)
+
+# Сообщение лидера о неудаче: ожидающие выполняют запрос сами
+FAILED_MESSAGE = ""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+T = TypeVar("T")
+
+
+def encode_response(response: httpx.Response) -> str:
+    return json.dumps({"status_code": response.status_code, "content": response.text})
+
+
+def decode_response(data: str) -> httpx.Response:
+    _data = json.loads(data)
+    return httpx.Response(_data["status_code"], content=_data["content"].encode())
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls.
+
+    Inside the process callers with the same key await one future, whatever
+    event loop they run in. Between workers the first caller takes a Redis
+    lock, the others block on the key channel until the result is published.
+    """
+    def __init__(self, namespace: str,
+                 encode: Callable[[T], str] = encode_response,
+                 decode: Callable[[str], T] = decode_response,
+                 lock_ttl: int = SINGLE_FLIGHT_LOCK_TTL,
+                 wait_timeout: float = SINGLE_FLIGHT_WAIT_TIMEOUT,
+                 result_ttl: int = SINGLE_FLIGHT_RESULT_TTL):
+        self.namespace = namespace
+        self.encode = encode
+        self.decode = decode
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.result_ttl = result_ttl
+        self._release_script = None
+        # у каждого async-запроса свой event loop, поэтому future общий для потоков процесса
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._calls[key] = Future()
+
+        if not is_leader:
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            result = await self._do_shared(key, func)
+
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        else:
+            future.set_result(result)
+            return result
+
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    async def _do_shared(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        _hash = hashlib.md5(key.encode()).hexdigest()
+        lock_key = f"single_flight:{self.namespace}:{_hash}:lock"
+        result_key = f"single_flight:{self.namespace}:{_hash}:result"
+        channel = f"single_flight:{self.namespace}:{_hash}:channel"
+        token = uuid.uuid4().hex
+
+        try:
+            r = REDIS_SERVICE.get_redis()
+            is_leader = r.set(lock_key, token, nx=True, ex=self.lock_ttl)
+        except redis.RedisError:
+            return await func()
+
+        if not is_leader:
+            data = await sync_to_async(self._wait, thread_sensitive=False)(r, lock_key, result_key, channel)
+            if data:
+                return self.decode(data)
+
+            return await func()
+
+        try:
+            result = await func()
+
+        except BaseException:
+            self._publish(r, lock_key, token, channel)
+            raise
+
+        self._publish(r, lock_key, token, channel, result_key, self.encode(result))
+        return result
+
+    def _publish(self, r: redis.Redis, lock_key: str, token: str, channel: str,
+                 result_key: str = None, data: str = FAILED_MESSAGE):
+        try:
+            if not self._release_script:
+                self._release_script = r.register_script(RELEASE_SCRIPT)
+
+            pipe = r.pipeline()
+            if result_key:
+                pipe.set(result_key, data, ex=self.result_ttl)
+            pipe.publish(channel, data)
+            pipe.execute()
+            self._release_script(keys=[lock_key], args=[token], client=r)
+        except redis.RedisError:
+            pass
+
+    def _wait(self, r: redis.Redis, lock_key: str, result_key: str, channel: str) -> Union[str, None]:
+        """
+        Blocks on the channel until the leader publishes, gives up when the
+        leader's lock disappears without a result or wait_timeout passes.
+        """
+        try:
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(channel)
+        except redis.RedisError:
+            return None
+
+        try:
+            # результат мог быть опубликован до подписки
+            data = r.get(result_key)
+            if data:
+                return data.decode()
+
+            deadline = time.monotonic() + self.wait_timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                message = pubsub.get_message(timeout=min(remaining, SINGLE_FLIGHT_LOCK_CHECK_INTERVAL))
+                if message and message["type"] == "message":
+                    return message["data"].decode() or None
+
+                if not message and not r.exists(lock_key):
+                    # лидер завершился, не опубликовав результат
+                    data = r.get(result_key)
+                    return data.decode() if data else None
+
+        except redis.RedisError:
+            return None
+
+        finally:
+            try:
+                pubsub.close()
+            except redis.RedisError:
+                pass
+
+        return None
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import time
+from typing import Dict, Union, Any
+
+import httpx
+import redis
+from django.conf import settings
+
+from core.app_services.redis_service import REDIS_SERVICE
+
+SUGGESTION_CACHE = getattr(settings, "SUGGESTION_CACHE", {})
+
+SUGGESTION_CACHE_TTL = SUGGESTION_CACHE.get("ttl", 60 * 60 * 24)
+SUGGESTION_CACHE_MAX_SIZE = SUGGESTION_CACHE.get("max_size", 50000)
+
+# KEYS: value, lru zset, hits, misses; ARGV: now
+GET_SCRIPT = """
+local value = redis.call('GET', KEYS[1])
+if value then
+    redis.call('ZADD', KEYS[2], ARGV[1], KEYS[1])
+    redis.call('INCR', KEYS[3])
+else
+    redis.call('ZREM', KEYS[2], KEYS[1])
+    redis.call('INCR', KEYS[4])
+end
+return value
+"""
+
+# KEYS: value, lru zset; ARGV: data, ttl, now, max size
+SET_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+local overflow = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if overflow > 0 then
+    local old_keys = redis.call('ZRANGE', KEYS[2], 0, overflow - 1)
+    for _, key in ipairs(old_keys) do
+        redis.call('DEL', key)
+    end
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, overflow - 1)
+end
+return overflow
+"""
+
+
+class SuggestionCache:
+    """
+    Redis cache of external API answers with TTL and LRU eviction
+    when the namespace grows beyond max_size keys.
+    Redis errors are treated as a cache miss.
+    """
+    def __init__(self, namespace: str, ttl: int = SUGGESTION_CACHE_TTL, max_size: int = SUGGESTION_CACHE_MAX_SIZE):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lru_key = f"suggestions:{namespace}:__lru"
+        self.hits_key = f"suggestions:{namespace}:__hits"
+        self.misses_key = f"suggestions:{namespace}:__misses"
+        self._get_script = None
+        self._set_script = None
+
+    def make_key(self, key: str) -> str:
+        return f"suggestions:{self.namespace}:{hashlib.md5(key.encode()).hexdigest()}"
+
+    def get(self, key: str) -> Union[Any, None]:
+        try:
+            r = REDIS_SERVICE.get_redis()
+            if not self._get_script:
+                self._get_script = r.register_script(GET_SCRIPT)
+
+            _json = self._get_script(
+                keys=[self.make_key(key), self.lru_key, self.hits_key, self.misses_key],
+                args=[time.time()],
+                client=r,
+            )
+        except redis.RedisError:
+            return None
+
+        if not _json:
+            return None
+
+        return json.loads(_json)
+
+    def contains(self, key: str) -> bool:
+        """
+        Whether the key is cached, without touching the LRU order and stats.
+        """
+        try:
+            return bool(REDIS_SERVICE.get_redis().exists(self.make_key(key)))
+        except redis.RedisError:
+            return False
+
+    def set(self, key: str, data: Any):
+        try:
+            r = REDIS_SERVICE.get_redis()
+            if not self._set_script:
+                self._set_script = r.register_script(SET_SCRIPT)
+
+            self._set_script(
+                keys=[self.make_key(key), self.lru_key],
+                args=[json.dumps(data), self.ttl, time.time(), self.max_size],
+                client=r,
+            )
+        except redis.RedisError:
+            pass
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        r = REDIS_SERVICE.get_redis()
+        hits, misses = r.mget(self.hits_key, self.misses_key)
+        hits, misses = int(hits or 0), int(misses or 0)
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size": r.zcard(self.lru_key),
+        }
+
+    def reset_stats(self):
+        REDIS_SERVICE.get_redis().delete(self.hits_key, self.misses_key)
+
+
+def cached_response(data: Any) -> httpx.Response:
+    return httpx.Response(200, json=data)
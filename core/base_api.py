@@ -4,7 +4,7 @@ from typing import Union, Dict
 
 from django.utils.decorators import method_decorator
 from django.core.exceptions import PermissionDenied
-from asgiref.sync import async_to_sync
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
 
 from rest_framework import status
@@ -14,6 +14,8 @@ from rest_framework.views import APIView
 
 import httpx
 
+from core.app_services.http_client import HTTP_CLIENTS
+
 ctx = ssl.create_default_context()
 ctx.check_hostname = False
 ctx.verify_mode = ssl.CERT_NONE
@@ -32,22 +34,26 @@ class BaseProxyApi:
 
 class BaseRequestsAPI:
     timeout = (20, 30)
-    
+
+    def get_timeout(self) -> httpx.Timeout:
+        connect, read = self.timeout
+        return httpx.Timeout(read, connect=connect)
+
     async def arequest_post(self, url, headers={}, json=None, data=None):
-        async with httpx.AsyncClient(timeout=self.timeout, headers=headers) as client:
-            return await client.post(url, json=json, data=data)
+        # пул соединений общий с синхронными запросами, запрос идёт в отдельном потоке
+        return await sync_to_async(self.request_post, thread_sensitive=False)(url, headers=headers, json=json,
+                                                                              data=data)
 
     def request_post(self, url,  headers={}, json=None, data=None):
-        with httpx.Client(timeout=self.timeout, headers=headers) as client:
-            return client.post(url, json=json, data=data)
-        
+        client = HTTP_CLIENTS.get_client(url)
+        return client.post(url, headers=headers, json=json, data=data, timeout=self.get_timeout())
+
     async def arequest_get(self, url, headers={}, params={}):
-        async with httpx.AsyncClient(timeout=self.timeout, headers=headers, params=params) as client:
-            return await client.get(url)
+        return await sync_to_async(self.request_get, thread_sensitive=False)(url, headers=headers, params=params)
 
     def request_get(self, url, headers={}, params={}):
-        with httpx.Client(timeout=self.timeout, headers=headers, params=params) as client:
-            return client.get(url)
+        client = HTTP_CLIENTS.get_client(url)
+        return client.get(url, headers=headers, params=params, timeout=self.get_timeout())
         
     def get_errors(self, response) -> Union[dict, None]:
         if response.get("errors") and len(response["errors"]) > 0:
@@ -0,0 +1,103 @@
+import hashlib
+from typing import Callable, Sequence, Type
+
+import redis
+from django.conf import settings
+from django.db import models
+from django.http import HttpResponse
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.app_services.model_versions import MODEL_VERSIONS
+from core.app_services.redis_service import REDIS_SERVICE
+
+# Сколько секунд хранить отрендеренный ответ списка
+CONDITIONAL_CACHE_TIMEOUT = getattr(settings, "CONDITIONAL_CACHE_TIMEOUT", 60 * 60)
+
+KEY_PREFIX = "conditional_response"
+
+
+class ConditionalListMixin:
+    """
+    list() of read-only reference data with validation caching.
+
+    The weak ETag and Last-Modified come from the versions of
+    `versioned_models` (see core.app_services.model_versions): a matching
+    If-None-Match / If-Modified-Since gets 304 without touching the
+    database. A JSON payload is rendered once per version and query string
+    and served from Redis until one of the models changes.
+    """
+    versioned_models: Sequence[Type[models.Model]] = ()
+    cache_timeout = CONDITIONAL_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalListMixin, self).list(
+            request, *args, **kwargs
+        ))
+
+    def conditional_response(self, request, get_response: Callable[[], Response]):
+        """
+        get_response builds the uncached list response.
+        """
+        versions = MODEL_VERSIONS.get(self.versioned_models)
+        if versions is None:
+            return get_response()
+
+        digest = hashlib.sha1(repr([version for (version, _) in versions]).encode()).hexdigest()[:16]
+        etag = f'W/"{digest}"'
+        last_modified = max((modified for (_, modified) in versions), default=0)
+
+        if self.is_not_modified(request, digest, last_modified):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            return self.set_validators(response, etag, last_modified)
+
+        if not isinstance(request.accepted_renderer, JSONRenderer):
+            return self.set_validators(get_response(), etag, last_modified)
+
+        key = self.get_cache_key(request, digest)
+        try:
+            payload = REDIS_SERVICE.get_redis().get(key)
+        except redis.RedisError:
+            payload = None
+
+        if payload is None:
+            response = get_response()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+            payload = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            try:
+                REDIS_SERVICE.get_redis().set(key, payload, self.cache_timeout)
+            except redis.RedisError:
+                pass
+
+        response = HttpResponse(payload, content_type=f"{request.accepted_media_type}; charset=utf-8")
+        return self.set_validators(response, etag, last_modified)
+
+    @staticmethod
+    def is_not_modified(request, digest: str, last_modified: int) -> bool:
+        if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+        if if_none_match:
+            # слабое сравнение: W/"x" и "x" совпадают
+            etags = parse_etags(if_none_match)
+            return "*" in etags or f'"{digest}"' in (etag.replace("W/", "", 1) for etag in etags)
+
+        if_modified_since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+        return bool(last_modified and if_modified_since and last_modified <= if_modified_since)
+
+    def get_cache_key(self, request, digest: str) -> str:
+        query = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+        return f"{KEY_PREFIX}:{self.__class__.__name__}:{request.accepted_media_type}:{digest}:{query}"
+
+    @staticmethod
+    def set_validators(response, etag: str, last_modified: int):
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        # клиент всегда перепроверяет, ответ на проверку - 304 без тела
+        response["Cache-Control"] = "no-cache"
+        return response
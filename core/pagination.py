@@ -0,0 +1,190 @@
+import base64
+import json
+from typing import Any, List, Sequence, Type, Union
+
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Model, Q, QuerySet
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+CURSOR_QUERY_PARAM = "cursor"
+
+# значения ключа, которые могут прийти в курсоре (JSON true/false - тоже int, но не ключ)
+CURSOR_VALUE_TYPES = (str, int, float)
+
+
+def positive_int(value: str, cutoff: int = None) -> int:
+    """
+    Strictly positive integer from a query parameter, at most cutoff.
+    """
+    value = int(value)
+    if value <= 0:
+        raise ValueError
+    return min(value, cutoff) if cutoff else value
+
+
+def is_cursor_request(request) -> bool:
+    """
+    The client asked for keyset pagination: `?cursor=` (empty) is the first
+    page, the following pages come from the `next` links.
+    """
+    return CURSOR_QUERY_PARAM in request.query_params
+
+
+def encode_cursor(position: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(position)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Union[List[Any], None]:
+    if not cursor:
+        return None
+
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise NotFound(_('Invalid cursor'))
+
+    if not isinstance(position, list) or not all(
+        isinstance(value, CURSOR_VALUE_TYPES) and not isinstance(value, bool) for value in position
+    ):
+        raise NotFound(_('Invalid cursor'))
+    return position
+
+
+def get_ordering_field(model: Type[Model], path: str) -> Field:
+    """
+    Model field of an ordering entry, following `__` relations.
+    """
+    field = None
+    for name in path.split("__"):
+        field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def keyset_filter(ordering: Sequence[str], position: Sequence[Any]) -> Q:
+    """
+    Rows after `position` in ascending `ordering`:
+    (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+    """
+    condition = Q()
+    for index, field in enumerate(ordering):
+        equal = {ordering[i]: position[i] for i in range(index)}
+        condition |= Q(**equal, **{f"{field}__gt": position[index]})
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages over an indexed, non-null key (`view.cursor_ordering`, the last
+    field must be unique) with `WHERE key > last ORDER BY key LIMIT n`:
+    no OFFSET scan and no COUNT query, so every page costs the same.
+    Forward only.
+    """
+    cursor_query_param = CURSOR_QUERY_PARAM
+    limit_query_param = "limit"
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = 100
+    ordering = ("pk",)
+
+    def get_ordering(self, view) -> Sequence[str]:
+        return getattr(view, "cursor_ordering", self.ordering)
+
+    def get_limit(self, request) -> int:
+        try:
+            return positive_int(request.query_params[self.limit_query_param], cutoff=self.max_limit)
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def paginate_queryset(self, queryset: QuerySet, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        ordering = self.get_ordering(view)
+
+        position = decode_cursor(request.query_params.get(self.cursor_query_param))
+        if position is not None:
+            if len(position) != len(ordering):
+                raise NotFound(_('Invalid cursor'))
+            position = self.prepare_position(queryset.model, ordering, position)
+            queryset = queryset.filter(keyset_filter(ordering, position))
+
+        # лишняя строка показывает, есть ли следующая страница
+        page = list(queryset.order_by(*ordering)[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+
+        self.next_position = [self.get_value(page[-1], field) for field in ordering] if self.has_next else None
+        return page
+
+    @staticmethod
+    def prepare_position(model: Type[Model], ordering: Sequence[str], position: List[Any]) -> List[Any]:
+        """
+        Cursor values converted by their fields: a stale or edited cursor
+        with a value of the wrong type is a 404, not an error in the query.
+        """
+        values = []
+        for path, value in zip(ordering, position):
+            field = get_ordering_field(model, path)
+            try:
+                values.append(field.get_prep_value(field.to_python(value)))
+            except (ValueError, TypeError, ValidationError):
+                raise NotFound(_('Invalid cursor'))
+        return values
+
+    @staticmethod
+    def get_value(instance, field: str) -> Any:
+        for attr in field.split("__"):
+            instance = getattr(instance, attr)
+        return instance
+
+    def get_next_link(self) -> Union[str, None]:
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "results": data,
+        })
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Keyset pagination cursor, empty for the first page.",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class CursorOptInPagination(LimitOffsetPagination):
+    """
+    LimitOffsetPagination by default, KeysetPagination when the request has
+    the `cursor` parameter.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if is_cursor_request(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + \
+            self.keyset_class().get_schema_operation_parameters(view)
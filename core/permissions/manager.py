@@ -1,4 +1,4 @@
-from typing import Union, Any, Tuple
+from typing import Union
 
 from django.db import models
 from rest_framework import exceptions
@@ -6,7 +6,8 @@ from rest_framework.permissions import IsAuthenticated
 
 from authentication.models import User
 from company.models import PermissionEnum, Company, Manager
-from profiles.models import TypeUser
+from company.services.permission_matrix import PermissionMatrix, get_permission_matrix
+from core.permissions.principal import get_principal
 
 
 class ManagerPermission(IsAuthenticated):
@@ -18,50 +19,24 @@ class ManagerPermission(IsAuthenticated):
     }
     module_name: str = ""
 
-    def get_permission_module(self, user: User) -> Tuple[Union[int, None], Any]:
-        profile = getattr(user, "profile", None)
-        if not profile:
-            return None, None
-
-        if profile.user_type != TypeUser.MANAGER.value:
-            return None, None
-
-        manager = getattr(profile, "manager", None)
-        if not manager:
-            return None, None
+    def get_permission_module(self, user: User) -> Union[int, None]:
+        """
+        Effective level of module_name merged across the manager's roles,
+        None when no role grants it.
+        """
+        return get_permission_matrix(user.pk).get_level(self.module_name)
 
-        roles = manager.roles.all()
+    def is_super_user(self, matrix: PermissionMatrix, obj: models.Model) -> bool:
+        return matrix.profile_id is not None and matrix.profile_id == obj.profile_id
 
-        for _role in roles:
-            permission_module = getattr(_role, self.module_name, None)
-            if permission_module:
-                return int(permission_module), _role
-
-        return None, None
-
-    def is_super_user(self, request, obj: models.Model) -> bool:
-        profile = getattr(request.user, "profile", None)
-        if profile and profile.pk == obj.profile.pk:
-            return True
-
-        return False
-
-    def is_permission_obj(self, request, obj: models.Model) -> bool:
-        profile = getattr(request.user, "profile", None)
-        if not profile:
-            return False
-
-        manager = getattr(profile, "manager", None)
-        if not manager:
-            return False
-
-        return manager.company.pk == obj.pk
+    def is_permission_obj(self, matrix: PermissionMatrix, obj: models.Model) -> bool:
+        return matrix.company_id is not None and matrix.company_id == obj.pk
 
     def has_permission(self, request, view) -> bool:
         if not request.user.is_authenticated:
             return False
 
-        profile = getattr(request.user, "profile", None)
+        profile = get_principal(request).profile
         if not profile:
             return False
 
@@ -72,14 +47,16 @@ class ManagerPermission(IsAuthenticated):
         return True
 
     def has_object_permission(self, request, view, obj) -> bool:
-        if self.is_super_user(request, obj):
+        # права менеджера собраны в одну матрицу, проверка - поиск в словаре
+        matrix = get_permission_matrix(request.user.pk)
+        if self.is_super_user(matrix, obj):
             return True
 
-        if not self.is_permission_obj(request, obj):
+        if not self.is_permission_obj(matrix, obj):
             return False
 
-        permission, role = self.get_permission_module(request.user)
-        if role is None:
+        permission = matrix.get_level(self.module_name)
+        if permission is None:
             return False
 
         method = request.method
@@ -90,29 +67,16 @@ class ManagerPermission(IsAuthenticated):
 
 
 def get_company_from_request(request) -> Company:
-    profile = getattr(request.user, "profile", None)
-    if not profile:
+    principal = get_principal(request)
+    if not principal.profile:
         raise exceptions.PermissionDenied(None, None)
 
-    if profile:
-        company = getattr(profile, "company", None)
-        if company:
-            return company
-
-    manager = getattr(profile, "manager", None)
-    if manager:
-        company = getattr(manager, "company", None)
-        if company:
-            return company
+    company = principal.company
+    if company:
+        return company
 
     raise exceptions.PermissionDenied(None, None)
 
 
 def get_manager(request) -> Union[Manager, None]:
-    profile = getattr(request.user, "profile", None)
-    if not profile:
-        return None
-
-    manager = getattr(profile, "manager", None)
-
-    return manager
+    return get_principal(request).manager
@@ -0,0 +1,78 @@
+from typing import List, Union
+
+from django.db import models
+from django.utils.functional import cached_property
+
+REQUEST_ATTRIBUTE = "_principal"
+
+
+class Principal:
+    """
+    Profile of the request user with its company, manager and notification
+    settings, read in one query. The roles are queried on first access:
+    permission checks use the PermissionMatrix and do not need them.
+    """
+    def __init__(self, user_id: Union[int, None], profile: Union[models.Model, None]):
+        self.user_id = user_id
+        self.profile = profile
+
+    @cached_property
+    def own_company(self) -> Union[models.Model, None]:
+        return getattr(self.profile, "company", None)
+
+    @cached_property
+    def manager(self) -> Union[models.Model, None]:
+        return getattr(self.profile, "manager", None)
+
+    @cached_property
+    def company(self) -> Union[models.Model, None]:
+        """
+        The company owned by the profile, else the company of the manager.
+        """
+        if self.own_company:
+            return self.own_company
+
+        return getattr(self.manager, "company", None)
+
+    @cached_property
+    def roles(self) -> List[models.Model]:
+        if not self.manager:
+            return []
+
+        return list(self.manager.roles.all())
+
+    @cached_property
+    def notification_settings(self) -> Union[models.Model, None]:
+        return getattr(self.manager, "notification_settings", None)
+
+
+def load_profile(user) -> Union[models.Model, None]:
+    from profiles.models import Profile
+
+    profile = Profile.objects.select_related(
+        "company", "manager", "manager__company", "manager__notification_settings",
+    ).filter(user_id=user.pk).first()
+
+    if profile is not None:
+        # дальнейшие request.user.profile.* берутся из уже загруженных объектов
+        user.profile = profile
+
+    return profile
+
+
+def get_principal(request) -> Principal:
+    """
+    Principal of the request, loaded on the first call and kept on the
+    underlying HttpRequest until the end of the request.
+    """
+    http_request = getattr(request, "_request", request)
+    user = request.user
+
+    principal = getattr(http_request, REQUEST_ATTRIBUTE, None)
+    if principal is not None and principal.user_id == user.pk:
+        return principal
+
+    profile = load_profile(user) if user.is_authenticated else None
+    principal = Principal(user.pk, profile)
+    setattr(http_request, REQUEST_ATTRIBUTE, principal)
+    return principal
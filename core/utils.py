@@ -5,6 +5,8 @@ from typing import Union
 
 from django.db import models
 
+from core.permissions.principal import get_principal
+
 DEFAULT_CHAR_STRING = string.ascii_lowercase + string.digits
 
 
@@ -20,8 +22,7 @@ def convert_timedelta_to_str(t: timedelta) -> str:
 
 
 def get_profile_in_request(request) -> Union[models.Model, None]:
-    profile = getattr(request.user, "profile", None)
-    return profile
+    return get_principal(request).profile
 
 
 def calc_value_minus_percent(value: Union[int, float], percent: Union[int, float]) -> float:
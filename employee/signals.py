@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.app_services.model_versions import MODEL_VERSIONS
+from employee.models import Skill, SkillLevel
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=SkillLevel)
+@receiver(post_delete, sender=SkillLevel)
+def bump_model_version(sender, instance, **kwargs):
+    MODEL_VERSIONS.bump(sender)
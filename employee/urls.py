@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from employee.views import EmployeeViewSet
+from employee.views import EmployeeViewSet, SkillViewSet, SkillLevelViewSet
 
 router = DefaultRouter(trailing_slash=True)
 
 router.register(r'employee', EmployeeViewSet)
+router.register(r'skill', SkillViewSet)
+router.register(r'skill-level', SkillLevelViewSet)
 
 
 urlpatterns = [
@@ -3,18 +3,61 @@ from django.shortcuts import render
 from pip._internal import req
 from rest_framework import generics, viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK
 from rest_framework.views import APIView
 
+from company.services.branch_proximity import get_nearest_employees
+from core.mixins.conditional_response import ConditionalListMixin
+from core.permissions.manager import get_company_from_request
+from geo_city.serializers import ProximityQuerySerializer
 from .models import *
-from .serializers import EmployeeSerializer
+from .serializers import EmployeeSerializer, SkillSerializer, SkillLevelSerializer
+
+
+class SkillViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Skill.objects.order_by("id")
+    permission_classes = (AllowAny,)
+    serializer_class = SkillSerializer
+    versioned_models = (Skill,)
+
+
+class SkillLevelViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = SkillLevel.objects.order_by("id")
+    permission_classes = (AllowAny,)
+    serializer_class = SkillLevelSerializer
+    versioned_models = (SkillLevel,)
 
 
 class EmployeeViewSet(viewsets.ModelViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
 
+    @action(methods=['get'], detail=False)
+    def nearest(self, request):
+        company = get_company_from_request(request)
+
+        query = ProximityQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        found = get_nearest_employees(
+            query.validated_data["lat"],
+            query.validated_data["lng"],
+            query.validated_data["radius_km"],
+            company_id=company.pk,
+        )
+
+        page = self.paginate_queryset(found)
+        employees = self.get_queryset().filter(favorite_branch__company__pk=company.pk)\
+            .in_bulk([pk for pk, _ in page])
+
+        result = []
+        for pk, distance in page:
+            if pk in employees:
+                result.append({**self.serializer_class(employees[pk]).data, "distance_km": round(distance, 3)})
+        return self.get_paginated_response(result)
+
 
     # @action(methods=['get'], detail=False)
     # def get_seniority(self, request):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GeoCityConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'geo_city'
+
+    def ready(self):
+        import geo_city.signals
@@ -1,9 +1,40 @@
 import operator
 from functools import reduce
+from typing import Iterable, List, Tuple
 
 from django.db.models import Q
 from rest_framework.filters import BaseFilterBackend
 
+from geo_city.models import City
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.normalize import normalize_text, strip_street_type
+from geo_city.services.street_fuzzy_index import STREET_FUZZY_INDEX
+
+# В скольких одноимённых городах искать улицу с опечаткой
+LIMIT_FUZZY_CITIES = 5
+
+
+def split_query(query: str) -> Tuple[str, List[str]]:
+    """
+    Query in the form of the `search_key` columns: the longest known city
+    name the query starts with ("" when there is none) and the rest of the
+    words, the street, place or address.
+    """
+    words = normalize_text(query).split()
+    size = CITY_INDEX.match_prefix(words)
+
+    # тип улицы убираем только из остатка: в названии города он может быть словом
+    rest = " ".join(words[size:])
+    return " ".join(words[:size]), (strip_street_type(rest) or rest).split()
+
+
+def get_fallback_filter(words: List[str], fields: Iterable[str]) -> Q:
+    """
+    OR-ed icontains of every word over the fields, for queries that do not
+    start with a known city.
+    """
+    return reduce(operator.or_, [Q(**{f"{field}__icontains": word}) for word in words for field in fields], Q())
+
 
 class SearchFilterCityBackend(BaseFilterBackend):
     filter_keys = {
@@ -58,24 +89,28 @@ class SearchFilterStreetBackend(BaseFilterBackend):
         query = query_params.get("query")
 
         if query:
-            # TODO: когда переедем на postgres убрать title
-            query = query.title()
-            queryes = list(map(lambda s: s.strip(), query.split(" ")))
-            if len(queryes) == 0:
-                return queryset
-
-            filters = reduce(
-                operator.or_,
-                [
-                    Q(street__street__icontains=_q) for _q in queryes[1:]
-                ],
-                Q()
-            )
-
-            queryset = queryset.filter(city__name__icontains=queryes[0]).filter(filters)
+            city, queryes = split_query(query)
+            if not city:
+                return queryset.filter(get_fallback_filter(queryes, ("city__search_key", "search_key")))
+
+            found = queryset.filter(city__search_key=city)
+            if queryes:
+                street = " ".join(queryes)
+                found = found.filter(search_key__startswith=street)
+
+                # ничего не нашли - возможно, опечатка в названии улицы
+                if not found.exists():
+                    return queryset.filter(pk__in=self.get_fuzzy_ids(city, street))
+
+            queryset = found
 
         return queryset
 
+    @staticmethod
+    def get_fuzzy_ids(city_key: str, street: str) -> List[int]:
+        city_ids = City.objects.filter(search_key=city_key).values_list("pk", flat=True)[:LIMIT_FUZZY_CITIES]
+        return STREET_FUZZY_INDEX.search_cities(city_ids, street)
+
     def get_schema_operation_parameters(self, view):
         query_filters = list(map(lambda field: {
             "name": field,
@@ -97,22 +132,13 @@ class SearchFilterPlaceBackend(BaseFilterBackend):
         query = query_params.get("query")
 
         if query:
-            # TODO: когда переедем на postgres убрать title
-            query = query.title()
-            queryes = list(map(lambda s: s.strip(), query.split(" ")))
-            if len(queryes) == 0:
-                return queryset
-
-            filters = reduce(
-                operator.or_,
-                [
-                    Q(place_name__icontains=_q) |
-                    Q(street__street__icontains=_q) for _q in queryes[1:]
-                ],
-                Q()
-            )
-
-            queryset = queryset.filter(city__name__icontains=queryes[0]).filter(filters)
+            city, queryes = split_query(query)
+            if not city:
+                return queryset.filter(get_fallback_filter(queryes, ("city__search_key", "search_key")))
+
+            queryset = queryset.filter(city__search_key=city)
+            if queryes:
+                queryset = queryset.filter(search_key__startswith=" ".join(queryes))
 
         return queryset
 
@@ -137,22 +163,22 @@ class SearchFilterAddressBackend(BaseFilterBackend):
         query = query_params.get("query")
 
         if query:
-            # TODO: когда переедем на postgres убрать title
-            query = query.title()
-            queryes = list(map(lambda s: s.strip(), query.split(" ")))
-            if len(queryes) == 0:
-                return queryset
-
-            filters = reduce(
-                operator.or_,
-                [
-                    Q(home__icontains=_q) |
-                    Q(street__street__icontains=_q) for _q in queryes[1:]
-                ],
-                Q()
-            )
-
-            queryset = queryset.filter(street__city__name__icontains=queryes[0]).filter(filters)
+            city, queryes = split_query(query)
+            if not city:
+                return queryset.filter(get_fallback_filter(
+                    queryes, ("street__city__search_key", "street__search_key", "search_key"),
+                ))
+
+            queryset = queryset.filter(street__city__search_key=city)
+            if queryes:
+                street = " ".join(queryes)
+                filters = Q(street__search_key__startswith=street) | Q(search_key__startswith=street)
+                # "город улица дом": последнее слово с цифрой считаем номером дома
+                if len(queryes) > 1 and any(char.isdigit() for char in queryes[-1]):
+                    filters |= Q(street__search_key__startswith=" ".join(queryes[:-1]),
+                                 search_key__startswith=queryes[-1])
+
+                queryset = queryset.filter(filters)
 
         return queryset
 
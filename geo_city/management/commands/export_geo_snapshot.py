@@ -0,0 +1,51 @@
+import time
+from datetime import datetime
+
+import redis
+from django.core.management.base import BaseCommand, CommandError
+
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.coordinate_array import ADDRESS_COORDINATES
+from geo_city.services.geo_snapshot import GEO_SNAPSHOT_PATH, StringTableWriter, write_snapshot
+from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX, PLACE_SPATIAL_INDEX
+from geo_city.services.street_fuzzy_index import STREET_FUZZY_INDEX
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mappable snapshot of geo reference data that workers load their indexes from'
+
+    indexes = (CITY_INDEX, CITY_SPATIAL_INDEX, PLACE_SPATIAL_INDEX, ADDRESS_COORDINATES)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', type=str, action='store', default=GEO_SNAPSHOT_PATH)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not path:
+            raise CommandError("GEO_SNAPSHOT_PATH is not set, pass --path")
+
+        started_at = time.monotonic()
+        strings = StringTableWriter()
+        sections = {}
+        versions = {}
+
+        try:
+            # версия читается до данных: изменение во время выгрузки сделает снимок устаревшим
+            for index in self.indexes:
+                versions[index.version_key] = index.ensure_version()
+                sections[index.snapshot_section] = index.dump_snapshot(strings)
+                self.stdout.write(f"[{index.snapshot_section}] {len(sections[index.snapshot_section])} rows")
+
+            sections[STREET_FUZZY_INDEX.snapshot_section], street_versions = \
+                STREET_FUZZY_INDEX.dump_snapshot(strings)
+            self.stdout.write(f"[{STREET_FUZZY_INDEX.snapshot_section}] "
+                              f"{len(sections[STREET_FUZZY_INDEX.snapshot_section])} rows")
+        except redis.RedisError as e:
+            raise CommandError(f"Index versions are kept in Redis: {e}")
+
+        write_snapshot(path, sections, strings, {
+            "created_at": datetime.now().isoformat(),
+            "versions": versions,
+            "street_versions": street_versions,
+        })
+        self.stdout.write(f"{path}: {len(strings.values)} strings, {time.monotonic() - started_at:.1f}s")
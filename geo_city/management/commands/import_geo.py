@@ -1,8 +1,8 @@
-import csv
 import os
 
 from django.core.management.base import BaseCommand
 from geo_city.models import Country, Region, City
+from geo_city.services.importer import GeoImporter, read_csv, DEFAULT_BATCH_SIZE
 
 
 class Command(BaseCommand):
@@ -12,55 +12,68 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--path', type=str, action='store', required=True)
+        parser.add_argument('--batch-size', type=int, action='store', default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--checkpoint', type=str, action='store', default=None,
+                            help='file with import progress, an interrupted import resumes from it')
 
     def handle(self, *args, **options):
         path = options.get('path')
-        if path is not None:
-            with open(os.path.join(path, '_countries.csv'), 'r', encoding="utf8") as countryFile:
-                country_reader = csv.reader(countryFile, delimiter=';')
-                next(country_reader)
-                countries = []
-                for row in country_reader:
-                    if row[0] and row[1]:
-                        if int(row[0]) in self.countries_indexs:
-                            code = row[0]
-                            name = row[1]
-                            countries.append(Country(code=code, name=name))
-                Country.objects.bulk_create(countries, 999)
+        if path is None:
+            return
 
-            with open(os.path.join(path, '_regions.csv'), 'r', encoding="utf8") as regionFile:
-                region_reader = csv.reader(regionFile, delimiter=';')
-                next(region_reader)
-                regions = []
-                for row in region_reader:
-                    if row[0] and row[1] and row[2]:
-                        if int(row[1]) in self.countries_indexs:
-                            code = row[0]
-                            country_code = row[1]
-                            name = row[2]
-                            country = Country.objects.get(code=country_code)
-                            regions.append(Region(code=code, country=country, name=name))
-                Region.objects.bulk_create(regions, 999, True)
+        importer = GeoImporter(
+            batch_size=options['batch_size'],
+            checkpoint_path=options.get('checkpoint'),
+            log=self.stdout.write,
+        )
 
-            with open(os.path.join(path, path, 'cis_towns.csv'), 'r', encoding="utf8") as cityFile:
-                city_reader = csv.reader(cityFile, delimiter=';')
-                next(city_reader)
-                cities = []
-                timezone = None
-                latitude = None
-                longitude = None
-                for row in city_reader:
-                    if row[2] and row[3]:
-                        region_code = row[2]
-                        name = row[3]
-                    if len(row) > 4:
-                        if row[4] in row:
-                            timezone = row[4]
-                        if row[5] in row:
-                            latitude = row[5]
-                        if row[6] in row:
-                            longitude = row[6]
-                    region = Region.objects.get(code=region_code)
-                    cities.append(
-                        City(region=region, name=name, timezone=timezone, latitude=latitude, longitude=longitude))
-                City.objects.bulk_create(cities, 999, True)
+        importer.run_stage(
+            "countries",
+            self.read_countries(os.path.join(path, '_countries.csv')),
+            lambda countries: importer.bulk_create(Country, countries),
+        )
+
+        country_codes = set(Country.objects.values_list("code", flat=True))
+        importer.run_stage(
+            "regions",
+            self.read_regions(os.path.join(path, '_regions.csv'), country_codes),
+            lambda regions: importer.bulk_create(Region, regions),
+        )
+
+        region_map = dict(Region.objects.filter(code__isnull=False).values_list("code", "pk"))
+        importer.run_stage(
+            "cities",
+            self.read_cities(os.path.join(path, 'cis_towns.csv'), region_map),
+            lambda cities: importer.bulk_create(City, cities),
+        )
+
+        importer.finish()
+
+    def read_countries(self, file_path: str):
+        for row_number, row in read_csv(file_path):
+            if row[0] and row[1] and int(row[0]) in self.countries_indexs:
+                yield row_number, Country(code=row[0], name=row[1])
+            else:
+                yield row_number, None
+
+    def read_regions(self, file_path: str, country_codes):
+        for row_number, row in read_csv(file_path):
+            if row[0] and row[1] and row[2] and int(row[1]) in self.countries_indexs and row[1] in country_codes:
+                yield row_number, Region(code=row[0], country_id=row[1], name=row[2])
+            else:
+                yield row_number, None
+
+    def read_cities(self, file_path: str, region_map):
+        for row_number, row in read_csv(file_path):
+            region_id = region_map.get(row[2]) if len(row) > 3 else None
+            if not region_id or not row[3]:
+                yield row_number, None
+                continue
+
+            yield row_number, City(
+                region_id=region_id,
+                name=row[3],
+                timezone=row[4] if len(row) > 4 and row[4] else None,
+                latitude=row[5] if len(row) > 5 and row[5] else None,
+                longitude=row[6] if len(row) > 6 and row[6] else None,
+            )
@@ -1,7 +1,8 @@
-import csv
+from typing import List, Tuple, Dict
 
 from django.core.management.base import BaseCommand
 from geo_city.models import Country, Region, City
+from geo_city.services.importer import GeoImporter, read_csv, parse_float, DEFAULT_BATCH_SIZE
 
 
 class Command(BaseCommand):
@@ -9,6 +10,9 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--file', type=str, action='store', required=True)
+        parser.add_argument('--batch-size', type=int, action='store', default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--checkpoint', type=str, action='store', default=None,
+                            help='file with import progress, an interrupted import resumes from it')
 
     def handle(self, *args, **options):
         file_path = options.get('file')
@@ -16,34 +20,47 @@ class Command(BaseCommand):
             print("[!] Empty file")
             return
 
-        region_map = {}
-        cities = []
-        country_instance, _ = Country.objects.get_or_create(code="RU", defaults={"name": "Россия"})
-
-        with open(file_path, 'r', encoding="utf8") as data_file:
-            data_reader = csv.reader(data_file, delimiter=';')
-            next(data_reader)
-            for row in data_reader:
-                city_name = row[0]
-                region_name = row[1]
-                federal_district = row[2]
-                lat = float(row[3].replace(",", "."))
-                lng = float(row[4].replace(",", "."))
-
-                if not region_map.get(region_name):
-                    region_instance, _ = Region.objects.get_or_create(
-                        name=region_name,
-                        country=country_instance,
-                        defaults={
-                            "federal_district": federal_district,
-                        },
-                    )
-
-                    region_map[region_name] = region_instance
-
-                else:
-                    region_instance = region_map[region_name]
-
-                cities.append(City(name=city_name, region=region_instance, latitude=lat, longitude=lng))
-
-        City.objects.bulk_create(cities, 999, True)
+        importer = GeoImporter(
+            batch_size=options['batch_size'],
+            checkpoint_path=options.get('checkpoint'),
+            log=self.stdout.write,
+        )
+
+        self.country_instance, _ = Country.objects.get_or_create(code="RU", defaults={"name": "Россия"})
+        self.region_map: Dict[str, int] = dict(
+            Region.objects.filter(country=self.country_instance).values_list("name", "pk")
+        )
+        self.importer = importer
+
+        importer.run_stage("cities", self.read_cities(file_path), self.write_cities)
+        importer.finish()
+
+    @staticmethod
+    def read_cities(file_path: str):
+        for row_number, row in read_csv(file_path):
+            if len(row) < 5 or not row[0] or not row[1]:
+                yield row_number, None
+                continue
+
+            # город, регион, федеральный округ, широта, долгота
+            yield row_number, (row[0], row[1], row[2], parse_float(row[3]), parse_float(row[4]))
+
+    def write_cities(self, rows: List[Tuple[str, str, str, float, float]]) -> int:
+        new_regions = {}
+        for (_, region_name, federal_district, _, _) in rows:
+            if region_name not in self.region_map:
+                new_regions[region_name] = Region(
+                    name=region_name, country=self.country_instance, federal_district=federal_district,
+                )
+
+        if new_regions:
+            self.importer.bulk_create(Region, list(new_regions.values()))
+            self.region_map.update(
+                Region.objects.filter(country=self.country_instance, name__in=new_regions.keys())
+                .values_list("name", "pk")
+            )
+
+        return self.importer.bulk_create(City, [
+            City(name=city_name, region_id=self.region_map[region_name], latitude=lat, longitude=lng)
+            for (city_name, region_name, _, lat, lng) in rows
+        ])
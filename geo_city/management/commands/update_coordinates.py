@@ -0,0 +1,21 @@
+from company.services.branch_proximity import BRANCH_PROXIMITY
+from geo_city.management.commands.update_search_keys import Command as UpdateSearchKeysCommand
+from geo_city.models import City, Place, Address
+from geo_city.services.coordinate_array import ADDRESS_COORDINATES
+from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX, PLACE_SPATIAL_INDEX
+
+
+class Command(UpdateSearchKeysCommand):
+    help = 'Fill integer microdegree coordinates (lat_e6/lng_e6) of cities, places and addresses'
+
+    models = (City, Place, Address)
+    fields = ("lat_e6", "lng_e6")
+
+    def fill(self, instance):
+        instance.fill_coordinates()
+
+    def get_indexes(self):
+        # строки без lat_e6/lng_e6 в эти индексы не попадали
+        return super().get_indexes() + [
+            CITY_SPATIAL_INDEX, PLACE_SPATIAL_INDEX, ADDRESS_COORDINATES, BRANCH_PROXIMITY,
+        ]
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.app_services.model_versions import MODEL_VERSIONS
+from geo_city.models import City, Street, Place, Address
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.importer import DEFAULT_BATCH_SIZE
+from geo_city.services.street_fuzzy_index import STREET_FUZZY_INDEX
+
+
+class Command(BaseCommand):
+    help = 'Recalculate normalized search keys of cities, streets, places and addresses'
+
+    models = (City, Street, Place, Address)
+    fields = ("search_key",)
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, action='store', default=DEFAULT_BATCH_SIZE)
+
+    def fill(self, instance):
+        instance.fill_search_key()
+
+    def get_indexes(self):
+        """
+        Indexes of every worker built from the filled fields.
+        """
+        return [CITY_INDEX]
+
+    def invalidate(self, updated_models, street_city_ids):
+        # bulk_update не отправляет сигналы: воркеры держат старые индексы до следующей записи
+        for index in self.get_indexes():
+            index.invalidate()
+        for city_id in street_city_ids:
+            STREET_FUZZY_INDEX.invalidate(city_id)
+        for model in updated_models:
+            MODEL_VERSIONS.bump(model)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated_models = []
+        street_city_ids = set()
+
+        for model in self.models:
+            total = 0
+            last_pk = 0
+            while True:
+                batch = list(model.objects.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+                if not batch:
+                    break
+
+                last_pk = batch[-1].pk
+                changed = []
+                for instance in batch:
+                    values = [getattr(instance, field) for field in self.fields]
+                    self.fill(instance)
+                    if [getattr(instance, field) for field in self.fields] != values:
+                        changed.append(instance)
+
+                if changed:
+                    with transaction.atomic():
+                        model.objects.bulk_update(changed, self.fields)
+                    if model is Street:
+                        street_city_ids.update(street.city_id for street in changed if street.city_id)
+                total += len(changed)
+
+            if total:
+                updated_models.append(model)
+            self.stdout.write(f"[{model.__name__}] {total} rows updated")
+
+        if updated_models:
+            self.invalidate(updated_models, street_city_ids)
@@ -0,0 +1,23 @@
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from geo_city.services.cache_warmup import warm_caches, SOURCES, WARMUP_TOP_QUERIES, WARMUP_CONCURRENCY, \
+    WARMUP_BUDGET
+
+
+class Command(BaseCommand):
+    help = 'Warm the address suggestion and reverse geocoding caches with frequent queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', type=str, action='append', choices=SOURCES,
+                            help='query log and/or branch and company addresses, both by default')
+        parser.add_argument('--top', type=int, action='store', default=WARMUP_TOP_QUERIES)
+        parser.add_argument('--concurrency', type=int, action='store', default=WARMUP_CONCURRENCY)
+        parser.add_argument('--budget', type=int, action='store', default=WARMUP_BUDGET,
+                            help='maximum number of provider requests')
+
+    def handle(self, *args, **options):
+        stats = async_to_sync(warm_caches)(
+            tuple(options['source'] or SOURCES), options['top'], options['concurrency'], options['budget'],
+        )
+        self.stdout.write(", ".join(f"{name}: {count}" for name, count in stats.items()))
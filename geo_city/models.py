@@ -1,6 +1,76 @@
+from typing import Union, Iterable
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from geo_city.services.normalize import normalize_text, strip_street_type
+
+
+class SearchKeyMixin:
+    """
+    Keeps `search_key`, the normalized form of the name used for indexed
+    prefix search. bulk_create skips save(), so bulk writers call
+    fill_search_key() themselves.
+    """
+    def get_search_key(self) -> str:
+        raise NotImplementedError
+
+    def fill_search_key(self):
+        self.search_key = self.get_search_key()[:255]
+        return self
+
+    def save(self, *args, **kwargs):
+        self.fill_search_key()
+        super().save(*args, **kwargs)
+
+
+def to_e6(value) -> Union[int, None]:
+    return None if value is None else round(float(value) * 1_000_000)
+
+
+def from_e6(value: Union[int, None]) -> Union[float, None]:
+    return None if value is None else value / 1_000_000
+
+
+def to_float(value) -> Union[float, None]:
+    return None if value is None else float(value)
+
+
+class CoordinatesMixin:
+    """
+    Keeps lat_e6/lng_e6, the coordinates in integer microdegrees (~0.1 m),
+    next to the decimal latitude/longitude. They are cheap to read and to
+    load into numpy arrays. bulk_create skips save(), so bulk writers call
+    fill_coordinates() themselves.
+    """
+    def fill_coordinates(self):
+        self.lat_e6 = to_e6(self.latitude)
+        self.lng_e6 = to_e6(self.longitude)
+        return self
+
+    def save(self, *args, **kwargs):
+        self.fill_coordinates()
+        super().save(*args, **kwargs)
+
+    @property
+    def lat(self) -> Union[float, None]:
+        return from_e6(self.lat_e6) if self.lat_e6 is not None else to_float(self.latitude)
+
+    @property
+    def lng(self) -> Union[float, None]:
+        return from_e6(self.lng_e6) if self.lng_e6 is not None else to_float(self.longitude)
+
+
+def fill_computed_fields(instances: Iterable[models.Model]):
+    """
+    Computed columns for instances written with bulk_create.
+    """
+    for instance in instances:
+        if isinstance(instance, SearchKeyMixin):
+            instance.fill_search_key()
+        if isinstance(instance, CoordinatesMixin):
+            instance.fill_coordinates()
+
 
 class Country(models.Model):
     code = models.CharField(_('country code'), max_length=10, primary_key=True)
@@ -39,12 +109,18 @@ class Region(models.Model):
         unique_together = (('country', 'name'),)
 
 
-class City(models.Model):
+class City(SearchKeyMixin, CoordinatesMixin, models.Model):
     region = models.ForeignKey(Region, related_name='cities', on_delete=models.CASCADE, null=True)
     name = models.CharField(_('city name'), max_length=255)
     latitude = models.DecimalField(max_digits=21, decimal_places=18, blank=True, null=True)
     longitude = models.DecimalField(max_digits=21, decimal_places=18, blank=True, null=True)
+    lat_e6 = models.IntegerField(blank=True, null=True)
+    lng_e6 = models.IntegerField(blank=True, null=True)
     timezone = models.CharField(_('time zone'), max_length=10, blank=True, null=True)
+    population = models.PositiveIntegerField(_('population'), blank=True, null=True)
+    city_fias_id = models.CharField(db_index=True, max_length=36, null=True, blank=True)
+    city_kladr_id = models.CharField(db_index=True, max_length=20, null=True, blank=True)
+    search_key = models.CharField(db_index=True, max_length=255, blank=True, default="")
 
     def __str__(self):
         return self.name
@@ -54,37 +130,64 @@ class City(models.Model):
         verbose_name_plural = _('cities')
         unique_together = (('region', 'name'),)
         ordering = ['name']
+        indexes = [
+            # ключ постраничного обхода по курсору
+            models.Index(fields=['name', 'id']),
+        ]
 
     def to_json(self):
         return {
             "id": self.id,
             "name": self.name,
-            "lat": float(self.latitude) if self.latitude else 0.0,
-            "lng": float(self.longitude) if self.longitude else 0.0,
+            "lat": self.lat or 0.0,
+            "lng": self.lng or 0.0,
             "timezone": self.timezone,
         }
 
+    def get_search_key(self) -> str:
+        return normalize_text(self.name)
+
 
-class Street(models.Model):
+class Street(SearchKeyMixin, models.Model):
     city = models.ForeignKey(City, related_name='streets', on_delete=models.CASCADE, null=True)
     street_type = models.CharField(_("street type"), max_length=10, default="ул")
     street = models.CharField(_("street"), max_length=250)
+    street_fias_id = models.CharField(db_index=True, max_length=36, null=True, blank=True)
+    street_kladr_id = models.CharField(db_index=True, max_length=20, null=True, blank=True)
+    search_key = models.CharField(db_index=True, max_length=255, blank=True, default="")
 
+    def get_search_key(self) -> str:
+        return strip_street_type(self.street) or normalize_text(self.street)
 
-class Place(models.Model):
+
+class Place(SearchKeyMixin, CoordinatesMixin, models.Model):
     city = models.ForeignKey(City, related_name='places', on_delete=models.CASCADE, null=True)
     place_name = models.CharField(_("place name"), max_length=250, blank=True, null=True)
     latitude = models.DecimalField(max_digits=21, decimal_places=18, blank=True, null=True)
     longitude = models.DecimalField(max_digits=21, decimal_places=18, blank=True, null=True)
+    lat_e6 = models.IntegerField(blank=True, null=True)
+    lng_e6 = models.IntegerField(blank=True, null=True)
+    search_key = models.CharField(db_index=True, max_length=255, blank=True, default="")
+
+    def get_search_key(self) -> str:
+        return normalize_text(self.place_name)
 
 
-class Address(models.Model):
+class Address(SearchKeyMixin, CoordinatesMixin, models.Model):
     district = models.CharField(max_length=150, blank=True, null=True)
     home = models.CharField(max_length=10, blank=True, null=True)
     description = models.CharField(max_length=100, blank=True, null=True)
     street = models.ForeignKey(Street, related_name='addresses', on_delete=models.CASCADE)
     latitude = models.DecimalField(max_digits=21, decimal_places=18, blank=True, null=True)
     longitude = models.DecimalField(max_digits=21, decimal_places=18, blank=True, null=True)
+    lat_e6 = models.IntegerField(blank=True, null=True)
+    lng_e6 = models.IntegerField(blank=True, null=True)
+    house_fias_id = models.CharField(db_index=True, max_length=36, null=True, blank=True)
+    house_kladr_id = models.CharField(db_index=True, max_length=20, null=True, blank=True)
+    search_key = models.CharField(db_index=True, max_length=255, blank=True, default="")
+
+    def get_search_key(self) -> str:
+        return normalize_text(self.home)
 
     def to_dict(self):
         return {
@@ -1,9 +1,11 @@
+import math
 from typing import Dict, Any
 
 from rest_framework import serializers
 from django.utils.translation import gettext_lazy as _
 
 from geo_city.models import Region, City, Country, Street, Place, Address
+from geo_city.services.reverse_geocoding import BATCH_MAX_POINTS
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -245,9 +247,20 @@ class SearchAddressListSerializer(serializers.Serializer):
         )
 
 
+class CoordinateField(serializers.FloatField):
+    """
+    FloatField without nan: min_value/max_value comparisons never fail on it.
+    """
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if math.isnan(value):
+            self.fail("invalid")
+        return value
+
+
 class ReverseGeocodingSerializer(serializers.Serializer):
-    lat = serializers.FloatField(required=True, write_only=True)
-    lng = serializers.FloatField(required=True, write_only=True)
+    lat = CoordinateField(required=True, write_only=True, min_value=-90, max_value=90)
+    lng = CoordinateField(required=True, write_only=True, min_value=-180, max_value=180)
     place = PlaceSerializer(read_only=True)
 
     class Meta:
@@ -256,3 +269,30 @@ class ReverseGeocodingSerializer(serializers.Serializer):
             'lng',
             'place',
         )
+
+
+class ReverseGeocodingBatchSerializer(serializers.Serializer):
+    points = serializers.ListField(
+        child=ReverseGeocodingSerializer(),
+        allow_empty=False,
+        max_length=BATCH_MAX_POINTS,
+        write_only=True,
+    )
+
+    class Meta:
+        fields = (
+            'points',
+        )
+
+
+class ProximityQuerySerializer(serializers.Serializer):
+    lat = CoordinateField(min_value=-90, max_value=90)
+    lng = CoordinateField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(required=False, default=30, min_value=0, max_value=1000)
+
+    class Meta:
+        fields = (
+            'lat',
+            'lng',
+            'radius_km',
+        )
@@ -0,0 +1,153 @@
+import asyncio
+from typing import Dict, List, Tuple, Awaitable, Callable
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from core.app_services.dadata import ADDRESS_CACHE, GEOLOCATE_CACHE, Point, find_city_address, find_place, \
+    address_cache_key, geolocate_cache_key
+from core.app_services.resilience import is_unavailable
+from geo_city.models import from_e6
+from geo_city.services.query_log import ADDRESS_QUERY_LOG, GEOLOCATE_QUERY_LOG, top_address_queries, \
+    top_geolocate_queries
+from geo_city.services.reverse_geocoding import get_local_place_from_gps
+
+CACHE_WARMUP = getattr(settings, "CACHE_WARMUP", {})
+
+# Сколько частых запросов каждого вида брать из журнала
+WARMUP_TOP_QUERIES = CACHE_WARMUP.get("top_queries", 500)
+# Одновременных запросов к провайдеру
+WARMUP_CONCURRENCY = CACHE_WARMUP.get("concurrency", 4)
+# Не больше стольких платных запросов за один прогон
+WARMUP_BUDGET = CACHE_WARMUP.get("budget", 1000)
+
+SOURCE_LOG = "log"
+SOURCE_ADDRESSES = "addresses"
+SOURCES = (SOURCE_LOG, SOURCE_ADDRESSES)
+
+
+def get_address_queries() -> Tuple[List[Tuple[str, str]], List[Point]]:
+    """
+    Street queries and coordinates of the addresses of branches and
+    companies: users search near them most.
+    """
+    from company.models import Company
+    from employee.models import Branch
+
+    queries = []
+    points = []
+    for model in (Branch, Company):
+        addresses = model.objects.filter(address__isnull=False).values_list(
+            "address__street__city__name", "address__street__street", "address__lat_e6", "address__lng_e6",
+        ).distinct()
+        for (city_name, street, lat_e6, lng_e6) in addresses.iterator():
+            if city_name and street:
+                queries.append((city_name, street))
+            if lat_e6 is not None and lng_e6 is not None:
+                points.append(Point(lat=from_e6(lat_e6), lon=from_e6(lng_e6)))
+    return queries, points
+
+
+class CacheWarmer:
+    """
+    Fills the DaData address and geolocate caches before users ask.
+
+    Queries already cached or answered by the local indexes cost nothing;
+    every other query is one provider call, at most `concurrency` at a time
+    and at most `budget` in total. The run stops early when the provider is
+    unavailable.
+    """
+    def __init__(self, concurrency: int = WARMUP_CONCURRENCY, budget: int = WARMUP_BUDGET):
+        self.concurrency = concurrency
+        self.budget = budget
+        self.stats: Dict[str, int] = {"cached": 0, "local": 0, "warmed": 0, "failed": 0, "skipped": 0}
+        self._stopped = False
+
+    def take_budget(self) -> bool:
+        if self._stopped or self.budget <= 0:
+            self.stats["skipped"] += 1
+            return False
+        self.budget -= 1
+        return True
+
+    async def call(self, request: Callable[[], Awaitable[httpx.Response]]):
+        try:
+            response = await request()
+        except httpx.HTTPError:
+            self.stats["failed"] += 1
+            return
+
+        if is_unavailable(response):
+            self._stopped = True
+            self.stats["failed"] += 1
+        elif response.is_success:
+            self.stats["warmed"] += 1
+        else:
+            self.stats["failed"] += 1
+
+    async def warm_address(self, semaphore: asyncio.Semaphore, city_name: str, street: str):
+        if ADDRESS_CACHE.contains(address_cache_key(city_name, street)):
+            self.stats["cached"] += 1
+            return
+
+        async with semaphore:
+            if self.take_budget():
+                await self.call(lambda: find_city_address(city_name, street))
+
+    async def warm_point(self, semaphore: asyncio.Semaphore, point: Point):
+        if GEOLOCATE_CACHE.contains(geolocate_cache_key(point)):
+            self.stats["cached"] += 1
+            return
+
+        if await sync_to_async(get_local_place_from_gps, thread_sensitive=False)(point):
+            self.stats["local"] += 1
+            return
+
+        async with semaphore:
+            if self.take_budget():
+                await self.call(lambda: find_place(point))
+
+    async def warm(self, queries: List[Tuple[str, str]], points: List[Point]) -> Dict[str, int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        # одинаковые запросы из журнала и из адресов греются один раз
+        unique_queries: Dict[str, Tuple[str, str]] = {}
+        for (city_name, street) in queries:
+            unique_queries.setdefault(address_cache_key(city_name, street), (city_name, street))
+        unique_points: Dict[str, Point] = {}
+        for point in points:
+            unique_points.setdefault(geolocate_cache_key(point), point)
+
+        await asyncio.gather(
+            *(self.warm_address(semaphore, city_name, street) for (city_name, street) in unique_queries.values()),
+            *(self.warm_point(semaphore, point) for point in unique_points.values()),
+        )
+        return self.stats
+
+
+def collect_queries(sources: Tuple[str, ...] = SOURCES,
+                    top_queries: int = WARMUP_TOP_QUERIES) -> Tuple[List[Tuple[str, str]], List[Point]]:
+    """
+    Most frequent logged queries first, then the addresses of branches and
+    companies; the budget is spent in this order.
+    """
+    queries, points = [], []
+    if SOURCE_LOG in sources:
+        ADDRESS_QUERY_LOG.trim()
+        GEOLOCATE_QUERY_LOG.trim()
+        queries += top_address_queries(top_queries)
+        points += top_geolocate_queries(top_queries)
+
+    if SOURCE_ADDRESSES in sources:
+        address_queries, address_points = get_address_queries()
+        queries += address_queries
+        points += address_points
+
+    return queries, points
+
+
+async def warm_caches(sources: Tuple[str, ...] = SOURCES, top_queries: int = WARMUP_TOP_QUERIES,
+                      concurrency: int = WARMUP_CONCURRENCY, budget: int = WARMUP_BUDGET) -> Dict[str, int]:
+    queries, points = await sync_to_async(collect_queries, thread_sensitive=False)(sources, top_queries)
+    return await CacheWarmer(concurrency, budget).warm(queries, points)
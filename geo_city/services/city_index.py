@@ -0,0 +1,169 @@
+import json
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, List, Set, Union, Any, Iterable, Tuple
+
+import numpy as np
+
+from geo_city.services.geo_snapshot import GeoSnapshot, StringTableWriter
+from geo_city.services.normalize import normalize_text
+from geo_city.services.versioned_index import VersionedIndex
+
+# data - ответ CitySerializer в JSON
+CITY_SNAPSHOT_DTYPE = np.dtype([
+    ("id", "<i8"), ("population", "<i8"), ("name", "<i4"), ("region", "<i4"), ("data", "<i4"),
+])
+
+
+@dataclass
+class CityEntry:
+    id: int
+    name_key: str
+    region_key: str
+    population: int
+    data: Dict[str, Any]
+
+
+def trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class CityIndex(VersionedIndex):
+    """
+    In-process autocomplete index over City and Region names.
+
+    Matches are ranked: name prefix, then name substring, then by population.
+    The index is rebuilt when the version in Redis is bumped by the
+    City/Region signals.
+    """
+    version_key = "geo:city_index:version"
+    snapshot_section = "city_index"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (записи, отсортированные ключи, триграммы) заменяются целиком
+        self._state: Tuple[List[CityEntry], List[str], Dict[str, Set[int]]] = ([], [], {})
+        self._by_id: Dict[int, CityEntry] = {}
+
+    def get_rows(self) -> Iterable[Dict[str, Any]]:
+        from geo_city.models import City
+        from geo_city.serializers import CitySerializer
+
+        for city in City.objects.select_related("region", "region__country").order_by("pk").iterator():
+            yield {
+                "id": city.pk,
+                "name": city.name,
+                "region": city.region.name if city.region else "",
+                "population": city.population or 0,
+                "data": CitySerializer(city).data,
+            }
+
+    def rebuild(self):
+        self.build(self.get_rows())
+
+    def dump_snapshot(self, strings: StringTableWriter) -> np.ndarray:
+        return np.array([
+            (row["id"], row["population"], strings.add(row["name"]), strings.add(row["region"]),
+             strings.add(json.dumps(row["data"], ensure_ascii=False)))
+            for row in self.get_rows()
+        ], dtype=CITY_SNAPSHOT_DTYPE)
+
+    def rebuild_from_snapshot(self, snapshot: GeoSnapshot, rows: np.ndarray) -> bool:
+        self.build(
+            {
+                "id": pk,
+                "name": snapshot.string(name),
+                "region": snapshot.string(region),
+                "population": population,
+                "data": json.loads(snapshot.string(data)),
+            }
+            for (pk, population, name, region, data) in zip(
+                rows["id"].tolist(), rows["population"].tolist(), rows["name"].tolist(),
+                rows["region"].tolist(), rows["data"].tolist(),
+            )
+        )
+        return True
+
+    def build(self, rows: Iterable[Dict[str, Any]]):
+        entries = sorted(
+            (CityEntry(
+                id=row["id"],
+                name_key=normalize_text(row["name"]),
+                region_key=normalize_text(row["region"]),
+                population=row["population"],
+                data=row["data"],
+            ) for row in rows),
+            key=lambda entry: entry.name_key,
+        )
+
+        _trigrams = {}
+        for position, entry in enumerate(entries):
+            for trigram in trigrams(entry.name_key):
+                _trigrams.setdefault(trigram, set()).add(position)
+
+        self._state = (entries, [entry.name_key for entry in entries], _trigrams)
+        self._by_id = {entry.id: entry for entry in entries}
+        self.is_loaded = True
+
+    def get(self, pk: int) -> Union[Dict[str, Any], None]:
+        self.ensure_fresh()
+        entry = self._by_id.get(pk)
+        return entry.data if entry else None
+
+    def match_prefix(self, words: List[str]) -> int:
+        """
+        Number of leading words that form the longest known city name, 0 when
+        the words do not start with a city.
+        """
+        self.ensure_fresh()
+
+        keys = self._state[1]
+        for size in range(len(words), 0, -1):
+            name_key = " ".join(words[:size])
+            position = bisect_left(keys, name_key)
+            if position < len(keys) and keys[position] == name_key:
+                return size
+        return 0
+
+    def search(self, city: str = None, region: str = None) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+
+        entries, keys, _trigrams = self._state
+        city_key = normalize_text(city)
+        region_key = normalize_text(region)
+
+        if city_key:
+            start = bisect_left(keys, city_key)
+            end = bisect_left(keys, city_key + "\uffff", start)
+            prefix_positions = set(range(start, end))
+
+            if len(city_key) >= 3:
+                candidates = None
+                for trigram in trigrams(city_key):
+                    positions = _trigrams.get(trigram, set())
+                    candidates = positions if candidates is None else candidates & positions
+                    if not candidates:
+                        break
+                candidates = candidates or set()
+            else:
+                candidates = range(len(entries))
+
+            substring_positions = {
+                position for position in candidates
+                if position not in prefix_positions and city_key in keys[position]
+            }
+
+            matches = [(0, entries[position]) for position in prefix_positions] + \
+                      [(1, entries[position]) for position in substring_positions]
+        else:
+            matches = [(0, entry) for entry in entries]
+
+        if region_key:
+            matches = [(rank, entry) for (rank, entry) in matches if region_key in entry.region_key]
+
+        matches.sort(key=lambda match: (match[0], -match[1].population, match[1].name_key))
+
+        return [entry.data for (_, entry) in matches]
+
+
+CITY_INDEX = CityIndex()
@@ -0,0 +1,203 @@
+from typing import Iterable, List, Tuple, Union
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from core.app_services.redis_service import REDIS_SERVICE
+from geo_city.services.geo_snapshot import GeoSnapshot, StringTableWriter
+from geo_city.services.spatial_index import EARTH_RADIUS_KM, KM_PER_DEGREE
+from geo_city.services.versioned_index import VersionedIndex
+
+E6 = 1_000_000
+
+ADDRESS_SNAPSHOT_DTYPE = np.dtype([("id", "<i8"), ("lat_e6", "<i4"), ("lng_e6", "<i4")])
+
+# Длиннее журнал изменений не растёт: вместо него все воркеры один раз перечитают таблицу
+MAX_CHANGES = getattr(settings, "ADDRESS_COORDINATES_MAX_CHANGES", 10000)
+
+Change = Tuple[int, Union[int, None], Union[int, None]]
+
+
+class CoordinateArray:
+    """
+    Ids and coordinates of many points in numpy arrays.
+
+    Distances to all points are computed with one vectorized haversine,
+    a latitude band check first drops most of the points cheaply.
+    """
+    def __init__(self):
+        self.build([])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, rows: Iterable[Tuple[int, int, int]]):
+        """
+        rows: (id, lat_e6, lng_e6)
+        """
+        data = np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+        self.build_arrays(data[:, 0], data[:, 1], data[:, 2])
+
+    def build_arrays(self, ids: np.ndarray, lat_e6: np.ndarray, lng_e6: np.ndarray):
+        lat = np.radians(lat_e6 / E6)
+        lng = np.radians(lng_e6 / E6)
+
+        # один кортеж, чтобы читатели не видели наполовину обновлённое состояние
+        self._state = (ids, lat, lng, np.cos(lat))
+
+    def update(self, rows: Iterable[Change]):
+        """
+        rows: (id, lat_e6, lng_e6), a later row of the same id wins; None
+        coordinates remove the point.
+        """
+        latest = {pk: (lat_e6, lng_e6) for (pk, lat_e6, lng_e6) in rows}
+        if not latest:
+            return
+
+        ids, lat, lng, cos_lat = self._state
+        keep = ~np.isin(ids, np.fromiter(latest, dtype=np.int64, count=len(latest)))
+        added = np.array([
+            (pk, lat_e6, lng_e6) for pk, (lat_e6, lng_e6) in latest.items()
+            if lat_e6 is not None and lng_e6 is not None
+        ], dtype=np.int64).reshape(-1, 3)
+        added_lat = np.radians(added[:, 1] / E6)
+        added_lng = np.radians(added[:, 2] / E6)
+
+        self._state = (
+            np.concatenate([ids[keep], added[:, 0]]),
+            np.concatenate([lat[keep], added_lat]),
+            np.concatenate([lng[keep], added_lng]),
+            np.concatenate([cos_lat[keep], np.cos(added_lat)]),
+        )
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._state[0]
+
+    def distances(self, lat: float, lng: float) -> np.ndarray:
+        _, lats, lngs, cos_lats = self._state
+        return self._haversine(lat, lng, lats, lngs, cos_lats)
+
+    @staticmethod
+    def _haversine(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray, cos_lats: np.ndarray) -> np.ndarray:
+        lat, lng = np.radians(lat), np.radians(lng)
+        a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * cos_lats * np.sin((lngs - lng) / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """
+        (id, distance km) of the points within radius_km, nearest first.
+        """
+        ids, lats, lngs, cos_lats = self._state
+        if not len(ids):
+            return []
+
+        band = np.abs(lats - np.radians(lat)) <= np.radians(radius_km / KM_PER_DEGREE)
+        distances = self._haversine(lat, lng, lats[band], lngs[band], cos_lats[band])
+
+        found = distances <= radius_km
+        ids, distances = ids[band][found], distances[found]
+        order = np.argsort(distances, kind="stable")
+        return list(zip(ids[order].tolist(), distances[order].tolist()))
+
+    def nearest(self, lat: float, lng: float, limit: int = 1) -> List[Tuple[int, float]]:
+        ids = self.ids
+        if not len(ids):
+            return []
+
+        distances = self.distances(lat, lng)
+        limit = min(limit, len(ids))
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return list(zip(ids[nearest].tolist(), distances[nearest].tolist()))
+
+
+class AddressCoordinates(VersionedIndex):
+    """
+    Coordinates of all addresses. A new or changed address is not a full
+    rebuild: it is appended to a change log in Redis after commit and every
+    worker applies the log on its next version check. invalidate() bumps
+    the version and clears the log; it also happens when the log grows past
+    max_changes.
+    """
+    version_key = "geo:address_coordinates:version"
+    changes_key = "geo:address_coordinates:changes"
+    snapshot_section = "address_coordinates"
+
+    def __init__(self, *args, max_changes: int = MAX_CHANGES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.array = CoordinateArray()
+        self.max_changes = max_changes
+        self._applied = 0
+
+    def invalidate(self):
+        try:
+            pipe = REDIS_SERVICE.get_redis().pipeline()
+            pipe.incr(self.version_key)
+            pipe.delete(self.changes_key)
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def record_changes(self, rows: Iterable[Change]):
+        """
+        rows: (id, lat_e6, lng_e6), None coordinates remove the point.
+        Published when the current transaction commits.
+        """
+        entries = [f"{pk}:{'' if lat_e6 is None else lat_e6}:{'' if lng_e6 is None else lng_e6}"
+                   for (pk, lat_e6, lng_e6) in rows]
+        if entries:
+            transaction.on_commit(lambda: self._publish(entries))
+
+    def _publish(self, entries: List[str]):
+        try:
+            length = REDIS_SERVICE.get_redis().rpush(self.changes_key, *entries)
+        except redis.RedisError:
+            return
+
+        if length > self.max_changes:
+            self.invalidate()
+
+    @staticmethod
+    def parse_change(entry: bytes) -> Change:
+        pk, lat_e6, lng_e6 = entry.decode().split(":")
+        return int(pk), int(lat_e6) if lat_e6 else None, int(lng_e6) if lng_e6 else None
+
+    def load(self):
+        super().load()
+        # журнал с начала: изменения повторяются поверх снимка или БД, результат тот же
+        self._applied = 0
+        self.apply_changes()
+
+    def refresh(self):
+        # журнал уже читает другой поток
+        if not self._load_lock.acquire(blocking=False):
+            return
+
+        try:
+            self.apply_changes()
+        finally:
+            self._load_lock.release()
+
+    def apply_changes(self):
+        try:
+            entries = REDIS_SERVICE.get_redis().lrange(self.changes_key, self._applied, -1)
+        except redis.RedisError:
+            return
+
+        if entries:
+            self.array.update(self.parse_change(entry) for entry in entries)
+            self._applied += len(entries)
+
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        self.ensure_fresh()
+        return self.array.within(lat, lng, radius_km)
+
+    def nearest(self, lat: float, lng: float, limit: int = 1) -> List[Tuple[int, float]]:
+        self.ensure_fresh()
+        return self.array.nearest(lat, lng, limit)
+
+
+ADDRESS_COORDINATES = AddressCoordinates()
@@ -0,0 +1,323 @@
+from typing import Dict, Any, List, Union, Tuple, TypeVar, Callable, Hashable
+
+from django.db import models
+
+from core.app_services.model_versions import MODEL_VERSIONS
+from geo_city.models import City, Country, Region, Street, Address, fill_computed_fields
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.coordinate_array import ADDRESS_COORDINATES
+from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX
+from geo_city.services.street_fuzzy_index import STREET_FUZZY_INDEX
+
+DEFAULT_STREET_TYPE = "ул"
+
+# Идентификаторы ФИАС/КЛАДР, по которым ищем раньше, чем по названию.
+# Имена полей моделей совпадают с ключами в ответе DaData.
+# КЛАДР-код дома указывает на группу домов, поэтому адрес ищем только по ФИАС.
+LOOKUP_KEYS = {
+    City: ("city_fias_id", "city_kladr_id"),
+    Street: ("street_fias_id", "street_kladr_id"),
+    Address: ("house_fias_id",),
+}
+STORED_KEYS = {
+    City: ("city_fias_id", "city_kladr_id"),
+    Street: ("street_fias_id", "street_kladr_id"),
+    Address: ("house_fias_id", "house_kladr_id"),
+}
+
+T = TypeVar("T", bound=models.Model)
+
+
+def get_or_create_many(keys: Dict[Hashable, Callable[[], T]], query: Callable[[List[Hashable]], List[T]],
+                       get_key: Callable[[T], Hashable],
+                       on_create: Callable[[List[T]], Any] = None) -> Dict[Hashable, T]:
+    """
+    Set-based get_or_create: one query for the existing rows, one bulk insert
+    of the missing ones and one query to read them back.
+
+    keys: key -> factory of a new (unsaved) instance for this key.
+    query: returns existing instances for the list of keys.
+    on_create: called with the rows read back for the missing keys, with their
+    pk (bulk_create sends no signals and ignore_conflicts returns no pk).
+    """
+    if not keys:
+        return {}
+
+    result = {}
+    for instance in sorted(query(list(keys)), key=lambda instance: instance.pk):
+        result.setdefault(get_key(instance), instance)
+
+    missing = [key for key in keys if key not in result]
+    if missing:
+        instances = [keys[key]() for key in missing]
+        fill_computed_fields(instances)
+        type(instances[0]).objects.bulk_create(instances, ignore_conflicts=True)
+
+        for instance in sorted(query(missing), key=lambda instance: instance.pk):
+            result.setdefault(get_key(instance), instance)
+
+        created = [result[key] for key in missing if key in result]
+        if on_create and created:
+            on_create(created)
+
+    return result
+
+
+def bump_country_version(countries: List[Country]):
+    MODEL_VERSIONS.bump(Country)
+
+
+def invalidate_city_indexes(instances: List[Union[Region, City]]):
+    """
+    What the City/Region post_save signals do (see geo_city.signals).
+    """
+    MODEL_VERSIONS.bump(type(instances[0]))
+    CITY_INDEX.invalidate()
+    CITY_SPATIAL_INDEX.invalidate()
+
+
+def invalidate_street_fuzzy_index(streets: List[Street]):
+    for city_id in {street.city_id for street in streets}:
+        STREET_FUZZY_INDEX.invalidate(city_id)
+
+
+def find_by_natural_keys(queryset: models.QuerySet, items: List[Dict[str, Any]],
+                         fields: Tuple[str, ...]) -> List[Union[T, None]]:
+    """
+    One indexed query for all identifiers of the items. For every item returns
+    the row matched by the first field in `fields` that has a hit, or None.
+    """
+    values = {field: {data[field] for data in items if data.get(field)} for field in fields}
+    query = models.Q()
+    for field, field_values in values.items():
+        if field_values:
+            query |= models.Q(**{f"{field}__in": field_values})
+    if not query:
+        return [None] * len(items)
+
+    found = {field: {} for field in fields}
+    for instance in sorted(queryset.filter(query), key=lambda instance: instance.pk):
+        for field in fields:
+            value = getattr(instance, field)
+            if value:
+                found[field].setdefault(value, instance)
+
+    result = []
+    for data in items:
+        instance = None
+        for field in fields:
+            if data.get(field):
+                instance = found[field].get(data[field])
+                if instance:
+                    break
+        result.append(instance)
+    return result
+
+
+def backfill_natural_keys(instances: List[Union[T, None]], items: List[Dict[str, Any]], fields: Tuple[str, ...]):
+    """
+    Stores identifiers for rows that were found by name (created before the
+    identifiers were saved), so the next lookup is an index hit.
+    """
+    changed = {}
+    for instance, data in zip(instances, items):
+        if not instance:
+            continue
+
+        for field in fields:
+            if data.get(field) and not getattr(instance, field):
+                setattr(instance, field, data[field])
+                changed[instance.pk] = instance
+
+    if changed:
+        model = type(next(iter(changed.values())))
+        model.objects.bulk_update(list(changed.values()), fields)
+
+
+class SuggestionResolver:
+    """
+    Resolves a list of DaData address suggestions into Country, Region, City,
+    Street and Address rows level by level, so the whole search costs
+    a few IN queries and one bulk insert per level instead of a chain of
+    get/get_or_create per suggestion.
+
+    Cities, streets and addresses are matched by FIAS/KLADR identifiers first
+    and by name only when there is no identifier hit.
+    """
+    def __init__(self, suggestions: List[Dict[str, Any]]):
+        self.items = [suggestion.get("data") or {} for suggestion in suggestions]
+        self.countries: List[Union[Country, None]] = [None] * len(self.items)
+        self.regions: List[Union[Region, None]] = [None] * len(self.items)
+        self.cities: List[Union[City, None]] = [None] * len(self.items)
+        self.streets: List[Union[Street, None]] = [None] * len(self.items)
+        self.addresses: List[Union[Address, None]] = [None] * len(self.items)
+
+    def resolve_countries(self) -> List[Union[Country, None]]:
+        keys, codes = {}, {}
+        for data in self.items:
+            if data.get("country") and data.get("country_iso_code"):
+                name = data["country"].capitalize()
+                codes[name] = data["country_iso_code"]
+                keys[name] = lambda name=name: Country(code=codes[name], name=name)
+
+        # страна могла быть создана раньше под другим названием, поэтому ищем и по коду
+        countries = get_or_create_many(
+            keys,
+            lambda names: list(Country.objects.filter(
+                models.Q(name__in=names) | models.Q(code__in=[codes[name] for name in names]))),
+            lambda country: country.name,
+            on_create=bump_country_version,
+        )
+        countries_by_code = {country.code: country for country in countries.values()}
+
+        self.countries = [
+            countries.get(data["country"].capitalize()) or countries_by_code.get(data.get("country_iso_code"))
+            if data.get("country") else None
+            for data in self.items
+        ]
+        return self.countries
+
+    def resolve_regions(self) -> List[Union[Region, None]]:
+        self.resolve_countries()
+
+        keys = {}
+        for data, country in zip(self.items, self.countries):
+            if country and data.get("region"):
+                keys[(country.pk, data["region"])] = lambda country=country, data=data: Region(
+                    name=data["region"],
+                    country=country,
+                    region_kladr_id=data.get("region_kladr_id"),
+                    region_iso_code=data.get("region_iso_code"),
+                    region_type_full=data.get("region_type_full"),
+                    federal_district=data.get("federal_district"),
+                )
+
+        regions = get_or_create_many(
+            keys,
+            lambda _keys: list(Region.objects.select_related("country").filter(
+                country_id__in={key[0] for key in _keys}, name__in={key[1] for key in _keys})),
+            lambda region: (region.country_id, region.name),
+            on_create=invalidate_city_indexes,
+        )
+
+        self.regions = [
+            regions.get((country.pk, data.get("region"))) if country else None
+            for data, country in zip(self.items, self.countries)
+        ]
+        return self.regions
+
+    def resolve_cities(self) -> List[Union[City, None]]:
+        self.resolve_regions()
+        queryset = City.objects.select_related("region", "region__country")
+        found = find_by_natural_keys(queryset, self.items, LOOKUP_KEYS[City])
+
+        keys = {}
+        for data, region, city in zip(self.items, self.regions, found):
+            if not city and region and data.get("city"):
+                keys[(region.pk, data["city"])] = lambda region=region, data=data: City(
+                    region=region, name=data["city"],
+                    **{field: data.get(field) for field in STORED_KEYS[City]},
+                )
+
+        cities = get_or_create_many(
+            keys,
+            lambda _keys: list(queryset.filter(
+                region_id__in={key[0] for key in _keys}, name__in={key[1] for key in _keys})),
+            lambda city: (city.region_id, city.name),
+            on_create=invalidate_city_indexes,
+        )
+
+        self.cities = [
+            city or (cities.get((region.pk, data.get("city"))) if region else None)
+            for data, region, city in zip(self.items, self.regions, found)
+        ]
+        backfill_natural_keys(self.cities, self.items, STORED_KEYS[City])
+        return self.cities
+
+    def resolve_streets(self) -> List[Union[Street, None]]:
+        self.resolve_cities()
+        queryset = Street.objects.select_related("city", "city__region", "city__region__country")
+        found = find_by_natural_keys(queryset, self.items, LOOKUP_KEYS[Street])
+
+        keys = {}
+        for data, city, street in zip(self.items, self.cities, found):
+            if not street and city and data.get("street"):
+                street_type = data.get("street_type") or DEFAULT_STREET_TYPE
+                keys[(city.pk, data["street"], street_type)] = \
+                    lambda city=city, data=data, street_type=street_type: Street(
+                        city=city, street=data["street"], street_type=street_type,
+                        **{field: data.get(field) for field in STORED_KEYS[Street]},
+                    )
+
+        streets = get_or_create_many(
+            keys,
+            lambda _keys: list(queryset.filter(
+                city_id__in={key[0] for key in _keys}, street__in={key[1] for key in _keys})),
+            lambda street: (street.city_id, street.street, street.street_type),
+            on_create=invalidate_street_fuzzy_index,
+        )
+
+        self.streets = [
+            street or (streets.get((city.pk, data.get("street"), data.get("street_type") or DEFAULT_STREET_TYPE))
+                       if city else None)
+            for data, city, street in zip(self.items, self.cities, found)
+        ]
+        backfill_natural_keys(self.streets, self.items, STORED_KEYS[Street])
+        return self.streets
+
+    def resolve_addresses(self) -> List[Union[Address, None]]:
+        self.resolve_streets()
+        found = find_by_natural_keys(self._address_queryset(), self.items, LOOKUP_KEYS[Address])
+
+        keys = {}
+        homes: List[Union[str, None]] = []
+        for data, street, address in zip(self.items, self.streets, found):
+            home = data.get("house")
+            if not data.get("city") or (not data.get("house_fias_id") and not data.get("house_kladr_id")):
+                home = None
+            homes.append(home)
+
+            if not address and street:
+                keys[(street.pk, home)] = lambda street=street, home=home, data=data: Address(
+                    street=street,
+                    home=home,
+                    latitude=float(data["geo_lat"]) if data.get("geo_lat") else None,
+                    longitude=float(data["geo_lon"]) if data.get("geo_lon") else None,
+                    **({field: data.get(field) for field in STORED_KEYS[Address]} if home else {}),
+                )
+
+        addresses = get_or_create_many(
+            keys,
+            self._query_addresses,
+            lambda address: (address.street_id, address.home),
+            on_create=lambda created: ADDRESS_COORDINATES.record_changes(
+                (address.pk, address.lat_e6, address.lng_e6) for address in created
+            ),
+        )
+
+        self.addresses = [
+            address or (addresses.get((street.pk, home)) if street else None)
+            for home, street, address in zip(homes, self.streets, found)
+        ]
+        backfill_natural_keys(
+            self.addresses,
+            [data if home else {} for data, home in zip(self.items, homes)],
+            STORED_KEYS[Address],
+        )
+        return self.addresses
+
+    @staticmethod
+    def _address_queryset() -> models.QuerySet:
+        return Address.objects.select_related(
+            "street", "street__city", "street__city__region", "street__city__region__country"
+        )
+
+    @classmethod
+    def _query_addresses(cls, keys: List[Tuple[int, Union[str, None]]]) -> List[Address]:
+        queryset = cls._address_queryset()
+        homes = {key[1] for key in keys if key[1] is not None}
+        query = models.Q(home__in=homes)
+        if any(key[1] is None for key in keys):
+            query |= models.Q(home__isnull=True)
+
+        return list(queryset.filter(query, street_id__in={key[0] for key in keys}))
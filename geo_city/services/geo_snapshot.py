@@ -0,0 +1,174 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+from django.conf import settings
+from numpy.lib.format import descr_to_dtype, dtype_to_descr
+
+# Файл снимка гео-справочников; None - индексы всегда строятся из БД
+GEO_SNAPSHOT_PATH = getattr(settings, "GEO_SNAPSHOT_PATH", None)
+
+MAGIC = b"GEOSNAP\x00"
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+STRING_OFFSETS = "string_offsets"
+STRING_DATA = "string_data"
+
+
+def align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class StringTableWriter:
+    """
+    Interned strings of a snapshot: struct arrays keep an index into the
+    table, -1 is None.
+    """
+    def __init__(self):
+        self.positions: Dict[str, int] = {}
+        self.values: List[bytes] = []
+
+    def add(self, value: Union[str, None]) -> int:
+        if value is None:
+            return -1
+
+        position = self.positions.get(value)
+        if position is None:
+            position = self.positions[value] = len(self.values)
+            self.values.append(value.encode())
+        return position
+
+    def to_sections(self) -> Dict[str, np.ndarray]:
+        offsets = np.zeros(len(self.values) + 1, dtype="<u8")
+        offsets[1:] = np.cumsum([len(value) for value in self.values], dtype=np.uint64)
+        return {
+            STRING_OFFSETS: offsets,
+            STRING_DATA: np.frombuffer(b"".join(self.values), dtype=np.uint8),
+        }
+
+
+def write_snapshot(path: str, sections: Dict[str, np.ndarray], strings: StringTableWriter,
+                   metadata: Dict[str, Any]):
+    """
+    Layout: magic, uint32 header length, JSON header (metadata and the
+    offset, count and dtype of every section), then the raw little-endian
+    arrays, each aligned to 8 bytes.
+
+    The file is written next to the target and renamed over it, so workers
+    never map a half-written snapshot.
+    """
+    sections = {**sections, **strings.to_sections()}
+
+    directory = {}
+    offset = 0
+    for name, array in sections.items():
+        directory[name] = {"offset": offset, "count": len(array), "dtype": dtype_to_descr(array.dtype)}
+        offset = align(offset + array.nbytes)
+
+    header = json.dumps({"format": FORMAT_VERSION, "metadata": metadata, "sections": directory}).encode()
+    data_offset = align(len(MAGIC) + 4 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in sections.items():
+            file.seek(data_offset + directory[name]["offset"])
+            file.write(array.tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class GeoSnapshot:
+    """
+    Read-only memory map of a snapshot. Sections are numpy views over the
+    map: nothing is copied, all workers share the page cache.
+    """
+    def __init__(self, buffer: mmap.mmap):
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a geo snapshot")
+
+        header_length = struct.unpack_from("<I", buffer, len(MAGIC))[0]
+        start = len(MAGIC) + 4
+        header = json.loads(buffer[start:start + header_length])
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported geo snapshot format {header.get('format')}")
+
+        self.buffer = buffer
+        self.metadata: Dict[str, Any] = header["metadata"]
+        self.data_offset = align(start + header_length)
+        self.directory: Dict[str, Dict[str, Any]] = header["sections"]
+        self._offsets = self.section(STRING_OFFSETS)
+        self._strings_offset = self.data_offset + self.directory[STRING_DATA]["offset"]
+
+    @classmethod
+    def open(cls, path: str) -> "GeoSnapshot":
+        with open(path, "rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def section(self, name: str) -> Union[np.ndarray, None]:
+        entry = self.directory.get(name)
+        if entry is None:
+            return None
+
+        return np.frombuffer(self.buffer, dtype=descr_to_dtype(entry["dtype"]), count=entry["count"],
+                             offset=self.data_offset + entry["offset"])
+
+    def string(self, position: int) -> Union[str, None]:
+        if position < 0:
+            return None
+
+        start = self._strings_offset + int(self._offsets[position])
+        end = self._strings_offset + int(self._offsets[position + 1])
+        return self.buffer[start:end].decode()
+
+    def get_version(self, version_key: str) -> Union[bytes, None]:
+        """
+        Version of an index in Redis at the moment of the export.
+        """
+        version = self.metadata.get("versions", {}).get(version_key)
+        return version.encode() if version is not None else None
+
+
+_snapshot: Union[GeoSnapshot, None] = None
+_snapshot_lock = threading.Lock()
+# (inode, mtime, размер) открытого файла: export_geo_snapshot подменяет его через os.replace
+_snapshot_stat: Union[Tuple[int, int, int], None] = None
+
+
+def get_file_stat(path: Union[str, None]) -> Union[Tuple[int, int, int], None]:
+    if not path:
+        return None
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def get_snapshot() -> Union[GeoSnapshot, None]:
+    """
+    Snapshot at GEO_SNAPSHOT_PATH; None when it is not configured, missing
+    or unreadable. The file is mapped again when a new export replaces it.
+    """
+    global _snapshot, _snapshot_stat
+
+    stat = get_file_stat(GEO_SNAPSHOT_PATH)
+    if stat != _snapshot_stat:
+        with _snapshot_lock:
+            if stat != _snapshot_stat:
+                # прежний mmap закроется сам, когда на него не останется ссылок из индексов
+                try:
+                    _snapshot = GeoSnapshot.open(GEO_SNAPSHOT_PATH) if stat else None
+                except (OSError, ValueError, KeyError):
+                    _snapshot = None
+                _snapshot_stat = stat
+
+    return _snapshot
@@ -1,27 +1,195 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Union, List, BinaryIO, Tuple
+
 import exifread
+from django.conf import settings
+
+# Сколько файлов разбирать одновременно при пакетной загрузке
+EXIF_WORKERS = getattr(settings, "EXIF_WORKERS", 8)
+
+JPEG_SOI = b"\xff\xd8"
+APP1 = 0xE1
+SOS = 0xDA
+EOI = 0xD9
+EXIF_HEADER = b"Exif\x00\x00"
 
+GPS_IFD_TAG = 0x8825
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
 
-def get_geolocation_from_image(file):
-    exif = exifread.process_file(file)
-    latitude = exif.get('GPS GPSLatitude', None)
-    longitude = exif.get('GPS GPSLongitude', None)
-    if latitude and longitude:
-        try:
-            latitude_string = latitude.printable
-            longitude_string = longitude.printable
-            lat_data = latitude_string[1:-1]
-            lat_data = lat_data.split(', ')
-            splitted_lat_data2 = lat_data[2].split("/")
-            print(splitted_lat_data2)
-            new_lat_data = int(splitted_lat_data2[0]) / int(splitted_lat_data2[1])
-            data_longitude = longitude_string[1:-1]
-            data_longitude = data_longitude.split(', ')
-            splitted_longitude_data2 = data_longitude[2].split("/")
-            print(splitted_longitude_data2)
-            new_lon_data = int(splitted_longitude_data2[0]) / int(splitted_longitude_data2[1])
-            lat = f"{lat_data[0]} {lat_data[1]}' {new_lat_data}\""
-            lon = f"{data_longitude[0]} {data_longitude[1]}' {new_lon_data}\""
-            return {"latitude": lat, "longitude": lon}
-        except ZeroDivisionError:
+TYPE_ASCII = 2
+TYPE_RATIONAL = 5
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+
+def read_exif_segment(file: BinaryIO) -> Union[bytes, None]:
+    """
+    Returns the TIFF data of the APP1 Exif segment of a JPEG positioned
+    after the SOI marker. Only the segment headers before it are read, the
+    image data is never touched.
+    """
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
             return None
-    return None
+
+        # маркеры могут дополняться байтами 0xFF
+        while marker[1] == 0xFF:
+            marker = marker[1:] + file.read(1)
+            if len(marker) < 2:
+                return None
+
+        if marker[1] in (SOS, EOI):
+            return None
+
+        size = file.read(2)
+        if len(size) < 2:
+            return None
+        length = struct.unpack(">H", size)[0] - 2
+
+        if marker[1] == APP1:
+            data = file.read(length)
+            if data.startswith(EXIF_HEADER):
+                return data[len(EXIF_HEADER):]
+            continue
+
+        if hasattr(file, "seek"):
+            file.seek(length, 1)
+        else:
+            file.read(length)
+
+
+class TiffReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        if data[:2] == b"II":
+            self.order = "<"
+        elif data[:2] == b"MM":
+            self.order = ">"
+        else:
+            raise ValueError("Not a TIFF header")
+
+        if self.unpack("H", 2)[0] != 42:
+            raise ValueError("Not a TIFF header")
+
+    def unpack(self, fmt: str, offset: int) -> Tuple:
+        return struct.unpack_from(self.order + fmt, self.data, offset)
+
+    def first_ifd(self) -> int:
+        return self.unpack("I", 4)[0]
+
+    def read_ifd(self, offset: int) -> Dict[int, Any]:
+        """
+        Tag -> value of the ASCII and RATIONAL entries, other types are
+        returned as the raw value/offset field.
+        """
+        entries = {}
+        count = self.unpack("H", offset)[0]
+        for position in range(offset + 2, offset + 2 + count * 12, 12):
+            tag, type_, value_count = self.unpack("HHI", position)
+            size = TYPE_SIZES.get(type_, 1) * value_count
+            value_offset = position + 8 if size <= 4 else self.unpack("I", position + 8)[0]
+
+            if type_ == TYPE_ASCII:
+                entries[tag] = self.data[value_offset:value_offset + value_count].rstrip(b"\x00").decode("ascii")
+            elif type_ == TYPE_RATIONAL:
+                entries[tag] = [
+                    self.unpack("II", value_offset + index * 8) for index in range(value_count)
+                ]
+            else:
+                entries[tag] = self.unpack("I", position + 8)[0]
+        return entries
+
+
+def to_degrees(value: List[Tuple[int, int]], ref: str) -> float:
+    degrees, minutes, seconds = (numerator / denominator for (numerator, denominator) in value[:3])
+    result = degrees + minutes / 60 + seconds / 3600
+    return -result if ref in ("S", "W") else result
+
+
+def make_geolocation(latitude: List[Tuple[int, int]], longitude: List[Tuple[int, int]],
+                     latitude_ref: str, longitude_ref: str) -> Dict[str, Any]:
+    return {
+        "latitude": to_degrees(latitude, latitude_ref),
+        "longitude": to_degrees(longitude, longitude_ref),
+        "latitude_ref": latitude_ref,
+        "longitude_ref": longitude_ref,
+    }
+
+
+def get_geolocation_with_exifread(file: BinaryIO) -> Union[Dict[str, Any], None]:
+    """
+    GPS position of a TIFF, HEIC or other non-JPEG photo: exifread knows
+    their containers, but reads more of the file than the JPEG path.
+    """
+    if hasattr(file, "seek"):
+        file.seek(0)
+
+    try:
+        tags = exifread.process_file(file, details=False)
+    # на битых файлах exifread бросает свои исключения
+    except Exception:
+        return None
+
+    latitude = tags.get("GPS GPSLatitude")
+    longitude = tags.get("GPS GPSLongitude")
+    if not latitude or not longitude:
+        return None
+
+    latitude_ref = tags.get("GPS GPSLatitudeRef")
+    longitude_ref = tags.get("GPS GPSLongitudeRef")
+    return make_geolocation(
+        [(value.num, value.den) for value in latitude.values],
+        [(value.num, value.den) for value in longitude.values],
+        latitude_ref.printable.strip() if latitude_ref else "N",
+        longitude_ref.printable.strip() if longitude_ref else "E",
+    )
+
+
+def get_geolocation_from_image(file: BinaryIO) -> Union[Dict[str, Any], None]:
+    """
+    GPS position from the EXIF header of a photo: signed decimal degrees and
+    the hemisphere refs, None when the photo has no position.
+    """
+    try:
+        if hasattr(file, "seek"):
+            file.seek(0)
+
+        # JPEG разбираем сами, читая только заголовки; остальные форматы - через exifread
+        if file.read(2) != JPEG_SOI:
+            return get_geolocation_with_exifread(file)
+
+        data = read_exif_segment(file)
+        if not data:
+            return None
+
+        tiff = TiffReader(data)
+        gps_offset = tiff.read_ifd(tiff.first_ifd()).get(GPS_IFD_TAG)
+        if not gps_offset:
+            return None
+
+        gps = tiff.read_ifd(gps_offset)
+        if GPS_LATITUDE not in gps or GPS_LONGITUDE not in gps:
+            return None
+
+        return make_geolocation(gps[GPS_LATITUDE], gps[GPS_LONGITUDE],
+                                gps.get(GPS_LATITUDE_REF, "N"), gps.get(GPS_LONGITUDE_REF, "E"))
+    # теги GPS бывают записаны не тройками RATIONAL (ASCII, короткие массивы)
+    except (struct.error, ValueError, ZeroDivisionError, UnicodeDecodeError, TypeError, AttributeError, IndexError):
+        return None
+
+
+def get_geolocations_from_images(files: List[BinaryIO],
+                                 max_workers: int = EXIF_WORKERS) -> List[Union[Dict[str, Any], None]]:
+    """
+    get_geolocation_from_image for a batch of uploaded files, in the order
+    of `files`.
+    """
+    if not files:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(files))) as executor:
+        return list(executor.map(get_geolocation_from_image, files))
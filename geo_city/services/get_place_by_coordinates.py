@@ -1,7 +1,19 @@
 import geocoder
 
+from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX
+
 
 def get_place_by_coordinates(latitude, longitude):
+    hit = CITY_SPATIAL_INDEX.nearest(float(latitude), float(longitude))
+    if hit:
+        _, city = hit
+        return {
+            "region": city["region"],
+            "street": None,
+            "city": city["name"],
+            "neighborhood": 'Место без названия',
+        }
+
     geolocation = geocoder.osm('%s, %s' % (latitude, longitude))
     geolocation = geolocation.json
     region = geolocation.get('region', None)
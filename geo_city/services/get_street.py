@@ -1,32 +1,48 @@
+import asyncio
 from typing import Dict, Union, List, Tuple, Any
 
+import httpx
+from asgiref.sync import sync_to_async
+
 from core.app_services.dadata import find_city_address, Point, find_place
+from core.app_services.resilience import is_unavailable
 from geo_city.services.data_converters.place import place_serializer
+from geo_city.services.normalize import coordinate_cell
+from geo_city.services.local_suggestions import get_local_suggestions
+from geo_city.services.query_log import record_address_query, record_geolocate_query
+from geo_city.services.reverse_geocoding import get_local_place_from_gps, get_local_places_from_gps, \
+    get_local_city_place_from_gps, BATCH_CONCURRENCY
 
 
 async def get_valid_street(city_name: str, street: str, *address) -> Union[List[Dict], None]:
-    resp = await find_city_address(city_name, f"{street} {address}" if " ".join(address) else street)
+    query = f"{street} {' '.join(address)}" if " ".join(address) else street
+    record_address_query(city_name, query)
+    resp = await find_city_address(city_name, query)
 
-    if not resp.is_success:
+    if is_unavailable(resp):
+        suggestions = await sync_to_async(get_local_suggestions, thread_sensitive=False)(city_name, street, *address)
+
+    elif not resp.is_success:
         return None
 
-    resp_data = resp.json()
+    else:
+        suggestions = resp.json().get("suggestions")
 
-    if not resp_data.get("suggestions") or len(resp_data["suggestions"]) == 0:
+    if not suggestions:
         return None
 
     data = []
 
     if address:
         houses = set()
-        for street_data in resp_data["suggestions"]:
+        for street_data in suggestions:
             if street_data.get("data", {}).get("house") and street_data["data"]["house"] not in houses:
                 data.append(street_data)
                 houses.add(street_data["data"]["house"])
 
     else:
         streets = set()
-        for street_data in resp_data["suggestions"]:
+        for street_data in suggestions:
             if street_data.get("data", {}).get("street") and street_data["data"]["street"] not in streets:
                 data.append(street_data)
                 streets.add(street_data["data"]["street"])
@@ -35,8 +51,56 @@ async def get_valid_street(city_name: str, street: str, *address) -> Union[List[
 
 
 async def get_place_from_gps(gps: Point) -> Union[Dict[str, Any], None]:
+    # устаревший индекс перестраивается из БД, ORM нельзя звать в event loop
+    place = await sync_to_async(get_local_place_from_gps, thread_sensitive=False)(gps)
+    if place:
+        return place
+
+    return await find_remote_place(gps)
+
+
+async def get_places_from_gps(points: List[Point],
+                              concurrency: int = BATCH_CONCURRENCY) -> List[Union[Dict[str, Any], None]]:
+    """
+    Reverse geocoding of many points. Points in the same coordinate cell are
+    resolved once, the local indexes answer first and only the misses go to
+    the provider, at most `concurrency` requests at a time. The result is in
+    the order of `points`.
+    """
+    cells: Dict[str, Point] = {}
+    for point in points:
+        cells.setdefault(coordinate_cell(point.lat, point.lon), point)
+
+    # все локальные попадания одним вызовом вне event loop
+    places = await sync_to_async(get_local_places_from_gps, thread_sensitive=False)(cells)
+    misses = [cell for cell, place in places.items() if not place]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(cell: str):
+        async with semaphore:
+            try:
+                places[cell] = await find_remote_place(cells[cell])
+            except httpx.HTTPError:
+                places[cell] = None
+
+    await asyncio.gather(*(resolve(cell) for cell in misses))
+
+    result = []
+    for point in points:
+        place = places[coordinate_cell(point.lat, point.lon)]
+        result.append({**place, "lat": point.lat, "lng": point.lon} if place else None)
+
+    return result
+
+
+async def find_remote_place(gps: Point) -> Union[Dict[str, Any], None]:
+    record_geolocate_query(gps)
     resp = await find_place(gps)
 
+    if is_unavailable(resp):
+        return await sync_to_async(get_local_city_place_from_gps, thread_sensitive=False)(gps)
+
     if not resp.is_success:
         return None
 
@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Tuple, Callable, Union, Any
+
+from django.db import models, transaction
+
+from core.app_services.model_versions import MODEL_VERSIONS
+from geo_city.models import fill_computed_fields, Country, Region, City
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_csv(path: str, delimiter: str = ';') -> Iterator[Tuple[int, List[str]]]:
+    with open(path, 'r', encoding="utf8") as data_file:
+        data_reader = csv.reader(data_file, delimiter=delimiter)
+        next(data_reader, None)
+        for row_number, row in enumerate(data_reader, 1):
+            yield row_number, row
+
+
+def parse_float(value: str) -> Union[float, None]:
+    if not value:
+        return None
+
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        return None
+
+
+class Checkpoint:
+    """
+    Last imported row of every stage, saved to a JSON file after each batch.
+    """
+    def __init__(self, path: str = None):
+        self.path = path
+        self.data: Dict[str, int] = {}
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding="utf8") as checkpoint_file:
+                self.data = json.load(checkpoint_file)
+
+    def get(self, stage: str) -> int:
+        return self.data.get(stage, 0)
+
+    def set(self, stage: str, row_number: int):
+        self.data[stage] = row_number
+        if not self.path:
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding="utf8") as checkpoint_file:
+            json.dump(self.data, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.data = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class GeoImporter:
+    """
+    Streaming import of geo reference data.
+
+    Rows are read lazily, turned into model instances through in-memory key
+    maps and written with chunked bulk_create(ignore_conflicts=True), so
+    repeated runs skip rows that already exist. After every committed batch
+    the row number is stored in the checkpoint and an interrupted import
+    continues from it.
+    """
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, checkpoint_path: str = None,
+                 log: Callable[[str], Any] = print):
+        self.batch_size = batch_size
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.log = log
+
+    def run_stage(self, stage: str, rows: Iterable[Tuple[int, Any]],
+                  write_batch: Callable[[List[Any]], int]) -> int:
+        """
+        rows: (row number, item) pairs, write_batch writes a list of items and
+        returns the number of rows sent to the database. Rows that already
+        exist are skipped by ignore_conflicts, so this is an upper bound of
+        the inserted rows.
+        """
+        done = self.checkpoint.get(stage)
+        if done:
+            self.log(f"[{stage}] resume after row {done}")
+
+        started_at = time.monotonic()
+        total = 0
+        batch = []
+        last_row = done
+
+        for row_number, item in rows:
+            if row_number <= done:
+                continue
+
+            last_row = row_number
+            if item is None:
+                continue
+
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                total += self._write(stage, batch, last_row, write_batch, started_at, total, done)
+                batch = []
+
+        total += self._write(stage, batch, last_row, write_batch, started_at, total, done)
+        self.log(f"[{stage}] done: {last_row} rows read, {total} attempted in {time.monotonic() - started_at:.1f}s")
+        return total
+
+    def _write(self, stage: str, batch: List[Any], last_row: int, write_batch: Callable[[List[Any]], int],
+               started_at: float, total: int, done: int) -> int:
+        attempted = 0
+        with transaction.atomic():
+            if batch:
+                attempted = write_batch(batch)
+
+        # только после коммита: иначе при откате --resume пропустит эти строки
+        self.checkpoint.set(stage, last_row)
+
+        elapsed = time.monotonic() - started_at
+        self.log(f"[{stage}] row {last_row}: {total + attempted} attempted, "
+                 f"{(last_row - done) / elapsed if elapsed else 0:.0f} rows/s")
+        return attempted
+
+    def bulk_create(self, model: models.Model, instances: List[models.Model]) -> int:
+        fill_computed_fields(instances)
+        model.objects.bulk_create(instances, self.batch_size, ignore_conflicts=True)
+        return len(instances)
+
+    def finish(self):
+        self.checkpoint.clear()
+        CITY_INDEX.invalidate()
+        CITY_SPATIAL_INDEX.invalidate()
+        # bulk_create не отправляет сигналы
+        for model in (Country, Region, City):
+            MODEL_VERSIONS.bump(model)
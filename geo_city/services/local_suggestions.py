@@ -0,0 +1,95 @@
+from typing import Dict, Any, List
+
+from geo_city.models import Street, Address, City
+from geo_city.services.normalize import normalize_text, strip_street_type
+from geo_city.services.street_fuzzy_index import STREET_FUZZY_INDEX
+
+LIMIT_LOCAL_SUGGESTIONS = 20
+
+
+def city_suggestion_data(city: City) -> Dict[str, Any]:
+    region = city.region
+    country = region.country if region else None
+    return {
+        "country": country.name if country else None,
+        "country_iso_code": country.code if country else None,
+        "region": region.name if region else None,
+        "region_kladr_id": region.region_kladr_id if region else None,
+        "region_iso_code": region.region_iso_code if region else None,
+        "region_type_full": region.region_type_full if region else None,
+        "federal_district": region.federal_district if region else None,
+        "city": city.name,
+        "city_fias_id": city.city_fias_id,
+        "city_kladr_id": city.city_kladr_id,
+    }
+
+
+def street_suggestion(street: Street) -> Dict[str, Any]:
+    return {
+        "value": f"г {street.city.name}, {street.street_type} {street.street}",
+        "data": {
+            **city_suggestion_data(street.city),
+            "street": street.street,
+            "street_type": street.street_type,
+            "street_fias_id": street.street_fias_id,
+            "street_kladr_id": street.street_kladr_id,
+        },
+    }
+
+
+def address_suggestion(address: Address) -> Dict[str, Any]:
+    suggestion = street_suggestion(address.street)
+    suggestion["value"] = f"{suggestion['value']}, д {address.home}"
+    suggestion["data"].update({
+        "house": address.home,
+        "house_fias_id": address.house_fias_id,
+        "house_kladr_id": address.house_kladr_id,
+        "geo_lat": address.lat,
+        "geo_lon": address.lng,
+    })
+    return suggestion
+
+
+def get_local_suggestions(city_name: str, *words: str) -> List[Dict[str, Any]]:
+    """
+    DaData-shaped suggestions from streets and addresses already stored in
+    the database, used while the provider is unavailable. A trailing word
+    with a digit is treated as the house number; only houses confirmed by
+    DaData (with a FIAS id) are returned.
+    """
+    words = " ".join(words).split()
+    if not words:
+        return []
+
+    house = None
+    if len(words) > 1 and any(char.isdigit() for char in words[-1]):
+        house = normalize_text(words[-1])
+        words = words[:-1]
+
+    street = " ".join(words)
+    street_key = strip_street_type(street) or normalize_text(street)
+    city_key = normalize_text(city_name)
+
+    if house is None:
+        queryset = Street.objects.select_related("city", "city__region", "city__region__country")
+        streets = list(queryset.filter(city__search_key=city_key, search_key__startswith=street_key)
+                       .order_by("search_key", "pk")[:LIMIT_LOCAL_SUGGESTIONS])
+
+        if not streets:
+            # опечатка в названии улицы: ближайшие по расстоянию правки
+            city_ids = City.objects.filter(search_key=city_key).values_list("pk", flat=True)
+            ids = STREET_FUZZY_INDEX.search_cities(city_ids, street, LIMIT_LOCAL_SUGGESTIONS)
+            found = queryset.in_bulk(ids)
+            streets = [found[pk] for pk in ids if pk in found]
+
+        return [street_suggestion(street) for street in streets]
+
+    addresses = Address.objects.select_related(
+        "street", "street__city", "street__city__region", "street__city__region__country"
+    ).filter(
+        street__city__search_key=city_key,
+        street__search_key__startswith=street_key,
+        search_key__startswith=house,
+        house_fias_id__isnull=False,
+    ).order_by("search_key", "pk")[:LIMIT_LOCAL_SUGGESTIONS]
+    return [address_suggestion(address) for address in addresses]
@@ -0,0 +1,66 @@
+import re
+from typing import Union
+
+# Полные и сокращённые названия типов улиц -> сокращение ФИАС.
+# "пр" нет: это и проспект, и проезд, угадывать нельзя
+STREET_TYPES = {
+    "улица": "ул",
+    "ул": "ул",
+    "проспект": "пр-кт",
+    "просп": "пр-кт",
+    "пр-кт": "пр-кт",
+    "переулок": "пер",
+    "пер": "пер",
+    "площадь": "пл",
+    "пл": "пл",
+    "бульвар": "б-р",
+    "бул": "б-р",
+    "б-р": "б-р",
+    "шоссе": "ш",
+    "ш": "ш",
+    "проезд": "проезд",
+    "пр-д": "проезд",
+    "набережная": "наб",
+    "наб": "наб",
+    "тупик": "туп",
+    "туп": "туп",
+    "микрорайон": "мкр",
+    "мкр": "мкр",
+    "мкрн": "мкр",
+    "аллея": "аллея",
+    "ал": "аллея",
+    "тракт": "тракт",
+    "квартал": "кв-л",
+    "кв-л": "кв-л",
+}
+
+PUNCTUATION_RE = re.compile(r"[^\w\s-]+")
+SPACES_RE = re.compile(r"\s+")
+
+# Точность ячейки координат: 4 знака ~ 11 метров
+COORDINATE_CELL_PRECISION = 4
+
+
+def normalize_text(value: Union[str, None]) -> str:
+    if not value:
+        return ""
+
+    value = value.lower().replace("ё", "е")
+    value = PUNCTUATION_RE.sub(" ", value)
+    return SPACES_RE.sub(" ", value).strip(" -")
+
+
+def normalize_query(value: Union[str, None]) -> str:
+    """
+    Normalized form of an address query: case, spaces, ё/е, punctuation
+    and street type abbreviations are brought to one spelling.
+    """
+    return " ".join(STREET_TYPES.get(word, word) for word in normalize_text(value).split(" ") if word)
+
+
+def strip_street_type(value: Union[str, None]) -> str:
+    return " ".join(word for word in normalize_text(value).split(" ") if word and word not in STREET_TYPES)
+
+
+def coordinate_cell(lat: float, lon: float, precision: int = COORDINATE_CELL_PRECISION) -> str:
+    return f"{round(float(lat), precision):.{precision}f}:{round(float(lon), precision):.{precision}f}"
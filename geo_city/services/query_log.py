@@ -0,0 +1,77 @@
+from typing import List, Tuple
+
+import redis
+from django.conf import settings
+
+from core.app_services.dadata import Point
+from core.app_services.redis_service import REDIS_SERVICE
+from geo_city.services.normalize import normalize_query, normalize_text, coordinate_cell
+
+CACHE_WARMUP = getattr(settings, "CACHE_WARMUP", {})
+
+# Сколько самых частых запросов хранить в журнале
+QUERY_LOG_MAX_SIZE = CACHE_WARMUP.get("query_log_max_size", 10000)
+
+SEPARATOR = "\t"
+
+
+class QueryLog:
+    """
+    Frequency of user queries in a Redis sorted set (member -> count).
+    The set is trimmed to the max_size most frequent members by trim().
+    """
+    def __init__(self, key: str, max_size: int = QUERY_LOG_MAX_SIZE):
+        self.key = key
+        self.max_size = max_size
+
+    def record(self, member: str):
+        try:
+            REDIS_SERVICE.get_redis().zincrby(self.key, 1, member)
+        except redis.RedisError:
+            pass
+
+    def top(self, limit: int) -> List[str]:
+        try:
+            members = REDIS_SERVICE.get_redis().zrevrange(self.key, 0, limit - 1)
+        except redis.RedisError:
+            return []
+        return [member.decode() for member in members]
+
+    def trim(self):
+        try:
+            REDIS_SERVICE.get_redis().zremrangebyrank(self.key, 0, -self.max_size - 1)
+        except redis.RedisError:
+            pass
+
+
+ADDRESS_QUERY_LOG = QueryLog("warmup:address_queries")
+GEOLOCATE_QUERY_LOG = QueryLog("warmup:geolocate_queries")
+
+
+def record_address_query(city_name: str, street: str):
+    ADDRESS_QUERY_LOG.record(f"{normalize_text(city_name)}{SEPARATOR}{normalize_query(street)}")
+
+
+def top_address_queries(limit: int) -> List[Tuple[str, str]]:
+    """
+    (city name, street query) of the most frequent address searches.
+    """
+    return [tuple(member.split(SEPARATOR, 1)) for member in ADDRESS_QUERY_LOG.top(limit) if SEPARATOR in member]
+
+
+def record_geolocate_query(gps: Point):
+    GEOLOCATE_QUERY_LOG.record(coordinate_cell(gps.lat, gps.lon))
+
+
+def top_geolocate_queries(limit: int) -> List[Point]:
+    """
+    Centers of the coordinate cells reverse-geocoded most often.
+    """
+    points = []
+    for member in GEOLOCATE_QUERY_LOG.top(limit):
+        try:
+            lat, lon = (float(value) for value in member.split(":"))
+        except ValueError:
+            continue
+        points.append(Point(lat=lat, lon=lon))
+    return points
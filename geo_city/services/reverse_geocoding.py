@@ -0,0 +1,184 @@
+import csv
+import os
+from typing import Dict, Any, Union, Iterable, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from core.app_services.dadata import Point
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.geo_snapshot import GeoSnapshot, StringTableWriter
+from geo_city.services.spatial_index import SpatialIndex
+from geo_city.services.versioned_index import VersionedIndex
+
+REVERSE_GEOCODING = getattr(settings, "REVERSE_GEOCODING", {})
+
+# Дальше этого расстояния (км) от ближайшего объекта идём к внешнему провайдеру
+PLACE_RADIUS_KM = REVERSE_GEOCODING.get("place_radius_km", 0.05)
+CITY_RADIUS_KM = REVERSE_GEOCODING.get("city_radius_km", 10)
+# Начальные координаты городов, если таблица City ещё пуста
+SEED_CSV = REVERSE_GEOCODING.get("seed_csv", os.path.join(settings.BASE_DIR, "koord_russia.csv"))
+BATCH_MAX_POINTS = REVERSE_GEOCODING.get("batch_max_points", 500)
+BATCH_CONCURRENCY = REVERSE_GEOCODING.get("batch_concurrency", 8)
+
+CITY_POINTS_SNAPSHOT_DTYPE = np.dtype([
+    ("id", "<i8"), ("lat", "<f8"), ("lng", "<f8"), ("name", "<i4"), ("region", "<i4"),
+])
+# city_id = -1 - место без города
+PLACE_POINTS_SNAPSHOT_DTYPE = np.dtype([
+    ("id", "<i8"), ("city_id", "<i8"), ("lat", "<f8"), ("lng", "<f8"), ("place_name", "<i4"),
+])
+
+
+class CitySpatialIndex(VersionedIndex):
+    version_key = "geo:city_spatial_index:version"
+    snapshot_section = "city_points"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = SpatialIndex()
+
+    def get_points(self) -> Iterable[Tuple[float, float, Dict[str, Any]]]:
+        from geo_city.models import City, from_e6
+
+        cities = City.objects.filter(lat_e6__isnull=False, lng_e6__isnull=False)\
+            .values_list("pk", "name", "region__name", "lat_e6", "lng_e6")
+        for (pk, name, region_name, lat_e6, lng_e6) in cities.iterator():
+            yield from_e6(lat_e6), from_e6(lng_e6), {"id": pk, "name": name, "region": region_name}
+
+    def get_seed_points(self) -> Iterable[Tuple[float, float, Dict[str, Any]]]:
+        if not SEED_CSV or not os.path.exists(SEED_CSV):
+            return
+
+        with open(SEED_CSV, 'r', encoding="utf8") as data_file:
+            data_reader = csv.reader(data_file, delimiter=';')
+            next(data_reader)
+            for row in data_reader:
+                yield float(row[3].replace(",", ".")), float(row[4].replace(",", ".")), \
+                      {"id": None, "name": row[0], "region": row[1]}
+
+    def rebuild(self):
+        self.index.build(self.get_points())
+        if not len(self.index):
+            self.index.build(self.get_seed_points())
+
+    def dump_snapshot(self, strings: StringTableWriter) -> np.ndarray:
+        return np.array([
+            (item["id"], lat, lng, strings.add(item["name"]), strings.add(item["region"]))
+            for (lat, lng, item) in self.get_points()
+        ], dtype=CITY_POINTS_SNAPSHOT_DTYPE)
+
+    def rebuild_from_snapshot(self, snapshot: GeoSnapshot, rows: np.ndarray) -> bool:
+        # пустой снимок: нужны начальные координаты из SEED_CSV
+        if not len(rows):
+            return False
+
+        self.index.build(
+            (lat, lng, {"id": pk, "name": snapshot.string(name), "region": snapshot.string(region)})
+            for (pk, lat, lng, name, region) in zip(
+                rows["id"].tolist(), rows["lat"].tolist(), rows["lng"].tolist(),
+                rows["name"].tolist(), rows["region"].tolist(),
+            )
+        )
+        return True
+
+    def nearest(self, lat: float, lng: float, max_km: float = CITY_RADIUS_KM) -> Union[Tuple[float, Dict], None]:
+        self.ensure_fresh()
+        return self.index.nearest(lat, lng, max_km)
+
+
+class PlaceSpatialIndex(VersionedIndex):
+    version_key = "geo:place_spatial_index:version"
+    snapshot_section = "place_points"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = SpatialIndex()
+
+    def get_points(self) -> Iterable[Tuple[float, float, Dict[str, Any]]]:
+        from geo_city.models import Place, from_e6
+
+        places = Place.objects.filter(lat_e6__isnull=False, lng_e6__isnull=False)\
+            .values_list("pk", "place_name", "city_id", "lat_e6", "lng_e6")
+        for (pk, place_name, city_id, lat_e6, lng_e6) in places.iterator():
+            yield from_e6(lat_e6), from_e6(lng_e6), {"id": pk, "place_name": place_name, "city_id": city_id}
+
+    def rebuild(self):
+        self.index.build(self.get_points())
+
+    def dump_snapshot(self, strings: StringTableWriter) -> np.ndarray:
+        return np.array([
+            (item["id"], item["city_id"] if item["city_id"] is not None else -1, lat, lng,
+             strings.add(item["place_name"]))
+            for (lat, lng, item) in self.get_points()
+        ], dtype=PLACE_POINTS_SNAPSHOT_DTYPE)
+
+    def rebuild_from_snapshot(self, snapshot: GeoSnapshot, rows: np.ndarray) -> bool:
+        self.index.build(
+            (lat, lng, {"id": pk, "place_name": snapshot.string(name), "city_id": city_id if city_id >= 0 else None})
+            for (pk, city_id, lat, lng, name) in zip(
+                rows["id"].tolist(), rows["city_id"].tolist(), rows["lat"].tolist(), rows["lng"].tolist(),
+                rows["place_name"].tolist(),
+            )
+        )
+        return True
+
+    def nearest(self, lat: float, lng: float, max_km: float = PLACE_RADIUS_KM) -> Union[Tuple[float, Dict], None]:
+        self.ensure_fresh()
+        return self.index.nearest(lat, lng, max_km)
+
+
+CITY_SPATIAL_INDEX = CitySpatialIndex()
+PLACE_SPATIAL_INDEX = PlaceSpatialIndex()
+
+
+def get_local_place_from_gps(gps: Point) -> Union[Dict[str, Any], None]:
+    hit = PLACE_SPATIAL_INDEX.nearest(gps.lat, gps.lon)
+    if not hit:
+        return None
+
+    _, place = hit
+    city = CITY_INDEX.get(place["city_id"]) if place["city_id"] else None
+    if not city:
+        return None
+
+    return {
+        "street": None,
+        "city": city,
+        "place_name": place["place_name"],
+        "building": None,
+        "lat": gps.lat,
+        "lng": gps.lon,
+    }
+
+
+def get_local_places_from_gps(points: Dict[str, Point]) -> Dict[str, Union[Dict[str, Any], None]]:
+    """
+    get_local_place_from_gps for many points at once, keyed as `points`.
+    Sync: a stale index is rebuilt from the database on the first point.
+    """
+    return {key: get_local_place_from_gps(point) for key, point in points.items()}
+
+
+def get_local_city_place_from_gps(gps: Point) -> Union[Dict[str, Any], None]:
+    """
+    City-level place from the nearest known city, used while the provider
+    is unavailable.
+    """
+    hit = CITY_SPATIAL_INDEX.nearest(gps.lat, gps.lon)
+    if not hit:
+        return None
+
+    _, city = hit
+    city = CITY_INDEX.get(city["id"]) if city["id"] else None
+    if not city:
+        return None
+
+    return {
+        "street": None,
+        "city": city,
+        "place_name": None,
+        "building": None,
+        "lat": gps.lat,
+        "lng": gps.lon,
+    }
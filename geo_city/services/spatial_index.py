@@ -0,0 +1,117 @@
+import math
+from typing import Dict, List, Tuple, Any, Iterable, Union
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Размер ячейки сетки в градусах (~11 км по широте)
+DEFAULT_CELL_SIZE = 0.1
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    Fixed grid of lat/lon cells for nearest-point queries.
+
+    nearest() walks rings of cells around the query point and stops as soon
+    as no point in the next ring can be closer than the best one found.
+    """
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, Any]]] = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def get_cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    def build(self, points: Iterable[Tuple[float, float, Any]]):
+        cells = {}
+        size = 0
+        for (lat, lon, item) in points:
+            cells.setdefault(self.get_cell(lat, lon), []).append((float(lat), float(lon), item))
+            size += 1
+
+        self._cells, self._size = cells, size
+
+    def _ring(self, cell: Tuple[int, int], radius: int) -> Iterable[Tuple[int, int]]:
+        x, y = cell
+        if radius == 0:
+            yield cell
+            return
+
+        for dy in range(-radius, radius + 1):
+            yield x - radius, y + dy
+            yield x + radius, y + dy
+        for dx in range(-radius + 1, radius):
+            yield x + dx, y - radius
+            yield x + dx, y + radius
+
+    def _ring_min_distance(self, lat: float, radius: int) -> float:
+        # ближайшая точка кольца radius + 1 не ближе radius полных ячеек;
+        # по долготе ячейка сужается к полюсу, берём худший косинус
+        max_lat = min(89.9, abs(lat) + (radius + 1) * self.cell_size)
+        return radius * self.cell_size * KM_PER_DEGREE * math.cos(math.radians(max_lat))
+
+    def _scan(self, cells: Iterable[Tuple[int, int]], lat: float, lon: float) -> Iterable[Tuple[float, Any]]:
+        for _cell in cells:
+            for (_lat, _lon, item) in self._cells.get(_cell, ()):
+                yield haversine_km(lat, lon, _lat, _lon), item
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, Any]]:
+        cell = self.get_cell(lat, lon)
+        result = []
+        radius = 0
+
+        while True:
+            if (2 * radius + 1) ** 2 > 4 * len(self._cells):
+                # кольца стали больше занятой части сетки, проще проверить все ячейки
+                result = [hit for hit in self._scan(self._cells, lat, lon) if hit[0] <= radius_km]
+                break
+
+            result.extend(hit for hit in self._scan(self._ring(cell, radius), lat, lon) if hit[0] <= radius_km)
+            if self._ring_min_distance(lat, radius) > radius_km:
+                break
+
+            radius += 1
+
+        result.sort(key=lambda hit: hit[0])
+        return result
+
+    def nearest(self, lat: float, lon: float, max_km: float = None) -> Union[Tuple[float, Any], None]:
+        if not self._size:
+            return None
+
+        cell = self.get_cell(lat, lon)
+        best = None
+        radius = 0
+
+        while True:
+            if (2 * radius + 1) ** 2 > 4 * len(self._cells):
+                best = min(self._scan(self._cells, lat, lon), key=lambda hit: hit[0])
+                break
+
+            for hit in self._scan(self._ring(cell, radius), lat, lon):
+                if best is None or hit[0] < best[0]:
+                    best = hit
+
+            bound = self._ring_min_distance(lat, radius)
+            if best is not None and best[0] <= bound:
+                break
+
+            if max_km is not None and bound > max_km:
+                break
+
+            radius += 1
+
+        if best is None or (max_km is not None and best[0] > max_km):
+            return None
+
+        return best
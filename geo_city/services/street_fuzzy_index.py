@@ -0,0 +1,256 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Set, Tuple, Union
+
+import numpy as np
+import redis
+from django.conf import settings
+
+from core.app_services.redis_service import REDIS_SERVICE
+from geo_city.services.geo_snapshot import StringTableWriter, get_snapshot
+from geo_city.services.normalize import normalize_text, strip_street_type
+from geo_city.services.versioned_index import INDEX_REFRESH_INTERVAL
+
+STREET_FUZZY_SEARCH = getattr(settings, "STREET_FUZZY_SEARCH", {})
+
+# Сколько городов держать в памяти воркера
+MAX_CITIES = STREET_FUZZY_SEARCH.get("max_cities", 32)
+# Допустимое число опечаток: для коротких названий - одна, для длинных - две
+SHORT_WORD_LENGTH = STREET_FUZZY_SEARCH.get("short_word_length", 5)
+MAX_DISTANCE = STREET_FUZZY_SEARCH.get("max_distance", 2)
+# Удаления строятся только по началу названия: меньше памяти, та же точность
+PREFIX_LENGTH = STREET_FUZZY_SEARCH.get("prefix_length", 7)
+
+# улицы в снимке отсортированы по городу
+STREET_SNAPSHOT_DTYPE = np.dtype([("city_id", "<i8"), ("id", "<i8"), ("search_key", "<i4")])
+
+
+def levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Edit distance between a and b; anything above max_distance is returned
+    as max_distance + 1 as soon as it is known.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+
+    return min(previous[-1], max_distance + 1)
+
+
+def get_deletes(word: str, max_distance: int) -> Set[str]:
+    """
+    The word and every string made of it by deleting up to max_distance
+    characters.
+    """
+    deletes = {word}
+    edge = {word}
+    for _ in range(max_distance):
+        edge = {variant[:i] + variant[i + 1:] for variant in edge for i in range(len(variant))} - deletes
+        deletes |= edge
+    return deletes
+
+
+class SymSpellDictionary:
+    """
+    Symmetric delete dictionary: every word is stored under all strings
+    made of its prefix by deleting up to max_distance characters. Two words
+    within distance d share such a string, so a search is a few dozen dict
+    lookups plus an exact check of the candidates, without a scan.
+    """
+    def __init__(self, max_distance: int = MAX_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words: Dict[str, List[int]] = {}
+        self.deletes: Dict[str, List[str]] = {}
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, word: str, pk: int):
+        if word in self.words:
+            self.words[word].append(pk)
+            return
+
+        self.words[word] = [pk]
+        for delete in get_deletes(word[:self.prefix_length], self.max_distance):
+            self.deletes.setdefault(delete, []).append(word)
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str, List[int]]]:
+        """
+        (distance, word, ids) of the words within max_distance, nearest first.
+        """
+        max_distance = min(max_distance, self.max_distance)
+
+        candidates = set()
+        for delete in get_deletes(word[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        found = []
+        for candidate in candidates:
+            distance = levenshtein(word, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate, self.words[candidate]))
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
+
+
+def get_max_distance(word: str) -> int:
+    return 1 if len(word) <= SHORT_WORD_LENGTH else MAX_DISTANCE
+
+
+class StreetFuzzyIndex:
+    """
+    Typo-tolerant search of streets by Street.search_key, one
+    SymSpellDictionary per city. Dictionaries are built on the first search
+    in a city and evicted LRU when more than max_cities are held.
+
+    A street change bumps the version of its city in a Redis hash, a worker
+    rebuilds the dictionary of that city after at most refresh_interval.
+    A city whose version matches the geo snapshot is read from the snapshot.
+    """
+    version_key = "geo:street_fuzzy:versions"
+    snapshot_section = "streets"
+
+    def __init__(self, max_cities: int = MAX_CITIES, refresh_interval: float = INDEX_REFRESH_INTERVAL):
+        self.max_cities = max_cities
+        self.refresh_interval = refresh_interval
+        # city_id -> (словарь, версия, когда сверяли версию)
+        self._dictionaries: "OrderedDict[int, Tuple[SymSpellDictionary, Union[bytes, None], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_version(self, city_id: int) -> Union[bytes, None]:
+        try:
+            return REDIS_SERVICE.get_redis().hget(self.version_key, city_id)
+        except redis.RedisError:
+            return None
+
+    def invalidate(self, city_id: int):
+        try:
+            REDIS_SERVICE.get_redis().hincrby(self.version_key, city_id, 1)
+        except redis.RedisError:
+            pass
+
+    @staticmethod
+    def build(rows: Iterable[Tuple[int, str]]) -> SymSpellDictionary:
+        """
+        rows: (street id, search_key)
+        """
+        dictionary = SymSpellDictionary()
+        for pk, key in rows:
+            if key:
+                dictionary.add(key, pk)
+        return dictionary
+
+    def ensure_versions(self, city_ids: Iterable[int]) -> Dict[str, str]:
+        """
+        Versions of all cities, created for the cities that have never been
+        changed: a snapshot is only trusted against an existing version.
+        """
+        r = REDIS_SERVICE.get_redis()
+        pipe = r.pipeline(transaction=False)
+        for city_id in city_ids:
+            pipe.hsetnx(self.version_key, city_id, 0)
+        pipe.execute()
+        return {city_id.decode(): version.decode() for city_id, version in r.hgetall(self.version_key).items()}
+
+    def dump_snapshot(self, strings: StringTableWriter) -> Tuple[np.ndarray, Dict[str, str]]:
+        """
+        Street rows of the snapshot and the city versions they were read at.
+        """
+        from geo_city.models import Street
+
+        streets = Street.objects.filter(city_id__isnull=False)
+        versions = self.ensure_versions(streets.values_list("city_id", flat=True).distinct())
+        rows = streets.order_by("city_id", "pk").values_list("city_id", "pk", "search_key")
+        return np.array([
+            (city_id, pk, strings.add(key)) for (city_id, pk, key) in rows.iterator()
+        ], dtype=STREET_SNAPSHOT_DTYPE), versions
+
+    def load_snapshot(self, city_id: int, version: Union[bytes, None]) -> Union[SymSpellDictionary, None]:
+        if version is None:
+            return None
+
+        snapshot = get_snapshot()
+        if snapshot is None or snapshot.metadata.get("street_versions", {}).get(str(city_id)) != version.decode():
+            return None
+
+        rows = snapshot.section(self.snapshot_section)
+        if rows is None:
+            return None
+
+        start, end = np.searchsorted(rows["city_id"], [city_id, city_id + 1])
+        rows = rows[start:end]
+        return self.build(
+            (pk, snapshot.string(key)) for (pk, key) in zip(rows["id"].tolist(), rows["search_key"].tolist())
+        )
+
+    def load(self, city_id: int) -> SymSpellDictionary:
+        from geo_city.models import Street
+
+        version = self.get_version(city_id)
+        dictionary = self.load_snapshot(city_id, version)
+        if dictionary is None:
+            streets = Street.objects.filter(city_id=city_id).values_list("pk", "search_key")
+            dictionary = self.build(streets.iterator())
+
+        with self._lock:
+            self._dictionaries[city_id] = (dictionary, version, time.monotonic())
+            self._dictionaries.move_to_end(city_id)
+            while len(self._dictionaries) > self.max_cities:
+                self._dictionaries.popitem(last=False)
+        return dictionary
+
+    def get_dictionary(self, city_id: int) -> SymSpellDictionary:
+        with self._lock:
+            entry = self._dictionaries.get(city_id)
+            if entry is not None:
+                self._dictionaries.move_to_end(city_id)
+
+        if entry is None:
+            return self.load(city_id)
+
+        dictionary, version, checked_at = entry
+        now = time.monotonic()
+        if now - checked_at < self.refresh_interval:
+            return dictionary
+
+        if self.get_version(city_id) != version:
+            return self.load(city_id)
+
+        with self._lock:
+            if city_id in self._dictionaries:
+                self._dictionaries[city_id] = (dictionary, version, now)
+        return dictionary
+
+    def search(self, city_id: int, street: str, limit: int = 20) -> List[Tuple[int, int]]:
+        """
+        (street id, edit distance) of the streets of the city whose name is
+        within the allowed number of typos of `street`, closest first.
+        """
+        key = strip_street_type(street) or normalize_text(street)
+        if not key:
+            return []
+
+        result = []
+        for distance, _, ids in self.get_dictionary(city_id).search(key, get_max_distance(key)):
+            result.extend((pk, distance) for pk in ids)
+        return result[:limit]
+
+    def search_cities(self, city_ids: Iterable[int], street: str, limit: int = 20) -> List[int]:
+        found: Dict[int, int] = {}
+        for city_id in city_ids:
+            found.update(self.search(city_id, street, limit))
+        return sorted(found, key=lambda pk: (found[pk], pk))[:limit]
+
+
+STREET_FUZZY_INDEX = StreetFuzzyIndex()
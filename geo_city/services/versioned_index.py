@@ -0,0 +1,113 @@
+import threading
+import time
+from typing import Union
+
+import numpy as np
+import redis
+from django.conf import settings
+
+from core.app_services.redis_service import REDIS_SERVICE
+from geo_city.services.geo_snapshot import GeoSnapshot, StringTableWriter, get_snapshot
+
+# Как часто (сек) сверять локальную версию индекса с версией в Redis
+INDEX_REFRESH_INTERVAL = getattr(settings, "GEO_INDEX_REFRESH_INTERVAL", 5)
+
+
+class VersionedIndex:
+    """
+    Base class of in-process indexes shared by gunicorn workers.
+
+    A change bumps the version counter in Redis, every worker compares it
+    with its own version at most once per refresh_interval and rebuilds.
+
+    An index with a snapshot_section is first loaded from the geo snapshot
+    (see export_geo_snapshot) when the snapshot was taken at the current
+    version, otherwise from the database.
+    """
+    version_key: str = ""
+    snapshot_section: str = ""
+
+    def __init__(self, refresh_interval: float = INDEX_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._load_lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.is_loaded = False
+
+    def get_remote_version(self) -> Union[bytes, None]:
+        try:
+            return REDIS_SERVICE.get_redis().get(self.version_key)
+        except redis.RedisError:
+            return None
+
+    def invalidate(self):
+        try:
+            REDIS_SERVICE.get_redis().incr(self.version_key)
+        except redis.RedisError:
+            pass
+
+    def ensure_version(self) -> Union[str, None]:
+        """
+        Current version, created if the index has never been changed: a
+        snapshot is only trusted against an existing version.
+        """
+        r = REDIS_SERVICE.get_redis()
+        r.setnx(self.version_key, 0)
+        version = r.get(self.version_key)
+        return version.decode() if version is not None else None
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def dump_snapshot(self, strings: StringTableWriter) -> np.ndarray:
+        raise NotImplementedError
+
+    def rebuild_from_snapshot(self, snapshot: GeoSnapshot, rows: np.ndarray) -> bool:
+        """
+        Returns False when the snapshot rows can not be used.
+        """
+        raise NotImplementedError
+
+    def load_snapshot(self, version: Union[bytes, None]) -> bool:
+        if not self.snapshot_section or version is None:
+            return False
+
+        snapshot = get_snapshot()
+        if snapshot is None or snapshot.get_version(self.version_key) != version:
+            return False
+
+        rows = snapshot.section(self.snapshot_section)
+        return rows is not None and self.rebuild_from_snapshot(snapshot, rows)
+
+    def load(self):
+        version = self.get_remote_version()
+        if not self.load_snapshot(version):
+            self.rebuild()
+        self._version = version
+        self._checked_at = time.monotonic()
+        self.is_loaded = True
+
+    def ensure_fresh(self):
+        if not self.is_loaded:
+            with self._load_lock:
+                if not self.is_loaded:
+                    self.load()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_interval:
+            return
+
+        self._checked_at = now
+        version = self.get_remote_version()
+        if version != self._version:
+            with self._load_lock:
+                self.load()
+        else:
+            self.refresh()
+
+    def refresh(self):
+        """
+        Called when the version is unchanged: an index that receives
+        incremental changes applies them here.
+        """
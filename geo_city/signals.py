@@ -0,0 +1,51 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.app_services.model_versions import MODEL_VERSIONS
+from geo_city.models import City, Region, Place, Address, Country, Street
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.coordinate_array import ADDRESS_COORDINATES
+from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX, PLACE_SPATIAL_INDEX
+from geo_city.services.street_fuzzy_index import STREET_FUZZY_INDEX
+
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+def invalidate_city_index(sender, instance, **kwargs):
+    CITY_INDEX.invalidate()
+    CITY_SPATIAL_INDEX.invalidate()
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def invalidate_place_index(sender, instance, **kwargs):
+    PLACE_SPATIAL_INDEX.invalidate()
+
+
+@receiver(post_save, sender=Address)
+def update_address_coordinates(sender, instance, **kwargs):
+    ADDRESS_COORDINATES.record_changes([(instance.pk, instance.lat_e6, instance.lng_e6)])
+
+
+@receiver(post_delete, sender=Address)
+def remove_address_coordinates(sender, instance, **kwargs):
+    ADDRESS_COORDINATES.record_changes([(instance.pk, None, None)])
+
+
+@receiver(post_save, sender=Country)
+@receiver(post_delete, sender=Country)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def bump_model_version(sender, instance, **kwargs):
+    MODEL_VERSIONS.bump(sender)
+
+
+@receiver(post_save, sender=Street)
+@receiver(post_delete, sender=Street)
+def invalidate_street_fuzzy_index(sender, instance, **kwargs):
+    if instance.city_id:
+        STREET_FUZZY_INDEX.invalidate(instance.city_id)
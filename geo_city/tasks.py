@@ -0,0 +1,13 @@
+from typing import List
+
+from asgiref.sync import async_to_sync
+
+from main.celery import app
+from geo_city.services.cache_warmup import warm_caches, SOURCES, WARMUP_TOP_QUERIES, WARMUP_CONCURRENCY, \
+    WARMUP_BUDGET
+
+
+@app.task(bind=True)
+def warm_suggestion_caches(task_obj, sources: List[str] = SOURCES, top_queries: int = WARMUP_TOP_QUERIES,
+                           concurrency: int = WARMUP_CONCURRENCY, budget: int = WARMUP_BUDGET):
+    return async_to_sync(warm_caches)(tuple(sources), top_queries, concurrency, budget)
@@ -1,8 +1,43 @@
+import asyncio
+import io
 import pprint
+import os
+import struct
+import tempfile
+import threading
+import time
+from unittest import mock
 
-from django.test import TestCase
-from geo_city.models import City, Country, Region, Street
-from geo_city.serializers import PlaceSerializer, AddressSerializer, StreetSerializer
+from asgiref.sync import async_to_sync
+
+import httpx
+import redis
+from django.core.management import call_command
+from django.db.models import Q
+from django.test import TestCase, SimpleTestCase, TransactionTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from geo_city.models import City, Country, Region, Street, Address, Place, to_e6
+from geo_city.serializers import PlaceSerializer, AddressSerializer, StreetSerializer, ReverseGeocodingSerializer, \
+    ReverseGeocodingBatchSerializer
+from geo_city.filters import split_query
+from core.app_services.dadata import Point
+from core.mixins.conditional_response import ConditionalListMixin
+from core.pagination import CursorOptInPagination, encode_cursor, keyset_filter, positive_int
+from core.app_services.resilience import ResilientEndpoint, CircuitBreaker, ProviderUnavailable
+from core.app_services.single_flight import SingleFlight
+from geo_city.services.cache_warmup import CacheWarmer
+from geo_city.services.city_index import CityIndex, CITY_INDEX
+from geo_city.services.geo_snapshot import GeoSnapshot, StringTableWriter, get_snapshot, write_snapshot
+from geo_city.services.get_street import get_places_from_gps
+from geo_city.services.reverse_geocoding import PLACE_SPATIAL_INDEX
+from geo_city.services.get_geolocation_from_image import get_geolocation_from_image, get_geolocations_from_images
+from geo_city.services.coordinate_array import CoordinateArray
+from geo_city.services.data_converters.batch import SuggestionResolver
+from geo_city.services.street_fuzzy_index import StreetFuzzyIndex, levenshtein
+from geo_city.services.spatial_index import SpatialIndex, haversine_km
+from geo_city.services.normalize import normalize_query, strip_street_type, coordinate_cell
 
 
 class StreetSerializerTests(TestCase):
@@ -26,3 +61,601 @@ class StreetSerializerTests(TestCase):
     # self.assertTrue(instance.pk)
 
 
+class NormalizeTests(SimpleTestCase):
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  Москва,  Улица  Ленина "), "москва ул ленина")
+        self.assertEqual(normalize_query("москва ул. ленина"), "москва ул ленина")
+        self.assertEqual(normalize_query("Королёв проспект Мира"), "королев пр-кт мира")
+        self.assertEqual(normalize_query("Королёв пр Мира"), "королев пр мира")
+
+    def test_strip_street_type(self):
+        self.assertEqual(strip_street_type("пр-кт Мира"), "мира")
+        self.assertEqual(strip_street_type("Улица Ленина"), "ленина")
+
+    def test_coordinate_cell(self):
+        self.assertEqual(coordinate_cell(55.755831, 37.617673), "55.7558:37.6177")
+        self.assertEqual(coordinate_cell(55.75581, 37.61771), coordinate_cell(55.755831, 37.617673))
+
+
+class CityIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = CityIndex()
+        self.index.build([
+            {"id": 1, "name": "Новосибирск", "region": "Новосибирская область", "population": 1600000,
+             "data": {"id": 1}},
+            {"id": 2, "name": "Новокузнецк", "region": "Кемеровская область", "population": 540000,
+             "data": {"id": 2}},
+            {"id": 3, "name": "Великий Новгород", "region": "Новгородская область", "population": 220000,
+             "data": {"id": 3}},
+            {"id": 4, "name": "Новоалтайск", "region": "Алтайский край", "population": 75000,
+             "data": {"id": 4}},
+        ])
+
+    def test_prefix_then_substring_then_population(self):
+        result = self.index.search(city="нов")
+        self.assertEqual([item["id"] for item in result], [1, 2, 4, 3])
+
+    def test_region_filter(self):
+        result = self.index.search(city="Ново", region="кемеров")
+        self.assertEqual([item["id"] for item in result], [2])
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.index.search(city="ВЕЛИКИЙ")[0]["id"], 3)
+        self.assertEqual(self.index.search(city="qwerty"), [])
+
+
+class SpatialIndexTests(SimpleTestCase):
+    points = [
+        (55.755831, 37.617673, "Москва"),
+        (59.939095, 30.315868, "Санкт-Петербург"),
+        (55.030199, 82.920430, "Новосибирск"),
+        (56.838011, 60.597465, "Екатеринбург"),
+    ]
+
+    def setUp(self):
+        self.index = SpatialIndex()
+        self.index.build(self.points)
+
+    def test_nearest(self):
+        distance, name = self.index.nearest(55.7, 37.5)
+        self.assertEqual(name, "Москва")
+        self.assertAlmostEqual(distance, haversine_km(55.7, 37.5, 55.755831, 37.617673))
+
+    def test_nearest_max_distance(self):
+        self.assertIsNone(self.index.nearest(45.0, 40.0, max_km=100))
+        self.assertEqual(self.index.nearest(45.0, 40.0)[1], "Москва")
+
+    def test_within(self):
+        result = self.index.within(57.0, 60.0, 200)
+        self.assertEqual([name for (_, name) in result], ["Екатеринбург"])
+
+
+class SuggestionResolverTests(TestCase):
+    def get_suggestion(self, street, house=None, **ids):
+        return {"data": {
+            "country": "россия", "country_iso_code": "RU", "region": "Москва",
+            "city": "Москва", "street": street, "street_type": None,
+            "house": house, "house_fias_id": "fias" if house else None,
+            "geo_lat": "55.75", "geo_lon": "37.61", **ids,
+        }}
+
+    def test_resolve_addresses(self):
+        suggestions = [
+            self.get_suggestion("Тверская", "1"),
+            self.get_suggestion("Тверская", "1"),
+            self.get_suggestion("Арбат"),
+        ]
+
+        addresses = SuggestionResolver(suggestions).resolve_addresses()
+
+        self.assertEqual(addresses[0].pk, addresses[1].pk)
+        self.assertEqual(addresses[0].street.street_type, "ул")
+        self.assertIsNone(addresses[2].home)
+        self.assertEqual(Country.objects.count(), 1)
+        self.assertEqual(Street.objects.count(), 2)
+
+    def test_resolve_existing(self):
+        first = SuggestionResolver([self.get_suggestion("Тверская", "1")]).resolve_addresses()
+        second = SuggestionResolver([self.get_suggestion("Тверская", "1")]).resolve_addresses()
+
+        self.assertEqual(first[0].pk, second[0].pk)
+
+    def test_resolve_by_fias_id(self):
+        first = SuggestionResolver([self.get_suggestion("Тверская", street_fias_id="street-1")]).resolve_streets()
+        second = SuggestionResolver([self.get_suggestion("Тверская ул", street_fias_id="street-1")]).resolve_streets()
+
+        self.assertEqual(first[0].pk, second[0].pk)
+        self.assertEqual(Street.objects.count(), 1)
+
+    def test_backfill_fias_id(self):
+        street = SuggestionResolver([self.get_suggestion("Тверская")]).resolve_streets()[0]
+        self.assertIsNone(street.street_fias_id)
+
+        SuggestionResolver([self.get_suggestion("Тверская", street_fias_id="street-1")]).resolve_streets()
+
+        street.refresh_from_db()
+        self.assertEqual(street.street_fias_id, "street-1")
+
+    def test_created_references_invalidate_caches(self):
+        with mock.patch("geo_city.services.data_converters.batch.MODEL_VERSIONS") as versions, \
+                mock.patch("geo_city.services.data_converters.batch.CITY_INDEX") as city_index:
+            SuggestionResolver([self.get_suggestion("Тверская")]).resolve_cities()
+            SuggestionResolver([self.get_suggestion("Арбат")]).resolve_cities()
+
+        self.assertEqual([call.args[0] for call in versions.bump.call_args_list], [Country, Region, City])
+        self.assertEqual(city_index.invalidate.call_count, 2)
+
+
+class BackfillCommandTests(TestCase):
+    def test_update_coordinates_invalidates_indexes(self):
+        City.objects.create(name="Омск", latitude="54.98", longitude="73.37")
+        City.objects.update(lat_e6=None, lng_e6=None)
+
+        with mock.patch("geo_city.management.commands.update_coordinates.CITY_SPATIAL_INDEX") as spatial_index, \
+                mock.patch("geo_city.management.commands.update_coordinates.ADDRESS_COORDINATES") as coordinates, \
+                mock.patch("geo_city.management.commands.update_search_keys.MODEL_VERSIONS") as versions:
+            call_command("update_coordinates", stdout=io.StringIO())
+
+        self.assertEqual(City.objects.get().lat_e6, to_e6(54.98))
+        spatial_index.invalidate.assert_called_once()
+        coordinates.invalidate.assert_called_once()
+        versions.bump.assert_called_once_with(City)
+
+    def test_update_search_keys_invalidates_street_cities(self):
+        city = City.objects.create(name="Омск")
+        street = Street.objects.create(city=city, street="Улица Ленина")
+        Street.objects.filter(pk=street.pk).update(search_key="")
+
+        with mock.patch("geo_city.management.commands.update_search_keys.STREET_FUZZY_INDEX") as fuzzy_index, \
+                mock.patch("geo_city.management.commands.update_search_keys.CITY_INDEX") as city_index:
+            call_command("update_search_keys", stdout=io.StringIO())
+
+        fuzzy_index.invalidate.assert_called_once_with(city.pk)
+        city_index.invalidate.assert_called_once()
+
+
+class SearchKeyTests(SimpleTestCase):
+    def test_street_search_key(self):
+        street = Street(street="Проспект Мира")
+        self.assertEqual(street.fill_search_key().search_key, "мира")
+
+    def test_address_search_key(self):
+        self.assertEqual(Address(home="12/1").fill_search_key().search_key, "12 1")
+
+    def test_split_query(self):
+        index = CityIndex()
+        index.build([
+            {"id": 1, "name": "Москва", "region": "", "population": 0, "data": {"id": 1}},
+            {"id": 2, "name": "Нижний Новгород", "region": "", "population": 0, "data": {"id": 2}},
+        ])
+
+        with mock.patch("geo_city.filters.CITY_INDEX", index):
+            self.assertEqual(split_query("Москва, ул. Тверская 1"), ("москва", ["тверская", "1"]))
+            self.assertEqual(split_query("Нижний Новгород Ленина"), ("нижний новгород", ["ленина"]))
+            self.assertEqual(split_query("Тверская 1"), ("", ["тверская", "1"]))
+
+    def test_match_prefix(self):
+        index = CityIndex()
+        index.build([
+            {"id": 1, "name": "Нижний", "region": "", "population": 0, "data": {"id": 1}},
+            {"id": 2, "name": "Нижний Новгород", "region": "", "population": 0, "data": {"id": 2}},
+        ])
+
+        self.assertEqual(index.match_prefix(["нижний", "новгород", "ленина"]), 2)
+        self.assertEqual(index.match_prefix(["нижний", "ленина"]), 1)
+        self.assertEqual(index.match_prefix(["ленина"]), 0)
+
+
+class CoordinateArrayTests(SimpleTestCase):
+    points = [
+        (1, 55.7558, 37.6173),
+        (2, 55.7512, 37.6184),
+        (3, 59.9343, 30.3351),
+    ]
+
+    def setUp(self):
+        self.array = CoordinateArray()
+        self.array.build((pk, to_e6(lat), to_e6(lng)) for (pk, lat, lng) in self.points)
+
+    def test_within(self):
+        found = self.array.within(55.7558, 37.6173, 5)
+
+        self.assertEqual([pk for pk, _ in found], [1, 2])
+        self.assertAlmostEqual(found[1][1], haversine_km(55.7558, 37.6173, 55.7512, 37.6184), places=6)
+
+    def test_nearest(self):
+        self.assertEqual([pk for pk, _ in self.array.nearest(59.9, 30.3, limit=2)], [3, 1])
+
+    def test_empty(self):
+        self.assertEqual(CoordinateArray().within(55.7558, 37.6173, 5), [])
+
+    def test_update(self):
+        # 2 переехал в Петербург, 3 удалён, 4 добавлен
+        self.array.update([
+            (2, to_e6(59.9350), to_e6(30.3360)), (3, None, None), (4, to_e6(55.7560), to_e6(37.6180)),
+        ])
+
+        self.assertEqual(sorted(self.array.ids.tolist()), [1, 2, 4])
+        self.assertEqual([pk for pk, _ in self.array.within(55.7558, 37.6173, 5)], [1, 4])
+        self.assertEqual([pk for pk, _ in self.array.nearest(59.9343, 30.3351)], [2])
+
+
+class ReverseGeocodingBatchTests(SimpleTestCase):
+    @mock.patch("geo_city.services.get_street.get_local_places_from_gps",
+                side_effect=lambda points: dict.fromkeys(points))
+    def test_dedup_and_order(self, _):
+        calls = []
+
+        async def find_remote_place(gps):
+            calls.append(gps)
+            return {"place_name": str(gps.lat), "lat": gps.lat, "lng": gps.lon}
+
+        points = [Point(lat=55.75581, lon=37.6173), Point(lat=59.9343, lon=30.3351), Point(lat=55.75582, lon=37.6173)]
+        with mock.patch("geo_city.services.get_street.find_remote_place", find_remote_place):
+            places = async_to_sync(get_places_from_gps)(points)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([place["lat"] for place in places], [55.75581, 59.9343, 55.75582])
+        self.assertEqual(places[0]["place_name"], places[2]["place_name"])
+
+
+class ReverseGeocodingSerializerTests(SimpleTestCase):
+    def test_coordinates_validated(self):
+        self.assertTrue(ReverseGeocodingSerializer(data={"lat": "55.75", "lng": "37.61"}).is_valid())
+        for lat, lng in (("nan", "37.61"), ("inf", "37.61"), ("91", "37.61"), ("55.75", "-inf"), ("55.75", "181")):
+            self.assertFalse(ReverseGeocodingSerializer(data={"lat": lat, "lng": lng}).is_valid(), (lat, lng))
+
+    def test_batch_rejects_bad_point(self):
+        serializer = ReverseGeocodingBatchSerializer(data={"points": [{"lat": 55.75, "lng": 37.61},
+                                                                      {"lat": "nan", "lng": 37.61}]})
+        self.assertFalse(serializer.is_valid())
+
+
+class ReverseGeocodingIndexTests(TransactionTestCase):
+    def tearDown(self):
+        for index in (PLACE_SPATIAL_INDEX, CITY_INDEX):
+            index.is_loaded = False
+
+    def test_stale_index_rebuilt_off_event_loop(self):
+        country = Country.objects.create(code=91596, name='Russia')
+        region = Region.objects.create(code=77, name='Москва', country=country)
+        city = City.objects.create(name='Москва', region=region, latitude="55.755800", longitude="37.617300")
+        Place.objects.create(city=city, place_name="Красная площадь", latitude="55.753900", longitude="37.620800")
+
+        # индексы загружены, но их версия разошлась с Redis: следующий запрос перестроит их из БД
+        for index in (PLACE_SPATIAL_INDEX, CITY_INDEX):
+            index.is_loaded, index._version, index._checked_at = True, b"stale", 0.0
+
+        async def find_remote_place(gps):
+            raise AssertionError("the local index must answer")
+
+        with mock.patch("geo_city.services.get_street.find_remote_place", find_remote_place):
+            places = async_to_sync(get_places_from_gps)([Point(lat=55.7539, lon=37.6208)])
+
+        self.assertEqual(places[0]["place_name"], "Красная площадь")
+        self.assertEqual(places[0]["city"]["id"], city.pk)
+
+
+def make_jpeg(latitude=None, order="<"):
+    """
+    Minimal JPEG with an Exif GPS IFD, big image data after the header.
+    """
+    byte_order = b"II" if order == "<" else b"MM"
+    ifd0_offset = 8
+    gps_offset = ifd0_offset + 2 + 12 + 4
+    rationals_offset = gps_offset + 2 + 4 * 12 + 4
+
+    def entry(tag, type_, count, value):
+        return struct.pack(order + "HHI", tag, type_, count) + value
+
+    tiff = byte_order + struct.pack(order + "HI", 42, ifd0_offset)
+    tiff += struct.pack(order + "H", 1) + entry(0x8825, 4, 1, struct.pack(order + "I", gps_offset)) + b"\0" * 4
+    if latitude:
+        tiff += struct.pack(order + "H", 4)
+        tiff += entry(1, 2, 2, b"S\0\0\0")
+        tiff += entry(2, 5, 3, struct.pack(order + "I", rationals_offset))
+        tiff += entry(3, 2, 2, b"E\0\0\0")
+        tiff += entry(4, 5, 3, struct.pack(order + "I", rationals_offset + 24))
+        tiff += b"\0" * 4
+        for value in (latitude, (37, 1, 36, 1, 5028, 100)):
+            tiff += struct.pack(order + "6I", *value)
+    else:
+        tiff += struct.pack(order + "H", 0) + b"\0" * 4
+
+    app1 = b"Exif\0\0" + tiff
+    return b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", 4) + b"\0\0" \
+        + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + b"\xff\xda" + b"\0" * 100000
+
+
+class GeolocationFromImageTests(SimpleTestCase):
+    def test_gps(self):
+        for order in ("<", ">"):
+            location = get_geolocation_from_image(io.BytesIO(make_jpeg((55, 1, 45, 1, 2088, 100), order)))
+
+            self.assertAlmostEqual(location["latitude"], -(55 + 45 / 60 + 20.88 / 3600))
+            self.assertAlmostEqual(location["longitude"], 37 + 36 / 60 + 50.28 / 3600)
+            self.assertEqual((location["latitude_ref"], location["longitude_ref"]), ("S", "E"))
+
+    def test_no_gps(self):
+        self.assertIsNone(get_geolocation_from_image(io.BytesIO(make_jpeg())))
+        with mock.patch("geo_city.services.get_geolocation_from_image.exifread.process_file", return_value={}):
+            self.assertIsNone(get_geolocation_from_image(io.BytesIO(b"not an image")))
+
+    def test_non_jpeg_through_exifread(self):
+        def tag(values=None, printable=""):
+            return mock.Mock(values=values, printable=printable)
+
+        ratios = [mock.Mock(num=num, den=den) for num, den in ((55, 1), (45, 1), (2088, 100))]
+        tags = {
+            "GPS GPSLatitude": tag(ratios), "GPS GPSLatitudeRef": tag(printable="S"),
+            "GPS GPSLongitude": tag(ratios), "GPS GPSLongitudeRef": tag(printable="E"),
+        }
+
+        with mock.patch("geo_city.services.get_geolocation_from_image.exifread.process_file",
+                        return_value=tags) as process_file:
+            location = get_geolocation_from_image(io.BytesIO(b"II*\0 heic or tiff"))
+
+        process_file.assert_called_once()
+        self.assertAlmostEqual(location["latitude"], -(55 + 45 / 60 + 20.88 / 3600))
+        self.assertEqual((location["latitude_ref"], location["longitude_ref"]), ("S", "E"))
+
+    def test_malformed_gps_tags_through_exifread(self):
+        ratios = [mock.Mock(num=55, den=1)]
+        for latitude in (mock.Mock(values="55.7558"), mock.Mock(values=ratios), mock.Mock(values=None)):
+            tags = {"GPS GPSLatitude": latitude, "GPS GPSLongitude": mock.Mock(values=ratios * 3)}
+            with mock.patch("geo_city.services.get_geolocation_from_image.exifread.process_file",
+                            return_value=tags):
+                self.assertIsNone(get_geolocation_from_image(io.BytesIO(b"II*\0 heic or tiff")))
+
+    def test_batch(self):
+        files = [io.BytesIO(make_jpeg((55, 1, 45, 1, 2088, 100))), io.BytesIO(b""), io.BytesIO(make_jpeg())]
+        locations = get_geolocations_from_images(files)
+
+        self.assertEqual(len(locations), 3)
+        self.assertIsNotNone(locations[0])
+        self.assertIsNone(locations[1])
+        self.assertIsNone(locations[2])
+
+
+class ResilientEndpointTests(SimpleTestCase):
+    def test_circuit_opens(self):
+        endpoint = ResilientEndpoint("test", breaker=CircuitBreaker(failure_threshold=2, open_seconds=60))
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise httpx.ConnectError("down")
+
+        async def run():
+            for _ in range(3):
+                with self.assertRaises(ProviderUnavailable):
+                    await endpoint.call(failing)
+
+        async_to_sync(run)()
+
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(endpoint.is_open)
+
+    def test_hedged_request(self):
+        endpoint = ResilientEndpoint("test", hedge_percentile=0.5)
+        endpoint.latencies.extend([0.01] * 20)
+        delays = [1, 0]
+
+        async def request():
+            await asyncio.sleep(delays.pop(0))
+            return httpx.Response(200)
+
+        started_at = time.monotonic()
+        response = async_to_sync(endpoint.call)(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(time.monotonic() - started_at, 0.5)
+
+    def test_concurrency_bound_across_loops(self):
+        endpoint = ResilientEndpoint("test", max_concurrency=1, acquire_timeout=0.1)
+        started = threading.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.5)
+            return httpx.Response(200)
+
+        # у каждого запроса свой event loop, как у async_to_sync во вьюхах
+        thread = threading.Thread(target=lambda: asyncio.run(endpoint.call(slow)))
+        thread.start()
+        started.wait(1)
+        with self.assertRaises(ProviderUnavailable):
+            asyncio.run(endpoint.call(slow))
+        thread.join()
+
+        self.assertEqual(asyncio.run(endpoint.call(slow)).status_code, 200)
+
+
+class SingleFlightTests(SimpleTestCase):
+    @mock.patch("core.app_services.single_flight.REDIS_SERVICE.get_redis", side_effect=redis.RedisError)
+    def test_coalesces_across_loops(self, _):
+        flight = SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        async def request():
+            calls.append(1)
+            started.set()
+            await asyncio.get_running_loop().run_in_executor(None, release.wait, 1)
+            return httpx.Response(200, content=b"{}")
+
+        # у каждого запроса свой event loop, как у async_to_sync во вьюхах
+        threads = [threading.Thread(target=lambda: results.append(asyncio.run(flight.do("key", request))))
+                   for _ in range(2)]
+        threads[0].start()
+        started.wait(1)
+        threads[1].start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([response.status_code for response in results], [200, 200])
+
+
+class CursorPaginationTests(TestCase):
+    class View:
+        cursor_ordering = ("name", "id")
+
+    def paginate(self, url):
+        paginator = CursorOptInPagination()
+        page = paginator.paginate_queryset(City.objects.all(), Request(APIRequestFactory().get(url)), self.View())
+        return page, paginator.get_paginated_response([city.name for city in page]).data
+
+    def test_keyset_filter(self):
+        self.assertEqual(
+            keyset_filter(("name", "id"), ["Омск", 3]),
+            Q(name__gt="Омск") | Q(name="Омск", id__gt=3),
+        )
+
+    def test_pages(self):
+        for name in ("Омск", "Тула", "Омск", "Бийск", "Сочи"):
+            City.objects.create(name=name)
+
+        names, next_link = [], "/geo/city/?cursor=&limit=2"
+        while next_link:
+            page, data = self.paginate(next_link)
+            self.assertNotIn("count", data)
+            names += data["results"]
+            next_link = data["next"]
+
+        self.assertEqual(names, ["Бийск", "Омск", "Омск", "Сочи", "Тула"])
+
+    def test_invalid_cursor(self):
+        for position in ([{"a": 1}, 1], [["Омск"], 1], [None, 1], [True, 1]):
+            with self.assertRaises(NotFound):
+                self.paginate(f"/geo/city/?cursor={encode_cursor(position)}")
+
+    def test_cursor_value_of_wrong_type(self):
+        City.objects.create(name="Омск")
+
+        with self.assertRaises(NotFound):
+            self.paginate(f"/geo/city/?cursor={encode_cursor(['Омск', 'abc'])}")
+
+    def test_limit(self):
+        self.assertEqual(positive_int("5", cutoff=3), 3)
+        for value in ("0", "-1", "a"):
+            with self.assertRaises(ValueError):
+                positive_int(value)
+
+    def test_limit_offset_by_default(self):
+        City.objects.create(name="Омск")
+
+        _, data = self.paginate("/geo/city/")
+
+        self.assertEqual(data["count"], 1)
+
+
+class ConditionalListTests(SimpleTestCase):
+    def is_not_modified(self, **headers):
+        request = APIRequestFactory().get("/geo/country/", **headers)
+        return ConditionalListMixin.is_not_modified(request, "abc", 1000)
+
+    def test_if_none_match(self):
+        self.assertTrue(self.is_not_modified(HTTP_IF_NONE_MATCH='W/"abc"'))
+        self.assertTrue(self.is_not_modified(HTTP_IF_NONE_MATCH='"xyz", "abc"'))
+        self.assertFalse(self.is_not_modified(HTTP_IF_NONE_MATCH='W/"xyz"'))
+
+    def test_if_modified_since(self):
+        self.assertTrue(self.is_not_modified(HTTP_IF_MODIFIED_SINCE="Thu, 01 Jan 1970 00:20:00 GMT"))
+        self.assertFalse(self.is_not_modified(HTTP_IF_MODIFIED_SINCE="Thu, 01 Jan 1970 00:10:00 GMT"))
+        self.assertFalse(self.is_not_modified())
+
+
+class StreetFuzzyIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.dictionary = StreetFuzzyIndex.build([
+            (1, "ленинский"), (2, "ленина"), (3, "лесная"), (4, "ленинский"), (5, "мира"),
+        ])
+
+    def test_levenshtein(self):
+        self.assertEqual(levenshtein("ленинскй", "ленинский", 2), 1)
+        self.assertEqual(levenshtein("ленина", "лесная", 1), 2)
+
+    def test_typo(self):
+        found = self.dictionary.search("ленинскй", 2)
+
+        self.assertEqual(found[0], (1, "ленинский", [1, 4]))
+        self.assertNotIn("мира", [word for (_, word, _) in found])
+
+    def test_distance_limit(self):
+        self.assertEqual(self.dictionary.search("мирр", 1), [(1, "мира", [5])])
+        self.assertEqual(self.dictionary.search("лнн", 1), [])
+
+
+class GeoSnapshotTests(SimpleTestCase):
+    rows = [
+        {"id": 1, "name": "Новосибирск", "region": "Новосибирская область", "population": 1600000,
+         "data": {"id": 1, "name": "Новосибирск"}},
+        {"id": 2, "name": "Новокузнецк", "region": "", "population": 540000, "data": {"id": 2}},
+    ]
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "geo_snapshot.bin")
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(lambda: os.path.exists(self.path) and os.remove(self.path))
+
+    def test_city_index_from_snapshot(self):
+        strings = StringTableWriter()
+        with mock.patch.object(CityIndex, "get_rows", return_value=self.rows):
+            rows = CityIndex().dump_snapshot(strings)
+        write_snapshot(self.path, {CityIndex.snapshot_section: rows}, strings, {"versions": {"key": "7"}})
+
+        snapshot = GeoSnapshot.open(self.path)
+        index = CityIndex()
+        self.assertTrue(index.rebuild_from_snapshot(snapshot, snapshot.section(CityIndex.snapshot_section)))
+
+        self.assertEqual(snapshot.get_version("key"), b"7")
+        self.assertEqual(index.get(1), {"id": 1, "name": "Новосибирск"})
+        self.assertEqual([item["id"] for item in index.search(city="ново")], [1, 2])
+
+    def test_reopened_when_replaced(self):
+        strings = StringTableWriter()
+        write_snapshot(self.path, {}, strings, {"versions": {"key": "1"}})
+
+        with mock.patch("geo_city.services.geo_snapshot.GEO_SNAPSHOT_PATH", self.path), \
+                mock.patch("geo_city.services.geo_snapshot._snapshot_stat", None):
+            self.assertEqual(get_snapshot().get_version("key"), b"1")
+
+            write_snapshot(self.path, {}, strings, {"versions": {"key": "2"}})
+            self.assertEqual(get_snapshot().get_version("key"), b"2")
+
+            os.remove(self.path)
+            self.assertIsNone(get_snapshot())
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as file:
+            file.write(b"not a snapshot")
+
+        with self.assertRaises(ValueError):
+            GeoSnapshot.open(self.path)
+
+
+class CacheWarmerTests(SimpleTestCase):
+    def test_budget_and_concurrency(self):
+        running = []
+        calls = []
+
+        async def find_city_address(city_name, street):
+            running.append(1)
+            calls.append((city_name, street))
+            self.assertLessEqual(len(running), 2)
+            await asyncio.sleep(0.01)
+            running.pop()
+            return httpx.Response(200, json={"suggestions": []})
+
+        queries = [("москва", f"улица {number}") for number in range(10)] + [("Москва", "Улица 1")]
+        with mock.patch("geo_city.services.cache_warmup.ADDRESS_CACHE.contains", return_value=False), \
+                mock.patch("geo_city.services.cache_warmup.find_city_address", find_city_address):
+            stats = async_to_sync(CacheWarmer(concurrency=2, budget=5).warm)(queries, [])
+
+        self.assertEqual(len(calls), 5)
+        self.assertEqual(stats["warmed"], 5)
+        self.assertEqual(stats["skipped"], 5)
@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from geo_city.views import CityViewSet, StreetViewSet, PlaceViewSet, AddressViewSet, SearchStreetApiView, \
-    ReverseGeocodingApiView, SearchAddressApiView
+from geo_city.views import CountryViewSet, RegionViewSet, CityViewSet, StreetViewSet, PlaceViewSet, AddressViewSet, SearchStreetApiView, \
+    ReverseGeocodingApiView, SearchAddressApiView, ReverseGeocodingBatchApiView
 
 router = DefaultRouter(trailing_slash=True)
+router.register(r'country', CountryViewSet)
+router.register(r'region', RegionViewSet)
 router.register(r'city', CityViewSet)
 router.register(r'street', StreetViewSet)
 router.register(r'place', PlaceViewSet)
@@ -14,5 +16,6 @@ urlpatterns = [
     path(r'', include(router.urls)),
     path(r'search/street/', SearchStreetApiView.as_view(), name="geo_search_street"),
     path(r'search/address/', SearchAddressApiView.as_view(), name="geo_search_address"),
-    path(r'search/reverse-geocoding', ReverseGeocodingApiView.as_view(), name="reverse_geocoding")
+    path(r'search/reverse-geocoding', ReverseGeocodingApiView.as_view(), name="reverse_geocoding"),
+    path(r'search/reverse-geocoding/batch', ReverseGeocodingBatchApiView.as_view(), name="reverse_geocoding_batch"),
 ]
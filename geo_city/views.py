@@ -1,5 +1,3 @@
-import asyncio
-
 from asgiref.sync import async_to_sync, sync_to_async
 from django.utils.decorators import method_decorator
 from rest_framework import mixins, viewsets, status
@@ -10,14 +8,18 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.utils.translation import gettext_lazy as _
 
 from core.app_services.dadata import Point
+from core.mixins.conditional_response import ConditionalListMixin
+from core.pagination import CursorOptInPagination, is_cursor_request
 from geo_city.filters import SearchFilterCityBackend, SearchFilterPlaceBackend, SearchFilterStreetBackend, \
     SearchFilterAddressBackend
-from geo_city.models import City, Address, Street, Place
-from geo_city.serializers import CitySerializer, AddressSerializer, StreetSerializer, PlaceSerializer, \
-    SearchStreetListSerializer, ReverseGeocodingSerializer, SearchAddressListSerializer
-from geo_city.services.data_converters.address import address_serializer
-from geo_city.services.data_converters.street import street_serializer
-from geo_city.services.get_street import get_valid_street, get_place_from_gps
+from geo_city.models import City, Address, Street, Place, Country, Region
+from geo_city.serializers import CountrySerializer, RegionSerializer, CitySerializer, AddressSerializer, \
+    StreetSerializer, PlaceSerializer, SearchStreetListSerializer, ReverseGeocodingSerializer, SearchAddressListSerializer, \
+    ReverseGeocodingBatchSerializer
+from geo_city.services.data_converters.address import addresses_serializer
+from geo_city.services.city_index import CITY_INDEX
+from geo_city.services.data_converters.street import streets_serializer
+from geo_city.services.get_street import get_valid_street, get_place_from_gps, get_places_from_gps
 
 LIMIT_QUERY = 20
 LIMIT_RESULT_FROM_API = 8
@@ -86,11 +88,44 @@ class GeoCitySetterViewSet(
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CityViewSet(GeoCityGetterViewSet, viewsets.GenericViewSet,):
+class CountryViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Country.objects.order_by("name")
+    permission_classes = (AllowAny,)
+    serializer_class = CountrySerializer
+    versioned_models = (Country,)
+
+
+class RegionViewSet(ConditionalListMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Region.objects.select_related("country").order_by("name", "id")
+    permission_classes = (AllowAny,)
+    serializer_class = RegionSerializer
+    versioned_models = (Region, Country)
+
+
+class CityViewSet(ConditionalListMixin, GeoCityGetterViewSet, viewsets.GenericViewSet,):
     queryset = City.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = CitySerializer
     filter_backends = (SearchFilterCityBackend, )
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("name", "id")
+    versioned_models = (City, Region, Country)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: self.search(request, *args, **kwargs))
+
+    def search(self, request, *args, **kwargs):
+        query_params = request.query_params
+
+        # поиск по координатам и постраничный обход по курсору идут через БД,
+        # остальное обслуживает индекс в памяти (он сортирует по релевантности)
+        if query_params.get("latitude") or query_params.get("longitude") or is_cursor_request(request):
+            return GeoCityGetterViewSet.list(self, request, *args, **kwargs)
+
+        cities = CITY_INDEX.search(city=query_params.get("city"), region=query_params.get("region"))
+
+        page = self.paginate_queryset(cities)
+        return self.get_paginated_response(page)
 
 
 class StreetViewSet(GeoCityGetterViewSet, viewsets.GenericViewSet,):
@@ -98,10 +133,12 @@ class StreetViewSet(GeoCityGetterViewSet, viewsets.GenericViewSet,):
     permission_classes = (IsAuthenticated,)
     serializer_class = StreetSerializer
     filter_backends = (SearchFilterStreetBackend, )
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("id",)
 
 
 class PlaceViewSet(GeoCityGetterViewSet, GeoCitySetterViewSet, viewsets.GenericViewSet,):
-    queryset = Place.objects.select_related("street", "street__city")
+    queryset = Place.objects.select_related("city", "city__region", "city__region__country")
     permission_classes = (IsAuthenticated,)
     serializer_class = PlaceSerializer
     filter_backends = (SearchFilterPlaceBackend, )
@@ -112,6 +149,8 @@ class AddressViewSet(GeoCityGetterViewSet, viewsets.GenericViewSet,):
     permission_classes = (IsAuthenticated,)
     serializer_class = AddressSerializer
     filter_backends = (SearchFilterAddressBackend, )
+    pagination_class = CursorOptInPagination
+    cursor_ordering = ("id",)
 
 
 class SearchStreetApiView(GenericAPIView):
@@ -134,17 +173,8 @@ class SearchStreetApiView(GenericAPIView):
                 "detail": [_('Not found street data.')]
             }}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-        result = []
-
-        if len(data) > 0:
-            tasks = []
-            for street_data in data[:LIMIT_RESULT_FROM_API]:
-                tasks.append(asyncio.create_task(street_serializer(street_data)))
-
-            for _t in tasks:
-                _street = await _t
-                if _street:
-                    result.append(_street.data)
+        streets = await streets_serializer(data[:LIMIT_RESULT_FROM_API])
+        result = [_street.data for _street in streets if _street]
 
         return Response(result, status=status.HTTP_200_OK)
 
@@ -170,19 +200,8 @@ class SearchAddressApiView(GenericAPIView):
                 "detail": [_('Not found address data.')]
             }}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-        result = []
-
-        if len(data) > 0:
-            tasks = []
-            for street_data in data[:LIMIT_RESULT_FROM_API]:
-                tasks.append(asyncio.create_task(address_serializer(street_data)))
-
-            for _t in tasks:
-                _address = await _t
-                if _address:
-                    result.append(_address.data)
-        # for add in result:
-        #     print(add)
+        addresses = await addresses_serializer(data[:LIMIT_RESULT_FROM_API])
+        result = [_address.data for _address in addresses if _address]
         return Response(result, status=status.HTTP_200_OK)
 
 
@@ -211,3 +230,23 @@ class ReverseGeocodingApiView(GenericAPIView):
         return Response({
             "place": place,
         }, status=status.HTTP_200_OK)
+
+
+class ReverseGeocodingBatchApiView(GenericAPIView):
+    permission_classes = (IsAuthenticated,)
+    serializer_class = ReverseGeocodingBatchSerializer
+
+    @method_decorator(async_to_sync)
+    async def post(self, request):
+        serializer = self.serializer_class(
+            data=request.data,
+        )
+
+        serializer.is_valid(raise_exception=True)
+
+        points = [Point(lat=point["lat"], lon=point["lng"]) for point in serializer.validated_data["points"]]
+        places = await get_places_from_gps(points)
+
+        return Response({
+            "places": places,
+        }, status=status.HTTP_200_OK)
@@ -17,3 +17,13 @@ env = {
 
 reload = True
 name = 'api'
+
+
+def post_worker_init(worker):
+    from geo_city.services.city_index import CITY_INDEX
+    from geo_city.services.reverse_geocoding import CITY_SPATIAL_INDEX, PLACE_SPATIAL_INDEX
+    from geo_city.services.coordinate_array import ADDRESS_COORDINATES
+    CITY_INDEX.load()
+    CITY_SPATIAL_INDEX.load()
+    PLACE_SPATIAL_INDEX.load()
+    ADDRESS_COORDINATES.load()
@@ -110,6 +110,111 @@ CACHES = {
 
 CACHE_TTL = 60 * 1
 
+# Пул исходящих HTTP-соединений (DaData, reCAPTCHA и т.д.), один клиент на хост
+HTTP_CLIENT_POOL = {
+    'max_connections_per_host': 20,
+    'max_keepalive_connections': 10,
+    'keepalive_expiry': 30,
+    'http2': True,
+}
+
+# Кэш подсказок DaData в Redis: время жизни (сек) и максимальное число ключей в каждом пространстве
+SUGGESTION_CACHE = {
+    'ttl': 60 * 60 * 24,
+    'max_size': 50000,
+}
+
+# Объединение одинаковых одновременных запросов к DaData (в процессе и между воркерами через Redis)
+SINGLE_FLIGHT = {
+    'lock_ttl': 35,
+    'wait_timeout': 35,
+    'result_ttl': 5,
+    # как часто ожидающий проверяет, что лидер ещё жив
+    'lock_check_interval': 0.5,
+}
+
+# Защита воркеров от медленного провайдера (DaData)
+PROVIDER_RESILIENCE = {
+    'max_concurrency': 20,
+    'acquire_timeout': 1,
+    'call_timeout': 8,
+    'failure_threshold': 5,
+    'open_seconds': 30,
+    # повторный запрос после 95-го перцентиля задержки; None - выключено
+    'hedge_percentile': None,
+    'hedge_min_samples': 20,
+}
+
+# Как часто (сек) воркер сверяет версии гео-индексов в памяти с Redis
+GEO_INDEX_REFRESH_INTERVAL = 5
+
+# Снимок гео-справочников (manage.py export_geo_snapshot): воркеры отображают его в память
+# и строят индексы без чтения таблиц, пока версии индексов совпадают со снимком
+GEO_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'geo_snapshot.bin')
+
+# Обратное геокодирование по локальному индексу: внешний провайдер вызывается,
+# только если ближайший объект дальше указанного радиуса (км)
+REVERSE_GEOCODING = {
+    'place_radius_km': 0.05,
+    'city_radius_km': 10,
+    'seed_csv': os.path.join(BASE_DIR, 'koord_russia.csv'),
+    # пакетный запрос: максимум точек и одновременных запросов к провайдеру
+    'batch_max_points': 500,
+    'batch_concurrency': 8,
+}
+
+# Прогрев кэшей подсказок (manage.py warm_caches, задача geo_city.tasks.warm_suggestion_caches)
+CACHE_WARMUP = {
+    # частых запросов каждого вида из журнала
+    'top_queries': 500,
+    'query_log_max_size': 10000,
+    'concurrency': 4,
+    # не больше стольких запросов к провайдеру за прогон
+    'budget': 1000,
+}
+
+PERMISSION_MATRIX = {
+    # сколько секунд воркер не сверяет права менеджера с Redis
+    'local_ttl': 2,
+    'local_max_size': 10000,
+    'ttl': 60 * 60,
+}
+
+USER_CACHE = {
+    # сколько секунд воркер не сверяет пользователя с Redis
+    'local_ttl': 5,
+    'local_max_size': 10000,
+    'ttl': 5 * 60,
+}
+
+TOKEN_CACHE = {
+    # проверенных токенов в памяти воркера
+    'max_size': 10000,
+    # токен без срока действия проверяется заново не реже, с
+    'max_age': 5 * 60,
+}
+
+# Потоков для чтения EXIF координат пачки фотографий
+EXIF_WORKERS = 8
+
+BRANCH_DISTANCES = {
+    # во сколько раз дорога длиннее расстояния по прямой; по названию региона
+    'default_road_factor': 1.0,
+    'road_factors': {},
+}
+
+# Поиск улиц с опечатками: словари по городам в памяти воркера
+STREET_FUZZY_SEARCH = {
+    'max_cities': 32,
+    # до этой длины названия допускается одна опечатка, дальше - max_distance
+    'short_word_length': 5,
+    'max_distance': 2,
+    'prefix_length': 7,
+}
+
+# Сколько секунд хранить отрендеренные списки справочников (страны, регионы, города, навыки)
+CONDITIONAL_CACHE_TIMEOUT = 60 * 60
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -271,6 +376,10 @@ COUNT_FAILED_ATTEMPT = 10
 # Время бана пользователя при исчерпании всех доступных попыток
 BAN_TIME = timedelta(minutes=30)
 
+# Считать только попытки за последние BAN_TIME (скользящее окно) вместо счётчика,
+# который живёт BAN_TIME после последней попытки
+SLIDING_WINDOW_BAN = False
+
 # Макстимальщный размер загружаемых файлов Mb
 MAX_UPLOAD_SIZE = 5
 